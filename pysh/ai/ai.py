@@ -11,7 +11,10 @@ models/gemini-2.5-flash-native-audio-preview-09-2025
 
 import os
 import logging
+import queue
 import sys
+import threading
+import time
 
 
 #for the api key
@@ -19,8 +22,33 @@ import ai.managekeys
 import platform
 import importlib
 
+from ai.cache import ResponseCache
+from ai.config import config
+from ai import steps
+from ai.intents import IntentIndex
+from ai.transport import GeminiSDKTransport, HTTPTransport
+
+# how often a waiting call reports progress (spinner frames)
+PROGRESS_INTERVAL = 0.1
+
+# marks the end of a streamed answer on the worker's queue
+_DONE = object()
+
 
 class AI:
+    # session-wide state: the configured model, transport and response cache.
+    # the *_for fields hold the settings they were built from, so they are
+    # rebuilt when the settings change; None means they were set explicitly
+    _model = None
+    _model_for = None
+    _model_name = None
+    _transport = None
+    _transport_for = None
+    _cache = None
+    _intents = None
+    # where the last answer came from: "local", "cache" or "model"
+    last_source = None
+
     @staticmethod
     def _get_os():
         system = platform.system().lower()
@@ -35,11 +63,29 @@ class AI:
 
 
     @staticmethod
-    def call_gemini(user_instruction: str):
-        
-        key = ai.managekeys.load_or_check_ai_api_key()
+    def set_model(model, name=None):
+        """
+        Use an already-built model for the rest of the session. Anything with
+        generate_content(prompt) returning an object with .text works, which
+        is how the AI path is tested without the network.
+        """
+        AI._model = model
+        AI._model_for = None
+        AI._transport = None
+        if name:
+            AI._model_name = name
+
+    @staticmethod
+    def model_name():
+        """the model in use: set_model's name, else PYSH_AI_MODEL or the default"""
+        return AI._model_name or config.model_name()
 
-        # Configure the genai client after the key is available so it can use the env var
+    @staticmethod
+    def _get_model(key):
+        # configure the client and build the model once per key and model name
+        settings = (key, AI.model_name())
+        if AI._model is not None and AI._model_for in (None, settings):
+            return AI._model
         try:
             genai = importlib.import_module('google.generativeai')
             # try to configure client explicitly if possible
@@ -51,14 +97,185 @@ class AI:
         except Exception:
             raise RuntimeError('google.generativeai library is required for AI commands')
 
+        AI._model = genai.GenerativeModel(settings[1])
+        AI._model_for = settings
+        return AI._model
+
+    @staticmethod
+    def set_transport(transport):
+        """
+        Send requests through a transport of your own (see ai/transport.py),
+        e.g. an HTTPTransport pointed at a local stand-in server.
+        """
+        AI._transport = transport
+        AI._transport_for = None
+
+    @staticmethod
+    def _get_transport(key):
+        # PYSH_AI_BASE_URL talks to the REST API (or a stand-in) over plain HTTP
+        settings = (key, AI.model_name(), config.base_url(), config.timeout())
+        if AI._transport is not None and AI._transport_for in (None, settings):
+            return AI._transport
+        key, name, base_url, timeout = settings
+        if base_url:
+            AI._transport = HTTPTransport(key, name, base_url, timeout=timeout)
+        else:
+            AI._transport = GeminiSDKTransport(AI._get_model(key))
+        AI._transport_for = settings
+        return AI._transport
+
+    @staticmethod
+    def _stream(transport, prompt, timeout, on_progress=None):
+        """
+        Run a request on a worker thread and collect the streamed answer.
+
+        The calling thread only waits on a queue, so it stays responsive:
+        on_progress(text_so_far) is called for every chunk and every
+        PROGRESS_INTERVAL while waiting, TimeoutError is raised once the
+        deadline passes and Ctrl+C interrupts the wait at once. In both cases
+        the worker is told to stop and left behind (it is a daemon thread).
+        """
+        chunks = queue.Queue()
+        cancel = threading.Event()
+
+        def work():
+            try:
+                for chunk in transport.stream(prompt, cancel):
+                    chunks.put(chunk)
+            except BaseException as e:
+                chunks.put(e)
+            else:
+                chunks.put(_DONE)
+
+        threading.Thread(target=work, name="pysh-ai", daemon=True).start()
+
+        deadline = time.monotonic() + timeout
+        text = []
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"no answer from {AI.model_name()} within {timeout:g}s")
+                try:
+                    item = chunks.get(timeout=min(remaining, PROGRESS_INTERVAL))
+                except queue.Empty:
+                    item = None
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                if item is not None:
+                    text.append(item)
+                if on_progress is not None:
+                    on_progress("".join(text))
+        finally:
+            cancel.set()
+        return "".join(text)
+
+    @staticmethod
+    def _get_cache():
+        if AI._cache is None:
+            AI._cache = ResponseCache()
+        return AI._cache
+
+    @staticmethod
+    def intents():
+        """the local intent matcher consulted before the model (ai/intents.py)"""
+        if AI._intents is None:
+            AI._intents = IntentIndex()
+        return AI._intents
+
+    @staticmethod
+    def accept(user_instruction: str, command: str):
+        """
+        Record that a command from the model ran successfully, so the same
+        request is answered locally next time.
+        """
+        AI.intents().learn(user_instruction, command)
+
+    @staticmethod
+    def ensure_key():
+        """
+        Return the API key, asking for it on the terminal the first time.
+        Call it before a spinner is drawn: the requests themselves never prompt.
+        """
+        return ai.managekeys.load_or_check_ai_api_key()
+
+    @staticmethod
+    def _ask(user_instruction, prompt, kind, use_cache, timeout, on_progress, validate=None):
+        """
+        Send a prompt and return the stripped answer, reusing a cached answer
+        for the same instruction, OS, model and kind of request. validate()
+        may reject an answer (raising) before it is cached.
+        """
+        # answers are cached per (instruction, OS, model)
+        cache = AI._get_cache()
+        cache_key = cache.key(user_instruction, AI._get_os(), AI.model_name() + kind)
+        if use_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                AI.last_source = "cache"
+                return cached
+
+        # from memory, with no file I/O; ensure_key() asked for it if needed
+        key = config.api_key()
+        if not key:
+            raise RuntimeError("GEMINI_API_KEY is not set")
+        transport = AI._get_transport(key)
+
+        answer = AI._stream(transport, prompt, timeout or config.timeout(), on_progress)
+        answer = answer.strip()
+        if not answer:
+            raise RuntimeError(f"{AI.model_name()} returned an empty answer")
+        if validate is not None:
+            validate(answer)
+
+        cache.put(cache_key, answer)
+        AI.last_source = "model"
+        return answer
+
+    @staticmethod
+    def call_gemini(user_instruction: str, use_cache: bool = True, timeout=None, on_progress=None):
+        """
+        Return a shell command for the instruction. The answer is streamed;
+        on_progress(text_so_far) sees it grow. Raises TimeoutError after
+        timeout seconds (default PYSH_AI_TIMEOUT, see ai/config.py) and
+        KeyboardInterrupt on Ctrl+C. Requests the intent matcher recognizes
+        are answered locally unless use_cache is off.
+        """
+        if use_cache:
+            command = AI.intents().match(user_instruction)
+            if command is not None:
+                AI.last_source = "local"
+                return command
+
         os_type = AI._get_os()
         prompt = (
             f"You are a command-line assistant. "
             f"Generate a valid shell command for {os_type} that performs the following task: "
             f"{user_instruction}. Output only the command."
         )
+        return AI._ask(user_instruction, prompt, "", use_cache, timeout, on_progress)
 
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(prompt)
+    @staticmethod
+    def call_gemini_plan(user_instruction: str, use_cache: bool = True, timeout=None, on_progress=None):
+        """
+        Return the steps (ai.steps.Step) that perform the instruction, from
+        a single request. Each step names the steps it needs to wait for, so
+        independent ones can run at the same time. Otherwise like call_gemini.
+        """
+        if use_cache:
+            command = AI.intents().match(user_instruction)
+            if command is not None:
+                AI.last_source = "local"
+                return [steps.Step(1, command)]
 
-        return response.text.strip()
\ No newline at end of file
+        os_type = AI._get_os()
+        prompt = (
+            f"You are a command-line assistant. "
+            f"Break the following task into shell commands for {os_type}: {user_instruction}. "
+            f"{steps.PLAN_FORMAT}"
+        )
+        answer = AI._ask(user_instruction, prompt, ":plan", use_cache, timeout, on_progress,
+                         validate=steps.parse_steps)
+        return steps.parse_steps(answer)
@@ -0,0 +1,121 @@
+'''
+on-disk cache of AI responses
+
+maps (normalized instruction, OS, model) to the command the model returned,
+so asking for the same thing again doesn't cost a network round-trip.
+entries expire after a TTL and the least recently used are evicted past a
+size limit. the file is read once per session and lookups are plain dict
+hits; the use times they record are written back at most every
+SAVE_INTERVAL seconds and when pysh exits.
+'''
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+# seconds an answer stays valid
+DEFAULT_TTL = 7 * 24 * 3600
+# entries kept on disk before the least recently used are dropped
+DEFAULT_MAX_ENTRIES = 1000
+# least seconds between writes made only to record that answers were used
+SAVE_INTERVAL = 60.0
+
+
+def _default_path() -> Path:
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "pysh" / "ai_responses.json"
+
+
+def normalize(instruction: str) -> str:
+    """lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", instruction).strip().rstrip(".!?").lower()
+
+
+class ResponseCache:
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path) if path else _default_path()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = None    # key -> {"response", "created", "used"}
+        self._dirty = False     # use times not written yet
+        self._saved = 0.0       # time.monotonic() of the last write
+        self._flush_at_exit = False
+
+    @staticmethod
+    def key(instruction: str, os_type: str, model: str) -> str:
+        raw = "\0".join((model, os_type, normalize(instruction)))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str):
+        """cached response for key, or None if missing or expired"""
+        entries = self._load()
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        now = time.time()
+        if now - entry["created"] > self.ttl:
+            del entries[key]
+            return None
+        entry["used"] = now
+        self._touched()
+        return entry["response"]
+
+    def put(self, key: str, response: str):
+        entries = self._load()
+        now = time.time()
+        entries[key] = {"response": response, "created": now, "used": now}
+        if len(entries) > self.max_entries:
+            oldest = sorted(entries, key=lambda k: entries[k]["used"])
+            for stale in oldest[:len(entries) - self.max_entries]:
+                del entries[stale]
+        self._save()
+
+    def flush(self):
+        """write use times recorded since the last save"""
+        if self._dirty:
+            self._save()
+
+    def clear(self):
+        self._entries = {}
+        self._save()
+
+    def __len__(self):
+        return len(self._load())
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path) as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+            now = time.time()
+            self._entries = {k: v for k, v in entries.items()
+                             if isinstance(v, dict) and now - v.get("created", 0) <= self.ttl}
+        return self._entries
+
+    def _touched(self):
+        self._dirty = True
+        if not self._flush_at_exit:
+            atexit.register(self.flush)
+            self._flush_at_exit = True
+        if time.monotonic() - self._saved >= SAVE_INTERVAL:
+            self._save()
+
+    def _save(self):
+        self._dirty = False
+        self._saved = time.monotonic()
+        # write to a temp file first so a crash never leaves half a cache
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
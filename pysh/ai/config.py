@@ -0,0 +1,89 @@
+'''
+AI settings for pysh, read once from the project's .env file
+
+the file is parsed on first use and kept in memory. later lookups are dict
+hits; the file's mtime is checked at most once per REVALIDATE_INTERVAL and
+it is parsed again only when the mtime moved. environment variables take
+precedence over the file, as with dotenv.load_dotenv.
+
+GEMINI_API_KEY      api key for the Gemini API
+PYSH_AI_MODEL       model name (default gemini-2.0-flash)
+PYSH_AI_TIMEOUT     seconds before a request is abandoned (default 30)
+PYSH_AI_BASE_URL    send requests over plain HTTP to this address instead
+                    of through google.generativeai
+'''
+
+import os
+import time
+from pathlib import Path
+
+import dotenv
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+DEFAULT_TIMEOUT = 30.0
+
+# minimum seconds between checking the .env file's mtime
+REVALIDATE_INTERVAL = 1.0
+
+
+def project_env_path() -> Path:
+    """the .env file in the project root, two levels above this file"""
+    return Path(__file__).resolve().parents[2] / '.env'
+
+
+class Config:
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else project_env_path()
+        self._values = None     # parsed .env contents
+        self._mtime = None      # mtime of the .env file when parsed
+        self._checked = 0.0
+
+    def get(self, name: str, default=None):
+        """a setting from the environment or the .env file"""
+        value = os.environ.get(name)
+        if value:
+            return value
+        self._refresh()
+        return self._values.get(name) or default
+
+    def api_key(self):
+        return self.get("GEMINI_API_KEY")
+
+    def model_name(self):
+        return self.get("PYSH_AI_MODEL", DEFAULT_MODEL)
+
+    def timeout(self) -> float:
+        try:
+            return float(self.get("PYSH_AI_TIMEOUT", DEFAULT_TIMEOUT))
+        except ValueError:
+            return DEFAULT_TIMEOUT
+
+    def base_url(self):
+        return self.get("PYSH_AI_BASE_URL")
+
+    def reload(self):
+        """forget the parsed file; the next lookup reads it again"""
+        self._values = None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._values is not None and now - self._checked < REVALIDATE_INTERVAL:
+            return
+        self._checked = now
+        mtime = _mtime(self.path)
+        if self._values is not None and mtime == self._mtime:
+            return
+        self._values = dotenv.dotenv_values(self.path) if mtime is not None else {}
+        self._mtime = mtime
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+# the session-wide settings used by the AI helpers
+config = Config()
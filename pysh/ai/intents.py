@@ -0,0 +1,266 @@
+'''
+local intent matcher for `!` requests
+
+a table of instruction patterns mapped to commands, consulted before the
+model. it is seeded with phrases for pysh's own builtins and grows with the
+AI answers the user accepted (ran successfully), which are kept on disk.
+
+patterns are split into content words and indexed by word, and by character
+trigram for typos. an instruction is matched against the patterns sharing a
+word with it; it is a hit only when every word of the instruction is known
+to the patterns of one command and one of those patterns is mostly covered
+in return, so "list files in /etc" does not come back as `ls`.
+
+operands (paths, names, numbers, and any word a learned command uses
+verbatim) are only ever matched exactly; only the phrasing around them is
+matched loosely, so "delete the release-2023-02 folder" never runs the
+`rm` learned for release-2023-01. lookups are dict hits and a few set
+operations, well under a millisecond.
+'''
+
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+from ai.cache import normalize
+from registry import builtin_registry
+
+# score (0..1) a match needs to be answered locally
+CONFIDENCE = 0.8
+# how alike two words must be (trigram Dice) to count as the same word
+WORD_SIMILARITY = 0.7
+# learned patterns kept on disk before the oldest are dropped
+DEFAULT_MAX_LEARNED = 500
+
+# words that carry no intent
+STOPWORDS = frozenset("""
+    a an the this that these those here there in of on for to me my i
+    please can you could would just all now what whats is are
+""".split())
+
+# phrases for the builtins: command -> ways people ask for it
+BUILTIN_INTENTS = {
+    "ls": ["list files", "list the files here", "show files", "what files are here",
+           "list directory", "directory contents", "list folder"],
+    "pwd": ["where am i", "current directory", "print working directory",
+            "which directory am i in", "current folder", "show path"],
+    "disk": ["disk usage", "show disk usage", "disk space", "free disk space",
+             "how much disk space is left"],
+    "mem": ["memory usage", "show memory usage", "ram usage", "free memory",
+            "how much memory is free"],
+    "cpu": ["cpu usage", "show cpu usage", "processor usage", "cpu load"],
+    "ps": ["running processes", "list processes", "show processes", "process list",
+           "what is running"],
+    "jobs": ["background jobs", "list jobs", "show jobs"],
+    "hash": ["remembered commands", "command hash table"],
+}
+
+
+def _default_path() -> Path:
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "pysh" / "ai_intents.json"
+
+
+def words(text: str):
+    """content words of an instruction, lightly stemmed"""
+    result = []
+    for word in re.findall(r"[\w./~-]+", normalize(text)):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        result.append(word)
+    return result
+
+
+def _is_operand(word):
+    """a path, a file name or a number rather than a word of phrasing"""
+    return any(c.isdigit() or c in "./~-_" for c in word)
+
+
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Intent:
+
+    __slots__ = ("pattern", "command", "source", "words", "operands")
+
+    def __init__(self, pattern: str, command: str, source: str):
+        self.pattern = pattern
+        self.command = command
+        self.source = source        # "builtin" or "learned"
+        self.words = set(words(pattern))
+        # words that must be in the instruction as they are
+        used = set(words(command))
+        self.operands = {word for word in self.words if _is_operand(word) or word in used}
+
+
+class IntentIndex:
+
+    def __init__(self, path=None, max_learned=DEFAULT_MAX_LEARNED):
+        self.path = Path(path) if path else _default_path()
+        self.max_learned = max_learned
+        self.intents = []
+        self._by_word = {}          # word -> indexes into self.intents
+        self._by_trigram = {}       # trigram -> words of the vocabulary
+        self._fuzzy = set()         # the words in _by_trigram, operands left out
+        self._vocab = {}            # command -> words of all its patterns
+        self._learned = None        # normalized instruction -> {"command", "used"}
+        self.hits = 0
+        self.misses = 0
+        self.match_seconds = 0.0
+
+    def match(self, instruction: str):
+        """the command for a confidently matched instruction, or None"""
+        self._load()
+        start = time.perf_counter()
+        command = self._match(words(instruction))
+        self.match_seconds += time.perf_counter() - start
+        if command is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return command
+
+    def learn(self, instruction: str, command: str):
+        """remember an AI answer the user ran successfully"""
+        self._load()
+        key = normalize(instruction)
+        if not words(key):
+            return
+        known = self._learned.get(key)
+        self._learned[key] = {"command": command, "used": time.time()}
+        if known is None:
+            self._add(key, command, "learned")
+        elif known["command"] != command:
+            self._rebuild()
+        if len(self._learned) > self.max_learned:
+            oldest = sorted(self._learned, key=lambda k: self._learned[k]["used"])
+            for stale in oldest[:len(self._learned) - self.max_learned]:
+                del self._learned[stale]
+            self._rebuild()
+        self._save()
+
+    def stats(self):
+        """summary lines for `--ai-stats`"""
+        self._load()
+        learned = sum(1 for intent in self.intents if intent.source == "learned")
+        asked = self.hits + self.misses
+        rate = f"{100 * self.hits / asked:.0f}%" if asked else "-"
+        avg_ms = f"{1000 * self.match_seconds / asked:.3f} ms" if asked else "-"
+        return [
+            f"intents: {len(self.intents)} patterns ({len(self.intents) - learned} builtin, {learned} learned)",
+            f"local hits: {self.hits}, misses sent to the model: {self.misses}, hit rate {rate}",
+            f"average match time: {avg_ms}",
+        ]
+
+    def _match(self, query):
+        if not query:
+            return None
+        # the vocabulary words each query word stands for, with their similarity
+        expanded = [self._similar(word) for word in query]
+        candidates = set()
+        for similar in expanded:
+            for word in similar:
+                candidates.update(self._by_word.get(word, ()))
+
+        exact = set(query)
+        scores = {}     # command -> best score
+        for i in candidates:
+            intent = self.intents[i]
+            if not intent.operands <= exact:
+                # a different file, number or name: not the same request
+                continue
+            # every query word must be known to some pattern of the command
+            vocab = self._vocab[intent.command]
+            covered = [max((score for word, score in similar.items() if word in vocab), default=0.0)
+                       for similar in expanded]
+            if min(covered) == 0.0:
+                continue
+            recall = sum(covered) / len(covered)
+            matched = {word for similar in expanded for word in similar if word in intent.words}
+            precision = len(matched) / len(intent.words)
+            score = 2 * recall * precision / (recall + precision)
+            if score > scores.get(intent.command, 0.0):
+                scores[intent.command] = score
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < CONFIDENCE:
+            return None
+        if len(ranked) > 1 and ranked[1][1] >= ranked[0][1] - 0.05:
+            # two commands fit about as well: let the model decide
+            return None
+        return ranked[0][0]
+
+    def _similar(self, word):
+        """vocabulary words alike to word -> similarity"""
+        if word in self._by_word:
+            return {word: 1.0}
+        if _is_operand(word):
+            return {}
+        grams = _trigrams(word)
+        counts = {}
+        for gram in grams:
+            for other in self._by_trigram.get(gram, ()):
+                counts[other] = counts.get(other, 0) + 1
+        similar = {}
+        for other, shared in counts.items():
+            dice = 2 * shared / (len(grams) + len(_trigrams(other)))
+            if dice >= WORD_SIMILARITY:
+                similar[other] = dice
+        return similar
+
+    def _add(self, pattern, command, source):
+        intent = Intent(pattern, command, source)
+        if not intent.words:
+            return
+        index = len(self.intents)
+        self.intents.append(intent)
+        self._vocab.setdefault(command, set()).update(intent.words)
+        for word in intent.words:
+            if word not in self._fuzzy and word not in intent.operands:
+                self._fuzzy.add(word)
+                for gram in _trigrams(word):
+                    self._by_trigram.setdefault(gram, set()).add(word)
+            self._by_word.setdefault(word, set()).add(index)
+
+    def _rebuild(self):
+        self.intents = []
+        self._by_word = {}
+        self._by_trigram = {}
+        self._fuzzy = set()
+        self._vocab = {}
+        for command, phrases in BUILTIN_INTENTS.items():
+            if command.split()[0] not in builtin_registry:
+                continue
+            for phrase in phrases:
+                self._add(phrase, command, "builtin")
+        for pattern, entry in self._learned.items():
+            self._add(pattern, entry["command"], "learned")
+
+    def _load(self):
+        if self._learned is not None:
+            return
+        try:
+            with open(self.path) as f:
+                learned = json.load(f)
+        except (OSError, ValueError):
+            learned = {}
+        self._learned = {k: v for k, v in learned.items()
+                         if isinstance(v, dict) and isinstance(v.get("command"), str)}
+        self._rebuild()
+
+    def _save(self):
+        # write to a temp file first so a crash never leaves half a table
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(self._learned, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
@@ -0,0 +1,58 @@
+'''
+spinner shown while the AI is working
+
+draws one status line on stderr, redrawn in place: a spinner frame, the
+elapsed time and the tail of the answer streamed so far. The line is wiped
+when the spinner closes, so the prompt or the command's output starts clean.
+Nothing is drawn when stderr is not a terminal.
+'''
+
+import shutil
+import sys
+import time
+
+FRAMES = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+
+# ANSI color for light grey
+LOG_COLOR = "\033[90m"
+RESET_COLOR = "\033[0m"
+
+
+class Spinner:
+
+    def __init__(self, label: str, stream=None):
+        self.label = label
+        self.stream = stream or sys.stderr
+        self.enabled = self.stream.isatty()
+        self.started = time.monotonic()
+        self.frame = 0
+
+    def update(self, text: str = ""):
+        """Redraw the status line; text is the answer received so far."""
+        if not self.enabled:
+            return
+        elapsed = time.monotonic() - self.started
+        head = f"{FRAMES[self.frame % len(FRAMES)]} {self.label} {elapsed:.1f}s"
+        self.frame += 1
+        width = shutil.get_terminal_size().columns
+        tail = " ".join(text.split())
+        room = width - len(head) - 3
+        if tail and room > 10:
+            if len(tail) > room:
+                tail = "…" + tail[-(room - 1):]
+            head = f"{head}  {tail}"
+        self.stream.write(f"\r\033[K{LOG_COLOR}{head[:width - 1]}{RESET_COLOR}")
+        self.stream.flush()
+
+    def close(self):
+        if self.enabled:
+            self.stream.write("\r\033[K")
+            self.stream.flush()
+
+    def __enter__(self):
+        self.update()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,208 @@
+'''
+multi-step plans from the AI
+
+one request returns every command a task needs as JSON, each step listing
+the steps it has to wait for:
+
+    {"steps": [{"id": 1, "command": "git init", "needs": []},
+               {"id": 2, "command": "touch README.md", "needs": []},
+               {"id": 3, "command": "git add .", "needs": [1, 2]},
+               {"id": 4, "command": "git commit -m first", "needs": [3]}]}
+
+run_steps() executes them through the normal checker and executor. a step is
+checked only once the steps it needs have finished (they may create what it
+uses), steps whose needs are met run at the same time on a thread pool, and
+each step's output is printed in one piece when it ends. a step that fails
+skips everything that needs it.
+'''
+
+import io
+import json
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import streams
+from checker import SemanticChecker
+from executor import Executor
+from lexer.lexer import lexer
+from parser.parser import parser
+from plan import compile_plan
+
+# appended to the prompt of a plan request
+PLAN_FORMAT = (
+    'Reply with JSON only, no prose and no code fences, in the form '
+    '{"steps": [{"id": 1, "command": "...", "needs": []}]}. '
+    'Each command is a single line. "needs" lists the ids of the steps that '
+    'must finish first; leave it empty when a step does not depend on others, '
+    'so it can run at the same time. Use as few steps as the task needs.'
+)
+
+# most steps that run at once; steps mostly wait on processes, not the CPU
+MAX_WORKERS = 8
+
+# status recorded for steps skipped because a step they need failed
+SKIPPED = -1
+
+# commands that change state every later step sees; they run on their own
+_EXCLUSIVE = {"cd"}
+
+_FENCE = re.compile(r"^```[\w-]*\n?|\n?```$")
+
+
+class Step:
+
+    def __init__(self, step_id, command: str, needs=()):
+        # ids are kept as strings: models mix 1 and "1"
+        self.id = str(step_id)
+        self.command = command
+        self.needs = [str(need) for need in needs]
+        self.exclusive = command.split(None, 1)[0] in _EXCLUSIVE
+
+    def __repr__(self):
+        return f"Step({self.id!r}, {self.command!r}, needs={self.needs!r})"
+
+
+def parse_steps(text: str):
+    """
+    Turn the model's answer into a list of Steps. An answer that is not JSON
+    is taken as a single command. Raises ValueError for a malformed plan.
+    """
+    text = _FENCE.sub("", text.strip()).strip()
+    if not text.startswith(("{", "[")):
+        if not text or "\n" in text:
+            raise ValueError("the AI answer is not a plan")
+        return [Step(1, text)]
+
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"the AI plan is not valid JSON: {e}") from None
+    items = data.get("steps") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError("the AI plan has no steps")
+
+    steps = []
+    for i, item in enumerate(items, 1):
+        if not isinstance(item, dict) or not str(item.get("command", "")).strip():
+            raise ValueError(f"step {i} of the AI plan has no command")
+        needs = item.get("needs", item.get("depends_on")) or []
+        if not isinstance(needs, list):
+            needs = [needs]
+        steps.append(Step(item.get("id", i), str(item["command"]).strip(), needs))
+
+    ids = [step.id for step in steps]
+    if len(set(ids)) != len(ids):
+        raise ValueError("the AI plan repeats a step id")
+    for step in steps:
+        unknown = [need for need in step.needs if need not in ids]
+        if unknown:
+            raise ValueError(f"step {step.id} of the AI plan needs unknown step {unknown[0]}")
+    _check_acyclic(steps)
+    return steps
+
+
+def _check_acyclic(steps):
+    done = set()
+    remaining = list(steps)
+    while remaining:
+        ready = [step for step in remaining if all(need in done for need in step.needs)]
+        if not ready:
+            raise ValueError("the steps of the AI plan depend on each other in a cycle")
+        done.update(step.id for step in ready)
+        remaining = [step for step in remaining if step.id not in done]
+
+
+def describe(steps):
+    """One line per step, for showing the plan before it runs."""
+    lines = []
+    for step in steps:
+        after = f"  (after {', '.join(step.needs)})" if step.needs else ""
+        lines.append(f"  [{step.id}] {step.command}{after}")
+    return lines
+
+
+def _compile(command, checker):
+    """Parse and check one step like a typed command line."""
+    step_lexer = lexer.clone()
+    step_lexer.is_command_position = True
+    ast_root = parser.parse(command, lexer=step_lexer)
+    checker.check(ast_root)
+    return compile_plan(ast_root, checker.checked)
+
+
+def _run_step(plan, children):
+    """Run one step with its output captured; returns (status, output, seconds)."""
+    out = io.StringIO()
+    start = time.perf_counter()
+    with streams.redirect(stdout=out):
+        status = Executor(stream=False, children=children).run(plan)
+    return status, out.getvalue(), time.perf_counter() - start
+
+
+def _report(step, status, output=""):
+    if status == SKIPPED:
+        print(f"[{step.id}] {step.command}: skipped, a step it needs failed")
+        return
+    print(f"[{step.id}] {step.command}" + (f"  (exit {status})" if status else ""))
+    if output:
+        print(output, end="" if output.endswith("\n") else "\n")
+
+
+def run_steps(steps, jobs=None):
+    """
+    Run a plan's steps, each as soon as the steps it needs succeeded.
+    Parsing and checking happen on this thread; workers only execute.
+    Returns 0 if every step succeeded, else the status of the last failure.
+    """
+    checker = SemanticChecker()
+    results = {}            # step id -> exit status
+    pending = list(steps)
+    running = {}            # future -> step
+    children = []           # processes the steps started, killed on Ctrl+C
+    pool = ThreadPoolExecutor(max_workers=jobs or MAX_WORKERS)
+    try:
+        while pending or running:
+            for step in list(pending):
+                if any(other.exclusive for other in running.values()):
+                    break
+                if not all(need in results for need in step.needs):
+                    continue
+                if any(results[need] != 0 for need in step.needs):
+                    pending.remove(step)
+                    results[step.id] = SKIPPED
+                    _report(step, SKIPPED)
+                    continue
+                if step.exclusive and running:
+                    break
+                pending.remove(step)
+                try:
+                    plan = _compile(step.command, checker)
+                except (RuntimeError, SyntaxError) as e:
+                    results[step.id] = 2 if isinstance(e, SyntaxError) else 127
+                    _report(step, results[step.id], f"{e}\n")
+                    continue
+                running[pool.submit(_run_step, plan, children)] = step
+                if step.exclusive:
+                    break
+
+            if not running:
+                # steps skipped or rejected above may have unblocked others
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                status, output, _ = future.result()
+                results[step.id] = status
+                _report(step, status, output)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        for proc in children:
+            if proc.poll() is None:
+                proc.kill()
+        print("\nplan interrupted")
+        return 130
+    pool.shutdown()
+
+    failed = [status for status in results.values() if status not in (0, SKIPPED)]
+    return failed[-1] if failed else 0
@@ -0,0 +1,80 @@
+'''
+transports that carry a prompt to the model and stream the answer back
+
+a transport only has to implement stream(prompt, cancel), yielding text
+chunks as the model emits them and stopping early once cancel is set.
+
+GeminiSDKTransport  google.generativeai, the default
+HTTPTransport       the Gemini REST API over plain HTTP (server-sent events);
+                    point base_url at a local stand-in server to test
+                    latency, timeouts and cancellation without the network
+'''
+
+import abc
+import json
+import urllib.parse
+import urllib.request
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com"
+
+
+class Transport(abc.ABC):
+
+    @abc.abstractmethod
+    def stream(self, prompt: str, cancel):
+        """yield the answer to prompt in chunks; stop once cancel.is_set()"""
+
+
+class GeminiSDKTransport(Transport):
+
+    def __init__(self, model):
+        # a configured genai.GenerativeModel (or anything shaped like one)
+        self.model = model
+
+    def stream(self, prompt, cancel):
+        try:
+            response = self.model.generate_content(prompt, stream=True)
+        except TypeError:
+            # stand-in models without streaming support
+            response = self.model.generate_content(prompt)
+        if not hasattr(response, "__iter__"):
+            yield response.text
+            return
+        for chunk in response:
+            if cancel.is_set():
+                return
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+
+class HTTPTransport(Transport):
+
+    def __init__(self, api_key, model, base_url=GEMINI_API_URL, timeout=30.0):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        # socket timeout for connecting and between chunks
+        self.timeout = timeout
+
+    def stream(self, prompt, cancel):
+        query = urllib.parse.urlencode({"alt": "sse", "key": self.api_key or ""})
+        url = f"{self.base_url}/v1beta/models/{self.model}:streamGenerateContent?{query}"
+        body = json.dumps({"contents": [{"parts": [{"text": prompt}]}]}).encode()
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            for raw in response:
+                if cancel.is_set():
+                    return
+                line = raw.decode("utf-8", "replace").strip()
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    event = json.loads(line[len("data:"):])
+                except ValueError:
+                    continue
+                for candidate in event.get("candidates", []):
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+benchmark for the cp builtin (commands/cp.py)
+
+Times three copies with the builtin and with coreutils cp started the way
+pysh used to start it (one subprocess per command): one large file of
+--size MiB, --commands small single-file copies, and cp -r of a tree of
+--dirs directories with --files files each.
+
+    python bench/cp_bench.py [--size 512] [--commands 200] [--dirs 50] [--files 200] [--dir /tmp]
+
+Each case runs --runs times and the best time is reported.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from commands import cp
+
+_devnull = open(os.devnull, "w")
+
+
+def _builtin(args):
+    saved, sys.stdout = sys.stdout, _devnull
+    try:
+        return cp.run(args)
+    finally:
+        sys.stdout = saved
+
+
+def _coreutils(args):
+    # --preserve to do what the builtin does
+    return subprocess.run(["cp", "--preserve=mode,timestamps", *args]).returncode
+
+
+def _best(runs, setup, copy):
+    times = []
+    for _ in range(runs):
+        args = setup()
+        start = time.perf_counter()
+        copy(args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _case(label, runs, setup, copy_args):
+    builtin = _best(runs, setup, lambda args: [_builtin(a) for a in copy_args(args)])
+    coreutils = _best(runs, setup, lambda args: [_coreutils(a) for a in copy_args(args)])
+    print(f"{label:<34} builtin {builtin:7.3f} s  coreutils {coreutils:7.3f} s  "
+          f"({coreutils / builtin:.2f}x)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--size", type=int, default=512, help="MiB in the large file")
+    arg_parser.add_argument("--commands", type=int, default=200, help="single-file copy commands")
+    arg_parser.add_argument("--dirs", type=int, default=50, help="directories in the tree")
+    arg_parser.add_argument("--files", type=int, default=200, help="files per directory in the tree")
+    arg_parser.add_argument("--runs", type=int, default=3, help="times each case runs")
+    arg_parser.add_argument("--dir", default=None, help="where to put the files")
+    args = arg_parser.parse_args()
+    if not shutil.which("cp"):
+        raise SystemExit("coreutils cp not found")
+
+    work = tempfile.mkdtemp(prefix="pysh-cp-bench-", dir=args.dir)
+    try:
+        big = os.path.join(work, "big")
+        with open(big, "wb") as f:
+            for _ in range(args.size):
+                f.write(os.urandom(1 << 20))
+        small = os.path.join(work, "small")
+        with open(small, "wb") as f:
+            f.write(os.urandom(4096))
+        tree = os.path.join(work, "tree")
+        for d in range(args.dirs):
+            os.makedirs(os.path.join(tree, f"d{d}"))
+            for i in range(args.files):
+                with open(os.path.join(tree, f"d{d}", f"f{i}"), "wb") as f:
+                    f.write(os.urandom(1024))
+        out = os.path.join(work, "out")
+
+        def fresh():
+            shutil.rmtree(out, ignore_errors=True)
+            os.mkdir(out)
+            return out
+
+        _case(f"one {args.size} MiB file", args.runs, fresh,
+              lambda out: [[big, os.path.join(out, "big")]])
+        _case(f"{args.commands} commands copying 4 KiB", args.runs, fresh,
+              lambda out: [[small, os.path.join(out, f"s{i}")] for i in range(args.commands)])
+        _case(f"cp -r of {args.dirs * args.files} files", args.runs, fresh,
+              lambda out: [["-r", tree, os.path.join(out, "tree")]])
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
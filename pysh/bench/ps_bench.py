@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+benchmark for the ps engine (monitor/procs.py)
+
+Runs ProcessTable against a synthetic process table of --procs processes,
+with a fraction of pids replaced every tick, and reports the time per tick
+for sampling plus picking the top rows. For comparison it also times the
+previous approach: new Process handles every tick and a full sort.
+
+    python bench/ps_bench.py [--procs 50000] [--ticks 10] [--churn 0.01] [-n 10]
+    python bench/ps_bench.py --real [--procs 50000] [--ticks 10] [-n 10]
+
+The synthetic table does no /proc I/O, so it measures the engine's own
+bookkeeping only. --real runs both against this machine's processes
+through psutil instead, with psutil.process_iter() as the baseline, and
+scales the time per process up to --procs processes.
+
+The engine keeps up when a tick takes less than the sampling interval.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+from pathlib import Path
+
+import psutil
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from monitor.procs import ProcessTable, top
+from monitor.sampler import DEFAULT_INTERVAL
+
+MemInfo = namedtuple("MemInfo", "rss vms")
+IOCounters = namedtuple("IOCounters", "read_count write_count read_bytes write_bytes")
+
+
+class FakeProcess:
+    """
+    Just enough of psutil.Process, with cheap made-up numbers. Creating one
+    costs next to nothing, as it must for the rebuild baseline to be fair.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._io = 0
+
+    def name(self):
+        return f"proc-{self.pid}"
+
+    def create_time(self):
+        # FakeSystem never hands out a pid twice
+        return 0.0
+
+    def oneshot(self):
+        return nullcontext()
+
+    def cpu_percent(self):
+        return random.random() * 100
+
+    def memory_info(self):
+        return MemInfo(random.randrange(1 << 30), 0)
+
+    def io_counters(self):
+        self._io += random.randrange(1 << 16)
+        return IOCounters(0, 0, self._io, 0)
+
+
+class FakeSystem:
+    """A pid list of a fixed size where some processes exit every tick."""
+
+    def __init__(self, procs, churn):
+        self.pids = list(range(1, procs + 1))
+        self.next_pid = procs + 1
+        self.churn = churn
+
+    def tick(self):
+        for _ in range(int(len(self.pids) * self.churn)):
+            self.pids[random.randrange(len(self.pids))] = self.next_pid
+            self.next_pid += 1
+
+    def list_pids(self):
+        return list(self.pids)
+
+
+def _bench(label, ticks, tick, step, procs):
+    times = []
+    for _ in range(ticks):
+        tick()
+        start = time.perf_counter()
+        step()
+        times.append(time.perf_counter() - start)
+    mean, worst = statistics.mean(times), max(times)
+    verdict = "keeps up" if worst < DEFAULT_INTERVAL else "falls behind"
+    print(f"{label:<28} mean {mean * 1000:8.1f} ms  max {worst * 1000:8.1f} ms  "
+          f"{mean / procs * 1e6:6.1f} us/process  ({verdict} at a {DEFAULT_INTERVAL:g}s interval)")
+    return mean / procs
+
+
+def _real(args):
+    procs = len(psutil.pids())
+    print(f"{procs} real processes, top {args.n}")
+    engine = ProcessTable()
+    engine.prime()
+    per_process = {}
+    for key, io in (("cpu", False), ("rss", False), ("io", True)):
+        per_process[key] = _bench(f"ProcessTable, by {key}", args.ticks, _pause,
+                                  lambda: top(engine.sample(io=io), key, args.n), procs)
+
+    def process_iter_and_sort():
+        rows = [(proc.pid, proc.info["name"], proc.info["cpu_percent"], proc.info["memory_info"])
+                for proc in psutil.process_iter(["name", "cpu_percent", "memory_info"])]
+        rows.sort(key=lambda row: row[2] or 0.0, reverse=True)
+        return rows[:args.n]
+
+    process_iter_and_sort()
+    per_process["process_iter"] = _bench("process_iter + full sort", args.ticks, _pause,
+                                         process_iter_and_sort, procs)
+    print(f"at {args.procs} processes a tick would take about: "
+          + ", ".join(f"{label} {cost * args.procs:.1f}s" for label, cost in per_process.items()))
+
+
+def _pause():
+    # cpu_percent() needs some time between calls to measure anything
+    time.sleep(0.05)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--procs", type=int, default=50000, help="processes in the synthetic table")
+    arg_parser.add_argument("--ticks", type=int, default=10, help="refreshes to time")
+    arg_parser.add_argument("--churn", type=float, default=0.01, help="fraction of pids replaced per tick")
+    arg_parser.add_argument("--real", action="store_true", help="sample this machine's processes instead")
+    arg_parser.add_argument("-n", type=int, default=10, help="rows shown")
+    args = arg_parser.parse_args()
+
+    if args.real:
+        _real(args)
+        return
+
+    print(f"{args.procs} processes, {args.churn:.1%} churn per tick, top {args.n}")
+
+    system = FakeSystem(args.procs, args.churn)
+    engine = ProcessTable(pids=system.list_pids, process=FakeProcess)
+    engine.prime()
+    for key, io in (("cpu", False), ("rss", False), ("io", True)):
+        _bench(f"ProcessTable, by {key}", args.ticks, system.tick,
+               lambda: top(engine.sample(io=io), key, args.n), args.procs)
+
+    def rebuild_and_sort():
+        rows = []
+        for pid in system.list_pids():
+            proc = FakeProcess(pid)
+            rows.append((pid, proc.name(), proc.cpu_percent(), proc.memory_info().rss))
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows[:args.n]
+
+    _bench("rebuild + full sort", args.ticks, system.tick, rebuild_and_sort, args.procs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+benchmark for the rm engine (commands/rm.py)
+
+Builds the same synthetic tree once per run, --fanout subdirectories per
+directory down to --depth levels with --files small files in each, and
+times removing it with shutil.rmtree (what rm used before) and with the
+fd-relative Remover at 1 and at --workers threads.
+
+    python bench/rm_bench.py [--fanout 8] [--depth 3] [--files 200] [--workers 8] [--dir /tmp]
+
+Use --dir to put the trees on the filesystem you care about; the speedup
+from more workers depends on the filesystem and on the number of CPUs.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from commands.rm import RM_WORKERS, Remover
+
+
+def _build(root, fanout, depth, files):
+    """The synthetic tree under root; returns (files, directories) made."""
+    made_files = made_dirs = 0
+    level = [root]
+    for d in range(depth + 1):
+        next_level = []
+        for path in level:
+            for i in range(files):
+                with open(os.path.join(path, f"f{i}"), "wb") as f:
+                    f.write(b"x")
+            made_files += files
+            if d < depth:
+                for i in range(fanout):
+                    sub = os.path.join(path, f"d{i}")
+                    os.mkdir(sub)
+                    next_level.append(sub)
+                made_dirs += fanout
+        level = next_level
+    return made_files, made_dirs
+
+
+def _bench(label, args, remove):
+    root = tempfile.mkdtemp(prefix="pysh-rm-bench-", dir=args.dir)
+    files, dirs = _build(root, args.fanout, args.depth, args.files)
+    os.sync()
+    start = time.perf_counter()
+    remove(root)
+    seconds = time.perf_counter() - start
+    if os.path.exists(root):
+        raise SystemExit(f"{label}: {root} was not removed")
+    print(f"{label:<24} {seconds:8.2f} s  {(files + dirs) / seconds:10.0f} entries/s")
+    return seconds
+
+
+def _remover(workers):
+    def remove(root):
+        remover = Remover(workers=workers)
+        try:
+            remover.remove(root)
+        finally:
+            remover.close()
+    return remove
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--fanout", type=int, default=8, help="subdirectories per directory")
+    arg_parser.add_argument("--depth", type=int, default=3, help="levels of subdirectories")
+    arg_parser.add_argument("--files", type=int, default=200, help="files per directory")
+    arg_parser.add_argument("--workers", type=int, default=RM_WORKERS, help="threads for the parallel run")
+    arg_parser.add_argument("--dir", default=None, help="where to build the trees")
+    args = arg_parser.parse_args()
+
+    dirs = sum(args.fanout ** d for d in range(args.depth + 1))
+    print(f"{dirs} directories, {dirs * args.files} files per tree, {os.cpu_count()} CPUs")
+
+    baseline = _bench("shutil.rmtree", args, shutil.rmtree)
+    for workers in sorted({1, args.workers}):
+        seconds = _bench(f"Remover, {workers} worker{'s' * (workers > 1)}", args, _remover(workers))
+        print(f"{'':<24} {baseline / seconds:8.2f}x shutil.rmtree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+benchmark for the spawn backend (spawn.py)
+
+Grows this process to each --rss size with touched ballast memory, the way
+a long pysh session grows, and at each size starts --spawns short commands
+(/bin/true) with:
+
+    posix_spawn       spawn.spawn with the posix_spawn backend
+    subprocess        subprocess.Popen, the default backend on Python 3.11+
+    subprocess+fork   Popen with a preexec_fn, which forces a real fork()
+
+and reports spawns per second for each.
+
+    python bench/spawn_bench.py [--rss 0,256,1024,2048] [--spawns 500] [--command /bin/true]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from spawn import spawn
+
+
+def _rss_mib():
+    with open(f"/proc/{os.getpid()}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+
+
+def _rate(spawns, start_one):
+    start = time.perf_counter()
+    for _ in range(spawns):
+        start_one().wait()
+    return spawns / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--rss", default="0,256,1024,2048", help="parent sizes to test, in MiB")
+    arg_parser.add_argument("--spawns", type=int, default=500, help="commands started per measurement")
+    arg_parser.add_argument("--command", default="/bin/true", help="command to start")
+    args = arg_parser.parse_args()
+
+    argv = [args.command]
+    methods = {
+        "posix_spawn": lambda: spawn(argv, args.command, backend="posix_spawn"),
+        "subprocess": lambda: subprocess.Popen(argv, executable=args.command),
+        "subprocess+fork": lambda: subprocess.Popen(argv, executable=args.command, preexec_fn=lambda: None),
+    }
+    print(f"{'parent RSS':>12}" + "".join(f"{name:>18}" for name in methods) + "   (spawns/s)")
+
+    ballast = []
+    for size in (int(mib) for mib in args.rss.split(",")):
+        grow = size - _rss_mib()
+        if grow > 0:
+            # bytearray() zero-fills, so every page is really resident
+            ballast.append(bytearray(int(grow * (1 << 20))))
+        rates = [_rate(args.spawns, start_one) for start_one in methods.values()]
+        print(f"{_rss_mib():>8.0f} MiB" + "".join(f"{rate:>18.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
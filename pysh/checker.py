@@ -3,16 +3,16 @@ semantic checker for pysh
 """
 
 import os
-import shutil
 from parser.node import Node
-
-# define built-in commands for mandatory requirements
-BUILTIN_COMMANDS = {"cd", "cpu", "disk", "ls", "mem", "mkdir", "pwd", "rm"}
+from cmdhash import command_hash
+from registry import builtin_registry
 
 
 class SemanticChecker:
     def __init__(self):
-        pass
+        # (command, argument) pairs validated by the last check(), so a
+        # cached plan can re-validate them before it is reused
+        self.checked = []
 
     def check(self, root: Node):
         """
@@ -21,20 +21,33 @@ class SemanticChecker:
         """
         if root is None:
             raise RuntimeError("Empty parse tree")
+        self.checked = []
         self.check_node(root)
 
-    def check_node(self, node: Node):
+    def check_node(self, node: Node, check_args: bool = True):
         """
         Recursively check a node and its children.
         """
         if node.name == "Command":
-            self.check_command(node)
+            self.check_command(node, check_args)
+        elif node.name == "Statement":
+            self.check_list(node)
         else:
             # Recurse through children
             for child in getattr(node, "children", []):
-                self.check_node(child)
+                self.check_node(child, check_args)
+
+    def check_list(self, statement_node: Node):
+        """
+        Check the items of a command list (a; b && c || d).
+        Only the first item's arguments are checked against the filesystem,
+        later items may depend on what earlier ones do (mkdir x && cd x).
+        """
+        items = [c for c in statement_node.children if c.name != "OPERATOR"]
+        for i, item in enumerate(items):
+            self.check_node(item, check_args=(i == 0))
 
-    def check_command(self, command_node: Node):
+    def check_command(self, command_node: Node, check_args: bool = True):
         """
         Check the command node:
         - Validate COMMAND_NAME
@@ -51,18 +64,42 @@ class SemanticChecker:
         if not self.command_exists(cmd_name):
             raise RuntimeError(f"Command not found: {cmd_name}")
 
+        if not check_args:
+            return
+
         # Check arguments for built-ins
-        for arg_node in command_node.children[1:]:
-            arg_value = getattr(arg_node.token, "value", arg_node.token)
+        args = [getattr(arg_node.token, "value", arg_node.token) for arg_node in command_node.children[1:]]
+        if cmd_name == "rm":
+            args = self.rm_operands(args)
+        for arg_value in args:
             self.check_argument(cmd_name, arg_value)
+            self.checked.append((cmd_name, arg_value))
 
     def command_exists(self, cmd_name: str) -> bool:
         """
         Check if command is built-in or available in system PATH.
+        PATH lookups go through the shared command hash table.
         """
-        if cmd_name in BUILTIN_COMMANDS:
+        if cmd_name in builtin_registry:
             return True
-        return shutil.which(cmd_name) is not None
+        return command_hash.lookup(cmd_name) is not None
+
+    @staticmethod
+    def rm_operands(args: list) -> list:
+        """
+        The paths among rm's arguments that must exist: none with -f,
+        and options are not paths.
+        """
+        operands = []
+        for i, arg in enumerate(args):
+            if arg == "--":
+                operands.extend(args[i + 1:])
+                break
+            if arg == "--force" or (arg.startswith("-") and not arg.startswith("--") and "f" in arg):
+                return []
+            if not arg.startswith("-") or arg == "-":
+                operands.append(arg)
+        return operands
 
     def check_argument(self, cmd_name: str, arg_value: str):
         """
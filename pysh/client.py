@@ -0,0 +1,97 @@
+"""
+thin client for a resident pysh server (pysh --server, see server.py)
+
+`pysh --client -c COMMANDS` and `pysh --client SCRIPT` hand the commands
+to the server instead of starting a shell: the request carries the cwd,
+the environment and the commands, and this process's stdin, stdout and
+stderr go along as file descriptors, so the command's output is written
+straight to wherever ours goes. The server answers with the exit status.
+
+Only the standard library's socket and json are imported here, nothing of
+pysh itself, so the client costs little more than the interpreter start.
+Ctrl+C is passed on to the command; if the client goes away, the server
+stops the command.
+"""
+
+import json
+import os
+import signal
+import socket
+import sys
+
+USAGE = "usage: pysh --client (-c COMMANDS | SCRIPT)"
+
+
+def socket_path():
+    """$PYSH_SOCKET, else $XDG_RUNTIME_DIR/pysh.sock, else /tmp/pysh-UID.sock."""
+    path = os.getenv("PYSH_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "pysh.sock")
+    return f"/tmp/pysh-{os.getuid()}.sock"
+
+
+def _read_message(conn, buffer):
+    """One newline-terminated JSON message; returns (message, rest of buffer)."""
+    while b"\n" not in buffer:
+        chunk = conn.recv(4096)
+        if not chunk:
+            raise ConnectionError("the server closed the connection")
+        buffer += chunk
+    line, _, buffer = buffer.partition(b"\n")
+    return json.loads(line), buffer
+
+
+def run(source, name="-c"):
+    """Run pysh source on the server; returns its exit status."""
+    path = socket_path()
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+    except OSError as e:
+        print(f"pysh: no server on {path} ({e.strerror}); start one with pysh --server", file=sys.stderr)
+        return 2
+
+    request = {"source": source, "name": name, "cwd": os.getcwd(), "env": dict(os.environ)}
+    with conn:
+        sys.stdout.flush()
+        socket.send_fds(conn, [json.dumps(request).encode() + b"\n"], [0, 1, 2])
+        pgid = None
+        buffer = b""
+        try:
+            while True:
+                try:
+                    message, buffer = _read_message(conn, buffer)
+                    if "pgid" in message:
+                        # the process group running the command, for Ctrl+C
+                        pgid = message["pgid"]
+                        continue
+                    return message["status"]
+                except KeyboardInterrupt:
+                    if pgid is None:
+                        # not started yet: the server stops when we hang up
+                        return 130
+                    try:
+                        os.killpg(pgid, signal.SIGINT)
+                    except ProcessLookupError:
+                        pass
+        except ConnectionError as e:
+            print(f"pysh: {e}", file=sys.stderr)
+            return 2
+
+
+def main(args):
+    if len(args) == 2 and args[0] == "-c":
+        return run(args[1])
+    if len(args) == 1 and not args[0].startswith("-"):
+        try:
+            with open(args[0]) as f:
+                source = f.read()
+        except OSError as e:
+            print(f"pysh: {args[0]}: {e.strerror}", file=sys.stderr)
+            return 127
+        return run(source, args[0])
+    print(USAGE, file=sys.stderr)
+    return 2
@@ -0,0 +1,139 @@
+"""
+command hash table for pysh
+
+Like bash's `hash`, remembers where commands live so a command line does not
+stat every PATH directory the way shutil.which does. The table is filled by
+one scan of the PATH directories and rebuilt when PATH changes or when one of
+those directories' mtime moves (a command was installed or removed).
+"""
+
+import os
+import time
+
+# minimum seconds between re-checking directory mtimes on a cache hit
+REVALIDATE_INTERVAL = 1.0
+
+
+class CommandHash:
+
+    def __init__(self):
+        self._path = None       # PATH value the table was built from
+        self._mtimes = {}       # PATH directory -> mtime when scanned
+        self._candidates = {}   # command name -> paths in PATH order
+        self._resolved = {}     # command name -> executable path
+        self.hits = {}          # command name -> number of times it was run
+        self._checked = 0.0
+        # bumped on every rebuild so callers can tell cached paths went stale
+        self.generation = 0
+
+    def lookup(self, name: str):
+        """
+        Return the absolute path of an executable, or None.
+        Names containing a '/' are resolved against the cwd and never hashed.
+        """
+        if os.sep in name:
+            if os.path.isfile(name) and os.access(name, os.X_OK):
+                return name
+            return None
+
+        self._refresh()
+        path = self._resolve(name)
+        if path is None:
+            # maybe it was installed since the last scan
+            self._refresh(force=True)
+            path = self._resolve(name)
+        return path
+
+    def hit(self, name: str):
+        """
+        Count one run of a remembered command. Called by the executor when
+        it starts the command, not by lookup(), which the checker and plan
+        compiler call for the same command line too.
+        """
+        if name in self._resolved:
+            self.hits[name] = self.hits.get(name, 0) + 1
+
+    def refresh(self):
+        """Rebuild the table if PATH or a PATH directory changed."""
+        self._refresh()
+
+    def forget(self, name: str):
+        """Drop one remembered command (hash -d)."""
+        self._resolved.pop(name, None)
+        self.hits.pop(name, None)
+        # cached plans hold the forgotten path
+        self.generation += 1
+
+    def reset(self):
+        """Forget everything (hash -r); the next lookup rescans PATH."""
+        self._path = None
+        self._mtimes = {}
+        self._candidates = {}
+        self._resolved = {}
+        self.hits = {}
+
+    def remembered(self):
+        """(name, path, hits) for every command looked up so far."""
+        return [(name, path, self.hits.get(name, 0)) for name, path in self._resolved.items()]
+
+    def _resolve(self, name):
+        path = self._resolved.get(name)
+        if path is not None:
+            return path
+        for candidate in self._candidates.get(name, ()):
+            if os.access(candidate, os.X_OK):
+                self._resolved[name] = candidate
+                return candidate
+        return None
+
+    def _refresh(self, force=False):
+        path_env = os.environ.get("PATH", os.defpath)
+        if path_env != self._path:
+            self._rebuild(path_env)
+            return
+
+        now = time.monotonic()
+        if not force and now - self._checked < REVALIDATE_INTERVAL:
+            return
+        self._checked = now
+        for directory, mtime in self._mtimes.items():
+            if _mtime(directory) != mtime:
+                self._rebuild(path_env)
+                return
+
+    def _rebuild(self, path_env):
+        mtimes = {}
+        candidates = {}
+        for directory in path_env.split(os.pathsep):
+            directory = directory or os.curdir
+            if directory in mtimes:
+                continue
+            mtimes[directory] = _mtime(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file():
+                                candidates.setdefault(entry.name, []).append(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+        self._path = path_env
+        self._mtimes = mtimes
+        self._candidates = candidates
+        self._resolved = {}
+        self._checked = time.monotonic()
+        self.generation += 1
+
+
+def _mtime(directory):
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+# the shell-wide table shared by the checker, executor and `hash` builtin
+command_hash = CommandHash()
@@ -0,0 +1,27 @@
+"""
+bg builtin for pysh
+resumes a stopped job in the background
+
+bg          the current job
+bg %N       job N
+"""
+
+import signal
+
+from jobtable import job_table, STOPPED
+
+
+def run(args):
+    status = 0
+    for spec in args or ["%+"]:
+        job = job_table.get(spec)
+        if job is None:
+            print(f"bg: {spec}: no such job")
+            status = 1
+            continue
+        if job.state != STOPPED:
+            print(f"bg: job {job.id} already in background")
+            continue
+        job.signal(signal.SIGCONT)
+        print(f"[{job.id}]{job_table.marker(job)} {job.command} &")
+    return status
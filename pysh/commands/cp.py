@@ -0,0 +1,313 @@
+"""
+cp builtin for pysh
+copies files and directory trees
+
+cp [-r] [-v] SOURCE DEST
+cp [-r] [-v] SOURCE... DIRECTORY
+
+-r, -R  copy directories recursively; symlinks inside are copied as links
+-v      print how many files and bytes were copied, and how fast
+
+Mode and mtime are always kept. File data never passes through Python:
+os.copy_file_range copies it in the kernel (a reflink on filesystems that
+share extents), with os.sendfile and then pread/pwrite as fallbacks where
+it is not supported. Sparse files are copied one data segment at a time,
+found with SEEK_DATA/SEEK_HOLE, so the holes stay holes. With -r the tree
+is walked on this thread while a pool of CP_WORKERS threads copies the
+files; directory modes and mtimes are set last, once nothing is written
+into them any more.
+"""
+
+import errno
+import os
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+USAGE = "usage: cp [-r] [-v] SOURCE... DEST"
+
+# files copied at once by -r; copies wait on the disk, not the CPU
+CP_WORKERS = 8
+# bytes asked of one copy_file_range/sendfile call
+CHUNK = 1 << 30
+# bytes per pread/pwrite in the last-resort fallback
+BUFFER = 1 << 20
+
+# errors meaning "this call can't do it here", not "the copy failed"
+_UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+# cleared the first time the kernel turns a call down for good
+_copy_file_range = hasattr(os, "copy_file_range")
+_sendfile = hasattr(os, "sendfile")
+
+
+def _parse_args(args):
+    recursive = verbose = False
+    operands = []
+    for i, arg in enumerate(args):
+        if arg == "--":
+            operands.extend(args[i + 1:])
+            break
+        if arg.startswith("-") and arg != "-":
+            for flag in arg[1:]:
+                if flag in "rR":
+                    recursive = True
+                elif flag == "v":
+                    verbose = True
+                else:
+                    raise ValueError(f"unknown option -{flag}")
+        else:
+            operands.append(arg)
+    if len(operands) < 2:
+        raise ValueError("missing destination file operand" if operands else "missing file operand")
+    return recursive, verbose, operands[:-1], operands[-1]
+
+
+def _copy_range(src_fd, dst_fd, offset, count):
+    """Copy count bytes at offset from src_fd to the same offset in dst_fd."""
+    global _copy_file_range, _sendfile
+    end = offset + count
+    while offset < end and _copy_file_range:
+        try:
+            copied = os.copy_file_range(src_fd, dst_fd, min(end - offset, CHUNK), offset, offset)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            if e.errno == errno.ENOSYS:
+                _copy_file_range = False
+            break
+        if not copied:
+            # the source got shorter
+            return
+        offset += copied
+
+    if offset < end and _sendfile:
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+        while offset < end:
+            try:
+                copied = os.sendfile(dst_fd, src_fd, offset, min(end - offset, CHUNK))
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                if e.errno == errno.ENOSYS:
+                    _sendfile = False
+                break
+            if not copied:
+                return
+            offset += copied
+
+    while offset < end:
+        data = os.pread(src_fd, min(end - offset, BUFFER), offset)
+        if not data:
+            return
+        offset += os.pwrite(dst_fd, data, offset)
+
+
+def _data_segments(fd, size):
+    """(offset, length) of the parts of a sparse file that hold data."""
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                # only a hole left
+                return
+            raise
+        end = os.lseek(fd, start, os.SEEK_HOLE)
+        yield start, end - start
+        offset = end
+
+
+def _copy_sparse(src_fd, dst_fd, size):
+    try:
+        for offset, length in _data_segments(src_fd, size):
+            _copy_range(src_fd, dst_fd, offset, length)
+    except OSError as e:
+        if e.errno != errno.EINVAL:
+            raise
+        # no SEEK_DATA on this filesystem: copy it all
+        _copy_range(src_fd, dst_fd, 0, size)
+    os.ftruncate(dst_fd, size)
+
+
+def copy_file(src, dst, st=None):
+    """Copy one regular file with its mode and mtime. Returns the bytes copied."""
+    src_fd = os.open(src, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        st = st or os.fstat(src_fd)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o600)
+        try:
+            size = st.st_size
+            if size == 0:
+                # /proc and friends report 0 and still have content
+                _copy_range(src_fd, dst_fd, 0, sys.maxsize)
+            elif hasattr(os, "SEEK_DATA") and st.st_blocks * 512 < size:
+                # fewer blocks than bytes: there are holes to keep
+                _copy_sparse(src_fd, dst_fd, size)
+            else:
+                _copy_range(src_fd, dst_fd, 0, size)
+            os.fchmod(dst_fd, stat.S_IMODE(st.st_mode))
+            os.utime(dst_fd, ns=(st.st_atime_ns, st.st_mtime_ns))
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    return size
+
+
+class _TreeCopy:
+    """cp -r of one directory: walked here, files copied on a thread pool."""
+
+    def __init__(self, pool, workers):
+        self.pool = pool
+        self.files = 0
+        self.bytes = 0
+        self.errors = []            # (path, exception)
+        self._done = threading.Condition()
+        self._queued = 0
+        # copies queued at most, so a huge tree is not all in memory at once
+        self._limit = workers * 16
+
+    def copy(self, src, dst):
+        dirs = []                   # (destination, source stat), parents first
+        self._copy_dir(src, dst, os.stat(src), dirs)
+        # every file is in place before the directories get their mode and mtime
+        with self._done:
+            self._done.wait_for(lambda: not self._queued)
+        for path, st in reversed(dirs):
+            try:
+                os.chmod(path, stat.S_IMODE(st.st_mode))
+                os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            except OSError as e:
+                self.errors.append((path, e))
+
+    def _copy_dir(self, src, dst, st, dirs):
+        try:
+            # writable until everything is in it
+            os.mkdir(dst, 0o700)
+        except FileExistsError:
+            pass
+        except OSError as e:
+            self.errors.append((dst, e))
+            return
+        dirs.append((dst, st))
+        try:
+            entries = list(os.scandir(src))
+        except OSError as e:
+            self.errors.append((src, e))
+            return
+        subdirs = []
+        for entry in entries:
+            target = os.path.join(dst, entry.name)
+            try:
+                if entry.is_symlink():
+                    if os.path.lexists(target):
+                        os.unlink(target)
+                    os.symlink(os.readlink(entry.path), target)
+                elif entry.is_dir():
+                    subdirs.append((entry.path, target, entry.stat()))
+                elif entry.is_file():
+                    self._submit(entry.path, target, entry.stat())
+                else:
+                    self.errors.append((entry.path, OSError(errno.EINVAL, "not a regular file")))
+            except OSError as e:
+                self.errors.append((entry.path, e))
+        for sub_src, sub_dst, sub_st in subdirs:
+            self._copy_dir(sub_src, sub_dst, sub_st, dirs)
+
+    def _submit(self, src, dst, st):
+        with self._done:
+            self._done.wait_for(lambda: self._queued < self._limit)
+            self._queued += 1
+        self.pool.submit(self._copy_one, src, dst, st)
+
+    def _copy_one(self, src, dst, st):
+        size = error = None
+        try:
+            size = copy_file(src, dst, st)
+        except Exception as e:
+            # not only OSError: any failure is a failed copy
+            error = e
+        finally:
+            # always counted, or copy() would wait for this file forever
+            with self._done:
+                if error is not None:
+                    self.errors.append((src, error))
+                elif size is not None:
+                    self.files += 1
+                    self.bytes += size
+                self._queued -= 1
+                self._done.notify_all()
+
+
+def run(args):
+    try:
+        recursive, verbose, sources, dest = _parse_args(args)
+    except ValueError as e:
+        print(f"cp: {e}")
+        print(USAGE)
+        return 2
+
+    into_dir = os.path.isdir(dest)
+    if len(sources) > 1 and not into_dir:
+        print(f"cp: target '{dest}' is not a directory")
+        return 1
+
+    status = 0
+    start = time.monotonic()
+    files = size = 0
+    pool = None
+    tree = None
+    try:
+        for src in sources:
+            target = os.path.join(dest, os.path.basename(src.rstrip(os.sep))) if into_dir else dest
+            try:
+                st = os.stat(src)
+                if os.path.exists(target) and os.path.samestat(st, os.stat(target)):
+                    print(f"cp: '{src}' and '{target}' are the same file")
+                    status = 1
+                    continue
+                if not stat.S_ISDIR(st.st_mode):
+                    size += copy_file(src, target, st)
+                    files += 1
+                    continue
+            except OSError as e:
+                print(f"cp: cannot copy '{src}': {e.strerror}")
+                status = 1
+                continue
+
+            if not recursive:
+                print(f"cp: -r not specified; omitting directory '{src}'")
+                status = 1
+                continue
+            real_src = os.path.realpath(src)
+            if (os.path.realpath(target) + os.sep).startswith(real_src + os.sep):
+                print(f"cp: cannot copy a directory, '{src}', into itself, '{target}'")
+                status = 1
+                continue
+            if pool is None:
+                pool = ThreadPoolExecutor(max_workers=CP_WORKERS, thread_name_prefix="pysh-cp")
+                tree = _TreeCopy(pool, CP_WORKERS)
+            tree.copy(src, target)
+            for path, e in tree.errors:
+                print(f"cp: cannot copy '{path}': {getattr(e, 'strerror', None) or e}")
+                status = 1
+            tree.errors.clear()
+    except KeyboardInterrupt:
+        print("\ncp: interrupted")
+        status = 130
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=status != 130, cancel_futures=True)
+
+    if tree is not None:
+        files += tree.files
+        size += tree.bytes
+    if verbose:
+        seconds = time.monotonic() - start
+        rate = size / seconds / (1 << 20) if seconds else 0.0
+        print(f"cp: {files} files, {size} bytes copied in {seconds:.2f}s ({rate:.1f} MiB/s)")
+    return status
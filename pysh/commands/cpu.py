@@ -1,73 +1,76 @@
 """
 CPU monitor for Pysh
-Displays CPU usage per core in a boxed table with colors
+Displays CPU usage per core in a boxed table with colors, with the recent
+history of each core as a sparkline and its min/avg/max over that history
 Updates continuously, Ctrl+C to exit
+
+cpu [--json | --csv] [--count N] [--interval SECONDS] [--serve PORT]
+writes samples instead of drawing (see monitor/export.py)
 """
 
-import psutil
-import time
-import os
+from monitor import export
+from monitor.sampler import get_sampler, sparkline
+from monitor.screen import Screen, table
 
 # ANSI colors
-RESET = "\033[0m"
-HEADER_COLOR = "\033[1;37m"  # bright white
 CORE_COLOR = "\033[1;36m"    # cyan
 USAGE_COLOR = "\033[1;33m"   # yellow
+HISTORY_COLOR = "\033[1;32m" # green
 
-def run(args=None):
-    try:
-        while True:
-            # Clear screen
-            if os.name == "nt":
-                os.system("cls")
-            else:
-                print("\033[H\033[J", end="")  # ANSI clear screen
-
-            cpu_percent = psutil.cpu_percent(interval=0.5, percpu=True)
-            num_cores = len(cpu_percent)
+HISTORY_WIDTH = 30
+USAGE = f"usage: cpu {export.EXPORT_USAGE}"
 
-            # Table layout
-            col_width = 12
-            row_count = (num_cores + 1) // 2
+COLUMNS = [("CPU Core", 12), ("Usage %", 12), ("History", HISTORY_WIDTH + 2), ("Min / Avg / Max", 21)]
 
-            # Print top border
-            print("+" + ("-" * col_width + "+") * 4)
 
-            # Print header
-            header = (
-                f"|{HEADER_COLOR}{'CPU Core':^{col_width}}{RESET}"
-                f"|{HEADER_COLOR}{'Usage %':^{col_width}}{RESET}"
-                f"|{HEADER_COLOR}{'CPU Core':^{col_width}}{RESET}"
-                f"|{HEADER_COLOR}{'Usage %':^{col_width}}{RESET}|"
-            )
-            print(header)
+def _row(label, ring):
+    low, avg, high = ring.stats()
+    return [
+        (label, CORE_COLOR),
+        (f"{ring.latest():.1f}%", USAGE_COLOR),
+        (sparkline(ring.values(), HISTORY_WIDTH), HISTORY_COLOR),
+        f"{low:.0f} / {avg:.0f} / {high:.0f}",
+    ]
 
-            # Print separator
-            print("+" + ("-" * col_width + "+") * 4)
 
-            # Print each row
-            for i in range(row_count):
-                col1_idx = i
-                col2_idx = i + row_count if i + row_count < num_cores else None
+def _frame(sampler):
+    with sampler.lock:
+        rows = [_row("All", sampler.series["cpu"])]
+        core = 0
+        while f"cpu{core}" in sampler.series:
+            rows.append(_row(f"Core {core}", sampler.series[f"cpu{core}"]))
+            core += 1
+    return table(COLUMNS, rows, row_separators=True) + [[], ["Press Ctrl+C to exit."]]
 
-                core1 = f"{CORE_COLOR}Core {col1_idx}{RESET}"
-                usage1 = f"{USAGE_COLOR}{cpu_percent[col1_idx]:.1f}%{RESET}"
 
-                if col2_idx is not None:
-                    core2 = f"{CORE_COLOR}Core {col2_idx}{RESET}"
-                    usage2 = f"{USAGE_COLOR}{cpu_percent[col2_idx]:.1f}%{RESET}"
-                else:
-                    core2 = usage2 = ""
+def _records(sampler):
+    rows = [{"core": "all", "percent": sampler.series["cpu"].latest()}]
+    core = 0
+    while f"cpu{core}" in sampler.series:
+        rows.append({"core": str(core), "percent": sampler.series[f"cpu{core}"].latest()})
+        core += 1
+    return rows
 
-                print(
-                    f"|{core1:^{col_width}}|{usage1:^{col_width}}|{core2:^{col_width}}|{usage2:^{col_width}}|"
-                )
 
-                # Print row separator
-                print("+" + ("-" * col_width + "+") * 4)
+def run(args=None):
+    try:
+        options, rest = export.parse_args(args or [])
+        if rest:
+            raise ValueError(f"unknown option {rest[0]}")
+    except ValueError as e:
+        print(f"cpu: {e}")
+        print(USAGE)
+        return 2
+    if options is not None:
+        return export.run("cpu", _records, options, labels=("core",))
 
-            print("\nPress Ctrl+C to exit.")
-            time.sleep(0.5)
+    sampler = get_sampler()
+    try:
+        with sampler.watching(), Screen() as screen:
+            sampler.wait_for_sample()
+            while True:
+                screen.draw(_frame(sampler))
+                screen.sleep(sampler.interval)
 
     except KeyboardInterrupt:
         print("\nexiting cpu monitor")
@@ -1,41 +1,98 @@
 """
 disk monitor for pysh
-displays disk usage in a boxed table with colors
+displays disk usage in a boxed table with colors,
+with the usage history of each mount as a sparkline
+
+disk [-t TYPE[,TYPE...]] [-x TYPE[,TYPE...]] [-d DEVICE] [--json | --csv]
+     [--count N] [--interval SECONDS] [--serve PORT]
+
+-t TYPE    only filesystems of these types (ext4,xfs,...)
+-x TYPE    leave out filesystems of these types
+-d DEVICE  only devices whose name contains DEVICE (repeatable)
+
+mounts that don't answer in time (hung NFS/FUSE servers) show as stale
+the export options write samples instead of drawing (see monitor/export.py)
 """
 
-import psutil
-import time
-import os
+from monitor import export
+from monitor.mounts import matches
+from monitor.sampler import get_sampler, sparkline
+from monitor.screen import Screen, table
 
-RESET = "\033[0m"
-HEADER_COLOR = "\033[1;37m"  # bright white
 DISK_COLOR = "\033[1;36m"    # cyan
 USAGE_COLOR = "\033[1;33m"   # yellow
+HISTORY_COLOR = "\033[1;32m" # green
+STALE_COLOR = "\033[1;31m"   # red
+
+USAGE = f"usage: disk [-t TYPE[,TYPE...]] [-x TYPE[,TYPE...]] [-d DEVICE] {export.EXPORT_USAGE}"
+
+HISTORY_WIDTH = 20
+COLUMNS = [("Device", 20), ("Type", 8), ("Used %", 15), ("Mount", 15), ("History", HISTORY_WIDTH + 2)]
+
+
+def _parse_args(args):
+    filters = {"types": set(), "exclude": set(), "devices": []}
+    i = 0
+    while i < len(args):
+        opt = args[i]
+        if i + 1 >= len(args) or opt not in ("-t", "-x", "-d"):
+            raise ValueError(f"unknown option {opt}")
+        value = args[i + 1]
+        if opt == "-t":
+            filters["types"].update(value.split(","))
+        elif opt == "-x":
+            filters["exclude"].update(value.split(","))
+        else:
+            filters["devices"].append(value)
+        i += 2
+    return filters
+
+
+def _frame(sampler, filters):
+    rows = []
+    with sampler.lock:
+        for device, mountpoint, fstype, stale in sampler.disks:
+            if not matches(fstype, device, **filters):
+                continue
+            ring = sampler.series.get(f"disk:{mountpoint}")
+            history = sparkline(ring.values(), HISTORY_WIDTH) if ring else ""
+            if stale:
+                used = ("stale", STALE_COLOR)
+            else:
+                used = (f"{ring.latest():.1f}%", USAGE_COLOR)
+            rows.append([(device, DISK_COLOR), fstype, used, mountpoint, (history, HISTORY_COLOR)])
+    return table(COLUMNS, rows) + [[], ["Press Ctrl+C to exit."]]
+
+
+def _records(sampler, filters):
+    rows = []
+    for device, mountpoint, fstype, stale in sampler.disks:
+        if matches(fstype, device, **filters):
+            percent = None if stale else sampler.series[f"disk:{mountpoint}"].latest()
+            rows.append({"device": device, "mountpoint": mountpoint, "fstype": fstype,
+                         "percent": percent, "stale": stale})
+    return rows
+
 
 def run(args=None):
     try:
-        while True:
-            if os.name == "nt":
-                os.system("cls")
-            else:
-                print("\033[H\033[J", end="")
-
-            partitions = psutil.disk_partitions()
-            print("+" + "-"*20 + "+" + "-"*15 + "+" + "-"*15 + "+")
-            print(f"|{HEADER_COLOR}{'Device':^20}{RESET}|{HEADER_COLOR}{'Used %':^15}{RESET}|{HEADER_COLOR}{'Mount':^15}{RESET}|")
-            print("+" + "-"*20 + "+" + "-"*15 + "+" + "-"*15 + "+")
-
-            for p in partitions:
-                try:
-                    usage = psutil.disk_usage(p.mountpoint)
-                    used_percent = f"{usage.percent:.1f}%"
-                    print(f"|{DISK_COLOR}{p.device:^20}{RESET}|{USAGE_COLOR}{used_percent:^15}{RESET}|{p.mountpoint:^15}|")
-                except PermissionError:
-                    continue
-
-            print("+" + "-"*20 + "+" + "-"*15 + "+" + "-"*15 + "+")
-            print("\nPress Ctrl+C to exit.")
-            time.sleep(1)
+        options, rest = export.parse_args(args or [])
+        filters = _parse_args(rest)
+    except ValueError as e:
+        print(f"disk: {e}")
+        print(USAGE)
+        return 2
+    if options is not None:
+        return export.run("disk", lambda sampler: _records(sampler, filters), options,
+                          labels=("device", "mountpoint", "fstype"), groups=("disk",))
+
+    sampler = get_sampler()
+    try:
+        with sampler.watching("disk"), Screen() as screen:
+            sampler.wait_for_sample("disk")
+            while True:
+                screen.draw(_frame(sampler, filters))
+                screen.sleep(sampler.interval)
 
     except KeyboardInterrupt:
         print("\nexiting disk monitor")
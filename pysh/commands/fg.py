@@ -0,0 +1,37 @@
+"""
+fg builtin for pysh
+brings a background job to the foreground and waits for it
+
+fg          the current job
+fg %N       job N
+"""
+
+import signal
+
+from jobtable import job_table, STOPPED
+
+
+def run(args):
+    spec = args[0] if args else "%+"
+    job = job_table.get(spec)
+    if job is None:
+        print(f"fg: {spec}: no such job")
+        return 1
+
+    print(job.command)
+    with job_table.foreground(job):
+        if job.state == STOPPED:
+            job.signal(signal.SIGCONT)
+        try:
+            status = job.wait(stop=True)
+        except KeyboardInterrupt:
+            # the terminal could not be handed over, pass Ctrl+C on
+            job.signal(signal.SIGINT)
+            status = job.wait(stop=True)
+    if job.state == STOPPED:
+        # Ctrl+Z: back to the prompt, the job waits for fg or bg
+        print()
+        print(job_table.format(job))
+        return 128 + signal.SIGTSTP
+    job_table.remove(job)
+    return status
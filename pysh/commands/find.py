@@ -0,0 +1,202 @@
+"""
+find builtin for pysh
+walks directory trees and prints the paths that pass every test
+
+find [PATH...] [-name GLOB] [-iname GLOB] [-type f|d|l] [-size [+|-]N[c|k|M|G]]
+     [-mtime [+|-]DAYS] [-mmin [+|-]MINUTES] [-maxdepth N] [-mindepth N]
+
+Tests are and-ed together; there is no -o, ! or grouping. -size without a
+unit counts 512-byte blocks, rounded up like find does. +N means more
+than N, -N less than N.
+
+The walk is parallel: each directory is read with os.scandir on a pool of
+FIND_WORKERS threads, and its matches are written as soon as its scan is
+done, so results stream in no particular order. Types come from the
+dirents; a file is only stat()ed when -size, -mtime or -mmin need it.
+Symlinks are not followed.
+"""
+
+import fnmatch
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from streams import Writer
+
+USAGE = ("usage: find [PATH...] [-name GLOB] [-iname GLOB] [-type f|d|l] [-size [+|-]N[c|k|M|G]] "
+         "[-mtime [+|-]DAYS] [-mmin [+|-]MINUTES] [-maxdepth N] [-mindepth N]")
+
+# directories read at once; scans wait on the disk, not the CPU
+FIND_WORKERS = 8
+
+_SIZE_UNITS = {"c": 1, "k": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "": 512}
+
+
+def _compare(text, unit_name):
+    """A test for '+N', '-N' or 'N': more than, less than, exactly N."""
+    match = re.fullmatch(r"([+-]?)(\d+)", text)
+    if not match:
+        raise ValueError(f"bad {unit_name}: {text}")
+    sign, n = match.group(1), int(match.group(2))
+    if sign == "+":
+        return lambda value: value > n
+    if sign == "-":
+        return lambda value: value < n
+    return lambda value: value == n
+
+
+class _Query:
+    """The parsed tests of one find command."""
+
+    def __init__(self):
+        self.name = None            # compiled glob
+        self.type = None            # "f", "d" or "l"
+        self.size = None            # (test, unit bytes)
+        self.age = None             # (test, seconds per unit)
+        self.maxdepth = None
+        self.mindepth = 0
+        self.now = time.time()
+
+    @property
+    def needs_stat(self):
+        return self.size is not None or self.age is not None
+
+    def matches(self, name, kind, st):
+        if self.name is not None and not self.name.match(name):
+            return False
+        if self.type is not None and kind != self.type:
+            return False
+        if self.size is not None:
+            test, unit = self.size
+            if not test(math.ceil(st.st_size / unit)):
+                return False
+        if self.age is not None:
+            test, unit = self.age
+            if not test(int((self.now - st.st_mtime) // unit)):
+                return False
+        return True
+
+
+def _parse_args(args):
+    query = _Query()
+    paths = []
+    i = 0
+    while i < len(args) and not args[i].startswith("-"):
+        paths.append(args[i])
+        i += 1
+    while i < len(args):
+        test = args[i]
+        if i + 1 >= len(args):
+            raise ValueError(f"missing argument to {test}")
+        value = args[i + 1]
+        if test in ("-name", "-iname"):
+            flags = re.IGNORECASE if test == "-iname" else 0
+            query.name = re.compile(fnmatch.translate(value), flags | re.DOTALL)
+        elif test == "-type":
+            if value not in ("f", "d", "l"):
+                raise ValueError(f"unknown type: {value}")
+            query.type = value
+        elif test == "-size":
+            match = re.fullmatch(r"([+-]?\d+)([ckMG]?)", value)
+            if not match:
+                raise ValueError(f"bad size: {value}")
+            query.size = (_compare(match.group(1), "size"), _SIZE_UNITS[match.group(2)])
+        elif test in ("-mtime", "-mmin"):
+            query.age = (_compare(value, test[1:]), 86400 if test == "-mtime" else 60)
+        elif test in ("-maxdepth", "-mindepth"):
+            if not value.isdigit():
+                raise ValueError(f"bad depth: {value}")
+            setattr(query, test[1:], int(value))
+        else:
+            raise ValueError(f"unknown test {test}")
+        i += 2
+    return query, paths or ["."]
+
+
+def _kind(entry):
+    if entry.is_symlink():
+        return "l"
+    if entry.is_dir(follow_symlinks=False):
+        return "d"
+    return "f" if entry.is_file(follow_symlinks=False) else "?"
+
+
+def _scan(path, depth, query):
+    """
+    Read one directory at depth. Returns (matching paths as text,
+    subdirectories to read next).
+    """
+    out = []
+    subdirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            kind = _kind(entry)
+            if kind == "d" and (query.maxdepth is None or depth < query.maxdepth):
+                subdirs.append(entry.path)
+            if depth < query.mindepth:
+                continue
+            st = None
+            if query.needs_stat:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    # gone since it was read
+                    continue
+            if query.matches(entry.name, kind, st):
+                out.append(entry.path + "\n")
+    return "".join(out), subdirs
+
+
+def _walk(root, query, pool, out, errors):
+    """Find below root, writing each directory's matches as its scan ends."""
+    pending = {pool.submit(_scan, root, 1, query): (root, 1)}
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, depth = pending.pop(future)
+            try:
+                text, subdirs = future.result()
+            except OSError as e:
+                errors.append(e)
+                continue
+            out.write(text)
+            for subdir in subdirs:
+                pending[pool.submit(_scan, subdir, depth + 1, query)] = (subdir, depth + 1)
+
+
+def run(args):
+    try:
+        query, paths = _parse_args(args)
+    except ValueError as e:
+        print(f"find: {e}")
+        print(USAGE)
+        return 2
+
+    out = Writer(sys.stdout)
+    errors = []
+    status = 0
+    pool = ThreadPoolExecutor(max_workers=FIND_WORKERS, thread_name_prefix="pysh-find")
+    try:
+        for path in paths:
+            try:
+                st = os.lstat(path)
+            except OSError as e:
+                out.write(f"find: '{path}': {e.strerror}\n")
+                status = 1
+                continue
+            # the starting point is tested too, at depth 0
+            kind = "d" if os.path.isdir(path) else "l" if os.path.islink(path) else "f"
+            if query.mindepth == 0 and query.matches(os.path.basename(path.rstrip(os.sep)) or path, kind, st):
+                out.write(path + "\n")
+            if kind == "d" and query.maxdepth != 0:
+                _walk(path, query, pool, out, errors)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    for e in errors:
+        out.write(f"find: '{e.filename}': {e.strerror}\n")
+    out.flush()
+    return 1 if errors else status
@@ -0,0 +1,376 @@
+"""
+grep builtin for pysh
+prints the lines of files (or of stdin) that match a pattern
+
+grep [-i] [-v] [-n] [-c] [-l] [-q] [-r] [-w] [-F] PATTERN [FILE...]
+
+-i  ignore case (ASCII)         -c  print only a count of matching lines
+-v  print non-matching lines    -l  print only the names of matching files
+-n  prefix line numbers         -q  print nothing, only set the exit status
+-r  search directories          -w  match whole words only
+-F  PATTERN is a plain string   -E  accepted; patterns are Python re syntax
+
+The pattern is compiled once, as a bytes pattern. Files are memory-mapped
+and searched in place, match to match, on a pool of GREP_WORKERS threads;
+results are written in the order the files were named. Output is handed
+over in pieces of at most OUTPUT_PIECE, and a file searched ahead of the
+one being written holds at most FILE_BUFFER of it before its search waits,
+so memory stays bounded however much a file matches. A file that can't
+be mapped (a pipe, /proc) is read instead. Without files, or as a pipeline
+stage, stdin is searched a chunk at a time as it arrives. The exit status
+is 0 if a line matched, 1 if none did and 2 on an error.
+"""
+
+import mmap
+import os
+import re
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from streams import Writer
+
+USAGE = "usage: grep [-i] [-v] [-n] [-c] [-l] [-q] [-r] [-w] [-F] PATTERN [FILE...]"
+
+# files searched at once
+GREP_WORKERS = 8
+# files searched ahead of the one being written
+READ_AHEAD = 64
+# characters of output gathered before they are handed on
+OUTPUT_PIECE = 64 * 1024
+# characters of output a file searched ahead may hold before it waits
+FILE_BUFFER = 4 * OUTPUT_PIECE
+# bytes read from stdin at a time
+STDIN_CHUNK = 64 * 1024
+# a NUL within this many leading bytes makes a file binary
+BINARY_PROBE = 8192
+
+
+class _Options:
+
+    __slots__ = ("ignore_case", "invert", "numbers", "count", "files_only",
+                 "quiet", "recursive", "words", "fixed", "names")
+
+    def __init__(self):
+        self.ignore_case = False
+        self.invert = False
+        self.numbers = False
+        self.count = False
+        self.files_only = False
+        self.quiet = False
+        self.recursive = False
+        self.words = False
+        self.fixed = False
+        self.names = False      # prefix lines with the file name
+
+
+class _Cancelled(Exception):
+    """The output of a search is no longer wanted."""
+
+
+class _Output:
+    """
+    The output of one file's search on its way to the writer. A search
+    ahead of the file being written waits once FILE_BUFFER is held.
+    """
+
+    def __init__(self):
+        self._parts = deque()
+        self._size = 0
+        self._finished = False
+        self._cancelled = False
+        self._cond = threading.Condition()
+
+    def write(self, text):
+        with self._cond:
+            while self._size >= FILE_BUFFER and not self._cancelled:
+                self._cond.wait()
+            if self._cancelled:
+                raise _Cancelled
+            self._parts.append(text)
+            self._size += len(text)
+            self._cond.notify_all()
+
+    def finish(self):
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self._cancelled = True
+            self._parts.clear()
+            self._cond.notify_all()
+
+    def pieces(self):
+        """The output as it comes, until the search has finished."""
+        while True:
+            with self._cond:
+                while not self._parts and not self._finished:
+                    self._cond.wait()
+                if not self._parts:
+                    return
+                text = "".join(self._parts)
+                self._parts.clear()
+                self._size = 0
+                self._cond.notify_all()
+            yield text
+
+
+def _parse_args(args):
+    options = _Options()
+    flags = {"i": "ignore_case", "v": "invert", "n": "numbers", "c": "count",
+             "l": "files_only", "q": "quiet", "r": "recursive", "R": "recursive",
+             "w": "words", "F": "fixed"}
+    operands = []
+    for i, arg in enumerate(args):
+        if arg == "--":
+            operands.extend(args[i + 1:])
+            break
+        if arg.startswith("-") and arg != "-" and not operands:
+            for flag in arg[1:]:
+                if flag == "E":
+                    continue
+                if flag not in flags:
+                    raise ValueError(f"unknown option -{flag}")
+                setattr(options, flags[flag], True)
+        else:
+            operands.append(arg)
+    if not operands:
+        raise ValueError("missing pattern")
+
+    pattern = operands[0].encode()
+    if options.fixed:
+        pattern = re.escape(pattern)
+    if options.words:
+        pattern = rb"\b(?:" + pattern + rb")\b"
+    try:
+        regex = re.compile(pattern, re.MULTILINE | (re.IGNORECASE if options.ignore_case else 0))
+    except re.error as e:
+        raise ValueError(f"bad pattern: {e}") from None
+    return options, regex, operands[1:]
+
+
+def _lines(data, regex, invert):
+    """
+    (line start, line) of the matching lines in data, bytes or an mmap.
+    Without -v the search jumps from match to match; lines in between are
+    never looked at.
+    """
+    size = len(data)
+    pos = 0
+    if invert:
+        while pos < size:
+            end = data.find(b"\n", pos)
+            if end < 0:
+                end = size
+            line = data[pos:end]
+            if not regex.search(line):
+                yield pos, line
+            pos = end + 1
+        return
+
+    while pos < size:
+        match = regex.search(data, pos)
+        if match is None:
+            return
+        hit = match.start()
+        if hit == size:
+            # an empty match past the last newline is not a line
+            return
+        start = data.rfind(b"\n", pos, hit) + 1 or pos
+        end = data.find(b"\n", hit)
+        if end < 0:
+            end = size
+        line = data[start:end]
+        # a match that runs into the next line says nothing about this one
+        if b"\n" not in match.group() or regex.search(line):
+            yield start, line
+        pos = end + 1
+
+
+def _search(data, regex, options, prefix, write, first_line=1):
+    """
+    Search one buffer, passing its output to write in pieces of about
+    OUTPUT_PIECE. Returns the number of matching lines; first_line is the
+    number of its first line, for -n on a stream.
+    """
+    out = []
+    pending = 0
+    matched = 0
+    line = first_line
+    counted = 0             # offset up to which newlines are counted into line
+    for start, text in _lines(data, regex, options.invert):
+        matched += 1
+        if options.quiet or options.files_only:
+            break
+        if options.count:
+            continue
+        number = ""
+        if options.numbers:
+            line += data[counted:start].count(b"\n")
+            counted = start
+            number = f"{line}:"
+        out.append(f"{prefix}{number}{text.decode(errors='replace')}\n")
+        pending += len(out[-1])
+        if pending >= OUTPUT_PIECE:
+            write("".join(out))
+            out.clear()
+            pending = 0
+    if out:
+        write("".join(out))
+    return matched
+
+
+def _is_binary(data):
+    return b"\0" in data[:BINARY_PROBE]
+
+
+def _grep_file(path, regex, options, prefix, output):
+    """Search one file into output. Returns (matched, error message)."""
+    try:
+        return _grep_into(path, regex, options, prefix, output)
+    finally:
+        output.finish()
+
+
+def _grep_into(path, regex, options, prefix, output):
+    try:
+        with open(path, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # empty, or not a regular file: read it instead
+                data = f.read()
+            else:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    data.madvise(mmap.MADV_SEQUENTIAL)
+    except IsADirectoryError:
+        return 0, f"grep: {path}: Is a directory"
+    except OSError as e:
+        return 0, f"grep: {path}: {e.strerror}"
+
+    try:
+        if _is_binary(data) and not (options.count or options.files_only or options.quiet):
+            matched = next(_lines(data, regex, options.invert), None) is not None
+            if matched:
+                output.write(f"Binary file {path} matches\n")
+            return int(matched), None
+        matched = _search(data, regex, options, prefix, output.write)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    if options.files_only and matched:
+        output.write(f"{path}\n")
+    elif options.count:
+        output.write(f"{prefix}{matched}\n")
+    return matched, None
+
+
+def _files(paths, recursive, errors):
+    """The files to search: the paths, with directories walked for -r."""
+    for path in paths:
+        if not (recursive and os.path.isdir(path)):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path, onerror=lambda e: errors.append(e)):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                # like grep -r, links met on the way are not followed
+                if not os.path.islink(file_path):
+                    yield file_path
+
+
+def _grep_stdin(regex, options, out):
+    """Search stdin a chunk at a time, writing each chunk's lines as it comes."""
+    stream = getattr(sys.stdin, "buffer", None)
+    read = stream.read1 if hasattr(stream, "read1") else None
+    if read is None:
+        # a text stream without a binary buffer
+        read = lambda size: sys.stdin.readline().encode()
+    matched = 0
+    line = 1
+    carry = b""
+    while True:
+        chunk = read(STDIN_CHUNK)
+        if not chunk:
+            data, carry = carry, b""
+        else:
+            data = carry + chunk
+            cut = data.rfind(b"\n") + 1
+            data, carry = data[:cut], data[cut:]
+        if data:
+            matched += _search(data, regex, options, "", out.write, line)
+            line += data.count(b"\n")
+            out.flush()
+            if matched and (options.quiet or options.files_only):
+                break
+        if not chunk:
+            break
+    if options.files_only and matched:
+        out.write("(standard input)\n")
+    elif options.count:
+        out.write(f"{matched}\n")
+    return matched
+
+
+def run(args):
+    try:
+        options, regex, paths = _parse_args(args)
+    except ValueError as e:
+        print(f"grep: {e}")
+        print(USAGE)
+        return 2
+
+    out = Writer(sys.stdout)
+    if not paths:
+        matched = _grep_stdin(regex, options, out)
+        out.flush()
+        return 0 if matched else 1
+
+    options.names = len(paths) > 1 or options.recursive
+    errors = []
+    matched = 0
+    failed = False
+    pool = ThreadPoolExecutor(max_workers=GREP_WORKERS, thread_name_prefix="pysh-grep")
+    try:
+        pending = deque()
+
+        def write_next():
+            nonlocal matched, failed
+            future, output = pending[0]
+            for text in output.pieces():
+                if not options.quiet:
+                    out.write(text)
+            pending.popleft()
+            found, error = future.result()
+            if error:
+                out.write(error + "\n")
+                failed = True
+            matched += found
+
+        for path in _files(paths, options.recursive, errors):
+            prefix = f"{path}:" if options.names else ""
+            output = _Output()
+            pending.append((pool.submit(_grep_file, path, regex, options, prefix, output), output))
+            # results go out in file order, each file as soon as it is done
+            while len(pending) > READ_AHEAD or (pending and pending[0][0].done()):
+                write_next()
+            if options.quiet and matched:
+                break
+        while pending and not (options.quiet and matched):
+            write_next()
+    finally:
+        # searches still waiting to hand over output stop at their next write
+        for _, output in pending:
+            output.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    for e in errors:
+        out.write(f"grep: {e.filename}: {e.strerror}\n")
+    out.flush()
+    if failed or errors:
+        return 0 if matched and options.quiet else 2
+    return 0 if matched else 1
@@ -0,0 +1,39 @@
+"""
+hash builtin for pysh
+inspects and resets the shell's command hash table, like bash's `hash`
+
+hash            list remembered commands and their hit counts
+hash -r         forget every remembered location
+hash -d NAME    forget NAME
+hash NAME...    look up NAME and remember it
+"""
+
+from cmdhash import command_hash
+
+
+def run(args):
+    if not args:
+        remembered = command_hash.remembered()
+        if not remembered:
+            print("hash: hash table empty")
+            return 0
+        print(f"{'hits':>4}    command")
+        for name, path, hits in sorted(remembered):
+            print(f"{hits:>4}    {path}")
+        return 0
+
+    if args[0] == "-r":
+        command_hash.reset()
+        return 0
+
+    if args[0] == "-d":
+        for name in args[1:]:
+            command_hash.forget(name)
+        return 0
+
+    status = 0
+    for name in args:
+        if command_hash.lookup(name) is None:
+            print(f"hash: {name}: not found")
+            status = 1
+    return status
@@ -0,0 +1,23 @@
+"""
+jobs builtin for pysh
+lists background jobs; finished ones are reported once and dropped
+
+jobs        [N]+  Running    sleep 100
+jobs -l     also show process ids
+"""
+
+from jobtable import job_table, DONE
+
+
+def run(args):
+    show_pids = "-l" in args
+    job_table.reap()
+    for job in list(job_table.jobs.values()):
+        line = job_table.format(job)
+        if show_pids:
+            pids = " ".join(str(proc.pid) for proc in job.procs)
+            line = f"{line}    ({pids})"
+        print(line)
+        if job.state == DONE:
+            job_table.remove(job)
+    return 0
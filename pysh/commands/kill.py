@@ -0,0 +1,69 @@
+"""
+kill builtin for pysh
+sends a signal to background jobs or processes
+
+kill %N PID...          SIGTERM
+kill -9 %N              by number
+kill -STOP %N           by name (also -s STOP)
+kill -l                 list signal names
+"""
+
+import os
+import signal
+
+from jobtable import job_table
+
+USAGE = "kill: usage: kill [-s SIG | -SIG] %N | PID ..."
+
+
+def _parse_signal(text):
+    if text.isdigit():
+        return signal.Signals(int(text))
+    name = text.upper()
+    if not name.startswith("SIG"):
+        name = "SIG" + name
+    return signal.Signals[name]
+
+
+def run(args):
+    if not args or args == ["-s"]:
+        print(USAGE)
+        return 2
+
+    if args[0] == "-l":
+        print(" ".join(sig.name[3:] for sig in signal.Signals))
+        return 0
+
+    signum = signal.SIGTERM
+    targets = args
+    try:
+        if args[0] == "-s":
+            signum, targets = _parse_signal(args[1]), args[2:]
+        elif args[0].startswith("-"):
+            signum, targets = _parse_signal(args[0][1:]), args[1:]
+    except (KeyError, ValueError):
+        print(f"kill: {args[0] if args[0] != '-s' else args[1]}: invalid signal specification")
+        return 1
+
+    status = 0
+    for target in targets:
+        try:
+            if target.startswith("%"):
+                job = job_table.get(target)
+                if job is None:
+                    print(f"kill: {target}: no such job")
+                    status = 1
+                    continue
+                job.signal(signum)
+            else:
+                os.kill(int(target), signum)
+        except ValueError:
+            print(f"kill: {target}: arguments must be process or job IDs")
+            status = 1
+        except ProcessLookupError:
+            print(f"kill: ({target}) - No such process")
+            status = 1
+        except PermissionError:
+            print(f"kill: ({target}) - Operation not permitted")
+            status = 1
+    return status
@@ -1,29 +1,322 @@
+"""
+ls builtin for pysh
+lists directory contents
+
+ls [-a] [-l] [-R] [-1] [-U] [PATH...]
+
+-a  also show the .DS_Store / .localized clutter files
+-l  long format: mode, links, owner, group, size, mtime
+-R  list subdirectories recursively
+-1  one entry per line (the default when stdout is not a terminal)
+-U  do not sort: entries are written as the directory is read
+
+Directories are read with os.scandir, so file types come from the cached
+directory entries and nothing is stat()ed unless -l asks for it. -R scans
+the subdirectories of each directory listed on a pool of threads while the
+listing is being written; sorted output keeps ls's depth-first order, -U -R
+writes each directory as soon as its scan is done. All output goes through
+one buffered writer (streams.Writer), written in WRITE_BUFFER-sized pieces.
+"""
+
+import grp
+import math
 import os
+import pwd
+import shutil
+import stat
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-def run(args):
-    show_all = False
+from streams import Writer
+
+USAGE = "usage: ls [-a] [-l] [-R] [-1] [-U] [PATH...]"
+
+# names left out unless -a is given
+HIDDEN = {".DS_Store", ".localized"}
+# directories scanned at once by -R; scans wait on the disk, not the CPU
+WALK_WORKERS = 8
+# characters collected before they are written out
+WRITE_BUFFER = 64 * 1024
+
+# mtimes older than this (or in the future) show the year instead of the time
+_RECENT = 183 * 24 * 3600
+
+
+class _Options:
+
+    __slots__ = ("all", "long", "recursive", "one", "unsorted", "width")
+
+    def __init__(self):
+        self.all = False
+        self.long = False
+        self.recursive = False
+        self.one = False
+        self.unsorted = False
+        self.width = None       # terminal columns, None for one entry per line
+
+
+def _parse_args(args):
+    options = _Options()
     paths = []
+    flags = {"a": "all", "l": "long", "R": "recursive", "1": "one", "U": "unsorted"}
+    for i, arg in enumerate(args):
+        if arg == "--":
+            paths.extend(args[i + 1:])
+            break
+        if not arg.startswith("-") or arg == "-":
+            paths.append(arg)
+            continue
+        for flag in arg[1:]:
+            if flag not in flags:
+                raise ValueError(f"unknown option -{flag}")
+            setattr(options, flags[flag], True)
+    return options, paths or ["."]
+
+
+_owners = {}
+_groups = {}
+
+
+def _owner(uid):
+    name = _owners.get(uid)
+    if name is None:
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except KeyError:
+            name = str(uid)
+        _owners[uid] = name
+    return name
+
+
+def _group(gid):
+    name = _groups.get(gid)
+    if name is None:
+        try:
+            name = grp.getgrgid(gid).gr_name
+        except KeyError:
+            name = str(gid)
+        _groups[gid] = name
+    return name
+
+
+_mtimes = {}    # (minute, recent) -> text; files in a directory share a few
+
 
-    for arg in args:
-        if arg.startswith("-"):
-            if "a" in arg:
-                show_all = True
+def _mtime(seconds, now):
+    recent = 0 <= now - seconds < _RECENT
+    key = (int(seconds) // 60, recent)
+    text = _mtimes.get(key)
+    if text is None:
+        if len(_mtimes) > 4096:
+            _mtimes.clear()
+        text = time.strftime("%b %e %H:%M" if recent else "%b %e  %Y", time.localtime(seconds))
+        _mtimes[key] = text
+    return text
+
+
+def _long_fields(name, st, path, now):
+    """The columns of one -l line, left to right."""
+    if stat.S_ISLNK(st.st_mode):
+        try:
+            name = f"{name} -> {os.readlink(path)}"
+        except OSError:
+            pass
+    return (stat.filemode(st.st_mode), str(st.st_nlink), _owner(st.st_uid),
+            _group(st.st_gid), str(st.st_size), _mtime(st.st_mtime, now), name)
+
+
+def _long_lines(rows):
+    """-l lines for rows of _long_fields, each column as wide as its widest cell."""
+    if not rows:
+        return ""
+    widths = [max(len(row[i]) for row in rows) for i in range(5)]
+    return "".join(
+        f"{mode} {links:>{widths[1]}} {owner:<{widths[2]}} {group:<{widths[3]}} "
+        f"{size:>{widths[4]}} {mtime} {name}\n"
+        for mode, links, owner, group, size, mtime, name in rows
+    )
+
+
+def _columns(names, width):
+    """names laid out down then across in as many columns as fit in width."""
+    if not names:
+        return ""
+    lengths = [len(name) + 2 for name in names]
+    # the most columns that could fit, tried downwards until one does
+    cols = max(1, min(len(names), width // min(lengths)))
+    while cols > 1:
+        rows = math.ceil(len(names) / cols)
+        widths = [max(lengths[c * rows:(c + 1) * rows]) for c in range(math.ceil(len(names) / rows))]
+        if sum(widths) - 2 <= width:
+            break
+        cols -= 1
+    else:
+        return "".join(name + "\n" for name in names)
+
+    lines = []
+    for r in range(rows):
+        cells = [names[c * rows + r] for c in range(len(widths)) if c * rows + r < len(names)]
+        lines.append("".join(f"{name:<{widths[c]}}" for c, name in enumerate(cells[:-1])) + cells[-1])
+    return "\n".join(lines) + "\n"
+
+
+def _scan(path, options):
+    """
+    Read one directory. Returns (listing text, subdirectories to list next).
+    Runs on the -R walker's threads as well as the caller's.
+    """
+    names = []
+    rows = []
+    subdirs = []
+    blocks = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not options.all and entry.name in HIDDEN:
+                continue
+            if options.long:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    # gone since it was read
+                    continue
+                blocks += st.st_blocks
+                rows.append((entry.name, st, entry.path))
+            else:
+                names.append(entry.name)
+            # the dirent's type; links to directories are not followed
+            if options.recursive and entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+
+    if not options.unsorted:
+        names.sort()
+        rows.sort(key=lambda row: row[0])
+        subdirs.sort()
+    if options.long:
+        now = time.time()
+        rows = [_long_fields(name, st, entry_path, now) for name, st, entry_path in rows]
+        return f"total {blocks // 2}\n" + _long_lines(rows), subdirs
+    if options.width:
+        return _columns(names, options.width), subdirs
+    return "".join(name + "\n" for name in names), subdirs
+
+
+def _stream(path, options, out):
+    """ls -U of one directory: every entry written as it is read."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not options.all and entry.name in HIDDEN:
+                continue
+            if not options.long:
+                out.write(entry.name + "\n")
+                continue
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            # no "total" and no column alignment: both need the whole directory
+            out.write(_long_lines([_long_fields(entry.name, st, entry.path, time.time())]))
+
+
+def _error(out, message, e):
+    out.write(f"ls: {message} '{e.filename}': {e.strerror}\n")
+
+
+def _walk(root, options, out):
+    """
+    ls -R below root, whose header is already written. The subdirectories
+    of every directory written are scanned in the background, so the next
+    listings are usually ready by the time they are due. Returns 1 if a
+    directory could not be read.
+    """
+    status = 0
+    first = True
+
+    def emit(path, future):
+        nonlocal status, first
+        if not first:
+            out.write(f"\n{path}:\n")
+        first = False
+        try:
+            listing, subdirs = future.result()
+        except OSError as e:
+            _error(out, "cannot open directory", e)
+            status = 1
+            return []
+        out.write(listing)
+        return [(subdir, pool.submit(_scan, subdir, options)) for subdir in subdirs]
+
+    pool = ThreadPoolExecutor(max_workers=WALK_WORKERS, thread_name_prefix="pysh-ls")
+    try:
+        if options.unsorted:
+            # whichever scan finishes first is written first
+            pending = {pool.submit(_scan, root, options): root}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.update((f, path) for path, f in emit(pending.pop(future), future))
         else:
-            paths.append(arg)
+            # depth first, in name order
+            stack = [(root, pool.submit(_scan, root, options))]
+            while stack:
+                stack.extend(reversed(emit(*stack.pop())))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return status
+
+
+def run(args):
+    try:
+        options, paths = _parse_args(args)
+    except ValueError as e:
+        print(f"ls: {e}")
+        print(USAGE)
+        return 2
+
+    out = Writer(sys.stdout, WRITE_BUFFER)
+    if not (options.one or options.long or options.unsorted) and sys.stdout.isatty():
+        options.width = shutil.get_terminal_size().columns
 
-    if not paths:
-        paths = ["."]
-    
-    items = []
+    status = 0
+    files = []
+    dirs = []
     for path in paths:
-        if os.path.isdir(path):
-            for f in os.listdir(path):
-                if show_all or f not in (".DS_Store", ".localized"):
-                    items.append(os.path.join(path, f) if path != "." else f)
-        elif os.path.exists(path):
-            items.append(path)
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            _error(out, "cannot access", e)
+            status = 2
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            dirs.append(path)
         else:
-            print(f"ls: cannot access '{path}': No such file or directory")
+            files.append(path)
+
+    # files named on the command line come first, then each directory
+    if not options.unsorted:
+        files.sort()
+        dirs.sort()
+    if options.long:
+        now = time.time()
+        out.write(_long_lines([_long_fields(path, os.lstat(path), path, now) for path in files]))
+    elif options.width:
+        out.write(_columns(files, options.width))
+    else:
+        out.write("".join(name + "\n" for name in files))
 
-    for item in sorted(items):
-        print(item)
\ No newline at end of file
+    headers = len(paths) > 1 or options.recursive
+    for i, path in enumerate(dirs):
+        if headers:
+            out.write(f"\n{path}:\n" if files or i else f"{path}:\n")
+        try:
+            if options.recursive:
+                status = max(status, _walk(path, options, out))
+            elif options.unsorted:
+                _stream(path, options, out)
+            else:
+                out.write(_scan(path, options)[0])
+        except OSError as e:
+            _error(out, "cannot open directory", e)
+            status = 2
+    out.flush()
+    return status
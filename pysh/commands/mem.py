@@ -1,37 +1,70 @@
 """
 memory monitor for pysh
-displays RAM usage in a boxed table with colors
+displays RAM usage in a boxed table with colors,
+with the usage history as a sparkline and its min/avg/max
+
+mem [--json | --csv] [--count N] [--interval SECONDS] [--serve PORT]
+writes samples instead of drawing (see monitor/export.py)
 """
 
-import psutil
-import time
-import os
+from monitor import export
+from monitor.sampler import get_sampler, sparkline
+from monitor.screen import Screen, table
 
-RESET = "\033[0m"
-HEADER_COLOR = "\033[1;37m"
 LABEL_COLOR = "\033[1;36m"
 VALUE_COLOR = "\033[1;33m"
+HISTORY_COLOR = "\033[1;32m"
+
+USAGE = f"usage: mem {export.EXPORT_USAGE}"
+
+HISTORY_WIDTH = 36
+COLUMNS = [("Metric", 20), ("Value", 15)]
+
+
+def _frame(sampler):
+    with sampler.lock:
+        mem = sampler.memory
+        ring = sampler.series["mem"]
+        history = sparkline(ring.values(), HISTORY_WIDTH)
+        low, avg, high = ring.stats()
+    rows = [
+        [("Total", LABEL_COLOR), (f"{mem.total / (1024**3):.2f} GB", VALUE_COLOR)],
+        [("Used", LABEL_COLOR), (f"{mem.used / (1024**3):.2f} GB", VALUE_COLOR)],
+        [("Available", LABEL_COLOR), (f"{mem.available / (1024**3):.2f} GB", VALUE_COLOR)],
+        [("Usage %", LABEL_COLOR), (f"{mem.percent:.1f}%", VALUE_COLOR)],
+    ]
+    return table(COLUMNS, rows) + [
+        [("History ", LABEL_COLOR), (history, HISTORY_COLOR)],
+        [("min / avg / max ", LABEL_COLOR), f"{low:.1f}% / {avg:.1f}% / {high:.1f}%"],
+        [],
+        ["Press Ctrl+C to exit."],
+    ]
+
+
+def _records(sampler):
+    mem = sampler.memory
+    return [{"total": mem.total, "used": mem.used, "available": mem.available, "percent": mem.percent}]
+
 
 def run(args=None):
     try:
-        while True:
-            if os.name == "nt":
-                os.system("cls")
-            else:
-                print("\033[H\033[J", end="")
-
-            mem = psutil.virtual_memory()
-
-            print("+" + "-"*20 + "+" + "-"*15 + "+")
-            print(f"|{HEADER_COLOR}{'Metric':^20}{RESET}|{HEADER_COLOR}{'Value':^15}{RESET}|")
-            print("+" + "-"*20 + "+" + "-"*15 + "+")
-            print(f"|{LABEL_COLOR}{'Total':^20}{RESET}|{VALUE_COLOR}{mem.total / (1024**3):.2f} GB{RESET}|")
-            print(f"|{LABEL_COLOR}{'Used':^20}{RESET}|{VALUE_COLOR}{mem.used / (1024**3):.2f} GB{RESET}|")
-            print(f"|{LABEL_COLOR}{'Available':^20}{RESET}|{VALUE_COLOR}{mem.available / (1024**3):.2f} GB{RESET}|")
-            print(f"|{LABEL_COLOR}{'Usage %':^20}{RESET}|{VALUE_COLOR}{mem.percent:.1f}%{RESET}|")
-            print("+" + "-"*20 + "+" + "-"*15 + "+")
-            print("\nPress Ctrl+C to exit.")
-            time.sleep(1)
+        options, rest = export.parse_args(args or [])
+        if rest:
+            raise ValueError(f"unknown option {rest[0]}")
+    except ValueError as e:
+        print(f"mem: {e}")
+        print(USAGE)
+        return 2
+    if options is not None:
+        return export.run("mem", _records, options)
+
+    sampler = get_sampler()
+    try:
+        with sampler.watching(), Screen() as screen:
+            sampler.wait_for_sample()
+            while True:
+                screen.draw(_frame(sampler))
+                screen.sleep(sampler.interval)
 
     except KeyboardInterrupt:
         print("\nexiting memory monitor")
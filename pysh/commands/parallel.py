@@ -0,0 +1,188 @@
+"""
+parallel builtin for pysh
+runs a command template once per input on a pool of workers
+
+parallel [-j N] [-k] COMMAND ARGS... ::: INPUT...
+parallel [-j N] [-k] 'COMMAND LINE' ::: INPUT...
+parallel [-j N] [-k] -a FILE COMMAND ARGS...
+ls | parallel gzip                   (inputs read from stdin)
+
+{} in the template is replaced by the input, which is appended when there
+is no {}. Jobs go through the normal checker and executor with their output
+buffered, and each job's output is printed in one piece when it ends: in
+completion order, or in input order with -k. A job whose command line
+does not lex (or an input that can't be quoted) fails with the error as
+its output, without running. A summary of failures and timings is
+printed at the end.
+"""
+
+import io
+import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import streams
+from checker import SemanticChecker
+from executor import Executor
+from lexer.lexer import lexer
+from parser.parser import parser
+from plan import Plan, Stage, compile_plan
+
+USAGE = "usage: parallel [-j N] [-k] [-a FILE] COMMAND [ARGS...] [::: INPUT...]"
+
+# characters that make a single template argument a whole command line
+_LINE_CHARS = set(" |&;")
+
+
+def _parse_args(args):
+    jobs = os.cpu_count() or 1
+    keep_order = False
+    input_file = None
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        opt = args[i]
+        if opt in ("-j", "--jobs") and i + 1 < len(args):
+            jobs = int(args[i + 1])
+            i += 2
+        elif opt.startswith("-j") and opt[2:].isdigit():
+            jobs = int(opt[2:])
+            i += 1
+        elif opt in ("-k", "--keep-order"):
+            keep_order = True
+            i += 1
+        elif opt in ("-a", "--arg-file") and i + 1 < len(args):
+            input_file = args[i + 1]
+            i += 2
+        else:
+            raise ValueError(f"unknown option {opt}")
+
+    rest = args[i:]
+    if ":::" in rest:
+        split = rest.index(":::")
+        template, inputs = rest[:split], rest[split + 1:]
+    else:
+        template, inputs = rest, None
+    if not template:
+        raise ValueError("missing command")
+    if jobs < 1:
+        raise ValueError("-j must be at least 1")
+
+    if inputs is None:
+        source = open(input_file) if input_file else sys.stdin
+        try:
+            inputs = [line.rstrip("\n") for line in source if line.strip()]
+        finally:
+            if input_file:
+                source.close()
+    return jobs, keep_order, template, inputs
+
+
+def _quote(value):
+    """Quote an input for the pysh lexer when it would not be one ARG."""
+    if value and not (_LINE_CHARS | set("<>#$\"'")) & set(value):
+        return value
+    # quotes can't be escaped inside pysh strings; use the other kind
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    raise SyntaxError("an input with both ' and \" can't be quoted")
+
+
+def _compile(template, value, checker):
+    """Build the plan for one input, checked like a typed command."""
+    if len(template) == 1 and _LINE_CHARS & set(template[0]):
+        line = template[0]
+        line = line.replace("{}", _quote(value)) if "{}" in line else f"{line} {_quote(value)}"
+        job_lexer = lexer.clone()
+        job_lexer.is_command_position = True
+        # the lexer prints what it can't read; that is this job's error
+        errors = io.StringIO()
+        with streams.redirect(stdout=errors):
+            ast_root = parser.parse(line, lexer=job_lexer)
+        if errors.getvalue():
+            raise SyntaxError(errors.getvalue().strip())
+        checker.check(ast_root)
+        return compile_plan(ast_root, checker.checked)
+
+    if any("{}" in arg for arg in template):
+        argv = [arg.replace("{}", value) for arg in template]
+    else:
+        argv = template + [value]
+    if not checker.command_exists(argv[0]):
+        raise RuntimeError(f"Command not found: {argv[0]}")
+    return Plan([([(None, [Stage(argv[0], argv[1:])])], False)])
+
+
+def _run_job(plan, children):
+    """Run one plan with its output captured; returns (status, output, seconds)."""
+    out = io.StringIO()
+    start = time.perf_counter()
+    with streams.redirect(stdout=out):
+        status = Executor(stream=False, children=children).run(plan)
+    return status, out.getvalue(), time.perf_counter() - start
+
+
+def run(args):
+    try:
+        jobs, keep_order, template, inputs = _parse_args(args)
+    except (ValueError, OSError) as e:
+        print(f"parallel: {e}")
+        print(USAGE)
+        return 2
+
+    # parsing and checking happen here, on one thread; workers only execute
+    checker = SemanticChecker()
+    plans = []
+    for value in inputs:
+        try:
+            plans.append(_compile(template, value, checker))
+        except SyntaxError as e:
+            # fails as a job, reported with the others
+            plans.append((2, f"parallel: {e}\n", 0.0))
+        except RuntimeError as e:
+            print(f"parallel: {value}: {e}")
+            return 1
+
+    results = [None] * len(plans)
+    children = []           # every process the jobs start
+    start = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        futures = {}
+        for i, plan in enumerate(plans):
+            if isinstance(plan, tuple):
+                future = Future()
+                future.set_result(plan)
+            else:
+                future = pool.submit(_run_job, plan, children)
+            futures[future] = i
+        done = futures if keep_order else as_completed(futures)
+        for future in done:
+            i = futures[future]
+            results[i] = future.result()
+            output = results[i][1]
+            if output:
+                sys.stdout.write(output if output.endswith("\n") else output + "\n")
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        # jobs already running would go on behind the prompt
+        for proc in children:
+            if proc.poll() is None:
+                proc.kill()
+        print("\nparallel: interrupted")
+        return 130
+    pool.shutdown()
+    wall = time.perf_counter() - start
+
+    failed = [(inputs[i], result[0]) for i, result in enumerate(results) if result[0] != 0]
+    durations = [result[2] for result in results]
+    if durations:
+        print(f"parallel: {len(results)} jobs, {len(failed)} failed, -j {jobs}, "
+              f"wall {wall:.2f}s, job avg {sum(durations) / len(durations):.2f}s "
+              f"max {max(durations):.2f}s")
+    for value, status in failed:
+        print(f"parallel: failed (exit {status}): {value}")
+    return 1 if failed else 0
@@ -1,49 +1,97 @@
 """
 Process monitor for Pysh
-Displays top CPU-consuming processes in a table
+Displays the top processes in a table, by CPU usage unless told otherwise
+
+ps [-n N] [-s cpu|rss|io] [--json | --csv] [--count N] [--interval SECONDS] [--serve PORT]
+
+-n N    show the top N processes (default 10)
+-s KEY  sort by cpu (default), rss (resident memory) or io (disk I/O rate)
+the export options write samples instead of drawing (see monitor/export.py)
 """
 
-import psutil
-import time
-import os
+from monitor import export
+from monitor.procs import CPU, IO, NAME, PID, RSS, SORT_KEYS, top
+from monitor.sampler import get_sampler
+from monitor.screen import Screen, table
 
-RESET = "\033[0m"
-HEADER_COLOR = "\033[1;37m"
 PID_COLOR = "\033[1;36m"
 NAME_COLOR = "\033[1;32m"
 CPU_COLOR = "\033[1;33m"
 
+USAGE = f"usage: ps [-n N] [-s cpu|rss|io] {export.EXPORT_USAGE}"
+
+COLUMNS = [("PID", 8), ("Process Name", 20), ("CPU %", 8), ("RSS MB", 10)]
+IO_COLUMN = ("IO KB/s", 10)
+
+
+def _parse_args(args):
+    count = 10
+    key = "cpu"
+    i = 0
+    while i < len(args):
+        opt = args[i]
+        if opt in ("-n", "-s", "--sort") and i + 1 < len(args):
+            value = args[i + 1]
+            i += 2
+        elif opt.startswith("-n") and opt[2:].isdigit():
+            opt, value = "-n", opt[2:]
+            i += 1
+        else:
+            raise ValueError(f"unknown option {opt}")
+        if opt == "-n":
+            count = int(value)
+            if count < 1:
+                raise ValueError("-n must be at least 1")
+        elif value in SORT_KEYS:
+            key = value
+        else:
+            raise ValueError(f"unknown sort key {value}")
+    return count, key
+
+
+def _frame(sampler, count, key):
+    with sampler.lock:
+        procs = sampler.processes
+        total = len(procs)
+
+    columns = COLUMNS + [IO_COLUMN] if key == "io" else COLUMNS
+    rows = []
+    for row in top(procs, key, count):
+        cells = [(str(row[0]), PID_COLOR), (row[1], NAME_COLOR),
+                 (f"{row[CPU]:.1f}", CPU_COLOR), f"{row[RSS] / (1024**2):.1f}"]
+        if key == "io":
+            cells.append(f"{row[IO] / 1024:.1f}")
+        rows.append(cells)
+    return table(columns, rows) + [[], [f"{total} processes, sorted by {key}. Press Ctrl+C to exit."]]
+
+
+def _records(sampler, count, key):
+    return [{"pid": row[PID], "name": row[NAME], "cpu_percent": row[CPU], "rss": row[RSS], "io_rate": row[IO]}
+            for row in top(sampler.processes, key, count)]
+
+
 def run(args=None):
     try:
-        while True:
-            if os.name == "nt":
-                os.system("cls")
-            else:
-                print("\033[H\033[J", end="")
-
-            procs = []
-            for p in psutil.process_iter(['name', 'cpu_percent']):
-                try:
-                    pid = p.pid
-                    name = p.info['name'] or "?"
-                    cpu = p.info['cpu_percent'] if p.info['cpu_percent'] is not None else 0.0
-                    procs.append((pid, name, cpu))
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-
-            procs.sort(key=lambda x: x[2], reverse=True)
-            top_procs = procs[:10]
-
-            print("+" + "-"*8 + "+" + "-"*20 + "+" + "-"*8 + "+")
-            print(f"|{HEADER_COLOR}{'PID':^8}{RESET}|{HEADER_COLOR}{'Process Name':^20}{RESET}|{HEADER_COLOR}{'CPU %':^8}{RESET}|")
-            print("+" + "-"*8 + "+" + "-"*20 + "+" + "-"*8 + "+")
-
-            for pid, name, cpu in top_procs:
-                print(f"|{PID_COLOR}{pid:^8}{RESET}|{NAME_COLOR}{name[:20]:^20}{RESET}|{CPU_COLOR}{cpu:^8.1f}{RESET}|")
-
-            print("+" + "-"*8 + "+" + "-"*20 + "+" + "-"*8 + "+")
-            print("\nPress Ctrl+C to exit.")
-            time.sleep(1)
+        options, rest = export.parse_args(args or [])
+        count, key = _parse_args(rest)
+    except ValueError as e:
+        print(f"ps: {e}")
+        print(USAGE)
+        return 2
+
+    # I/O rates cost an extra read per process; only measured when sorted by
+    groups = ("procs", "io") if key == "io" else ("procs",)
+    if options is not None:
+        return export.run("ps", lambda sampler: _records(sampler, count, key), options,
+                          labels=("pid", "name"), groups=groups)
+
+    sampler = get_sampler()
+    try:
+        with sampler.watching(*groups), Screen() as screen:
+            sampler.wait_for_sample("procs")
+            while True:
+                screen.draw(_frame(sampler, count, key))
+                screen.sleep(sampler.interval)
 
     except KeyboardInterrupt:
         print("\nExiting Process monitor.")
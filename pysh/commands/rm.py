@@ -1,15 +1,323 @@
+"""
+rm builtin for pysh
+removes files, and directories with everything in them
+
+rm [-f] [-v] [--dry-run] PATH...
+
+-f         no error for paths that do not exist
+-v         report how many files and directories are gone while it runs
+--dry-run  count what would be removed, remove nothing
+-r, -R     accepted; directories are always removed recursively
+
+Directories are removed by a pool of threads walking the tree relative to
+open directory fds: each directory is opened with dir_fd set to its
+parent's fd, read with os.scandir(fd), its files unlinked by name and,
+once all of its subdirectories are gone, it is removed from its parent's
+fd. No path is resolved twice and symlinks are removed, never followed.
+The workers take the most recently found directory first, so the walk
+goes depth first and keeps few directory fds open at a time.
+"""
+
 import os
-import shutil
+import stat
+import sys
+import threading
+import time
 
-def run(args):
-    if not args:
-        raise RuntimeError("rm: missing operand")
-    for item in args:
-        if os.path.isfile(item):
-            os.remove(item)
-            print(f"Removed file: {item}")
-        elif os.path.isdir(item):
-            shutil.rmtree(item)
-            print(f"Removed directory: {item}")
+USAGE = "usage: rm [-f] [-v] [--dry-run] PATH..."
+
+# threads removing at once; they mostly wait on the filesystem
+RM_WORKERS = 8
+# seconds between -v progress lines
+PROGRESS_INTERVAL = 1.0
+
+_OPEN_FLAGS = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW | os.O_CLOEXEC
+
+
+def _parse_args(args):
+    force = verbose = dry_run = False
+    paths = []
+    for i, arg in enumerate(args):
+        if arg == "--":
+            paths.extend(args[i + 1:])
+            break
+        if arg == "--dry-run":
+            dry_run = True
+        elif arg == "--force":
+            force = True
+        elif arg == "--verbose":
+            verbose = True
+        elif arg.startswith("-") and arg != "-":
+            for flag in arg[1:]:
+                if flag == "f":
+                    force = True
+                elif flag == "v":
+                    verbose = True
+                elif flag not in "rR":
+                    raise ValueError(f"unknown option -{flag}")
         else:
-            print(f"rm: cannot remove '{item}': No such file or directory")
\ No newline at end of file
+            paths.append(arg)
+    return force, verbose, dry_run, paths
+
+
+class _Dir:
+    """A directory being removed; finished when its last subdirectory is."""
+
+    __slots__ = ("name", "path", "parent", "fd", "pending", "failed")
+
+    def __init__(self, name, path, parent):
+        self.name = name            # relative to the parent's fd (the path for a root)
+        self.path = path            # for messages
+        self.parent = parent
+        self.fd = None
+        self.pending = 0            # subdirectories not removed yet
+        self.failed = False         # something below could not be removed
+
+
+class Remover:
+    """
+    Removes directory trees on a pool of worker threads.
+    remove() takes one tree at a time; the counters add up over all of them.
+    """
+
+    def __init__(self, workers=RM_WORKERS, dry_run=False):
+        self.workers = workers
+        self.dry_run = dry_run
+        self.files = 0
+        self.dirs = 0
+        self.errors = []            # (path, OSError)
+        self._stack = []            # _Dirs waiting for a worker, newest last
+        self._lock = threading.Lock()
+        # workers wait on _cond for directories, remove() on _done for the
+        # trees, so a notify meant for a worker never wakes the wrong waiter
+        self._cond = threading.Condition(self._lock)
+        self._done = threading.Condition(self._lock)
+        self._roots = 0             # trees being removed
+        self._open = set()          # _Dirs holding an fd
+        self._threads = []
+        self._cancelled = False
+
+    def remove(self, path, progress=None):
+        """
+        Remove the directory tree at path, blocking until it is done.
+        progress() is called every PROGRESS_INTERVAL seconds meanwhile.
+        Returns True if everything in it was removed.
+        """
+        root = _Dir(path, path, None)
+        with self._cond:
+            if not self._threads:
+                self._start()
+            self._roots += 1
+            self._stack.append(root)
+            self._cond.notify()
+        try:
+            self._wait(progress)
+        except BaseException:
+            # Ctrl+C: the workers stop taking directories
+            self.close()
+            self._abandon()
+            raise
+        return not root.failed
+
+    def _wait(self, progress):
+        deadline = time.monotonic() + PROGRESS_INTERVAL
+        while True:
+            with self._done:
+                if self._roots:
+                    self._done.wait(max(deadline - time.monotonic(), 0))
+                if not self._roots:
+                    return
+            # printed outside the lock, the workers keep going meanwhile
+            if progress and time.monotonic() >= deadline:
+                progress()
+                deadline += PROGRESS_INTERVAL
+
+    def close(self):
+        """Stop the worker threads."""
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+
+    def _abandon(self):
+        """After a cancel: let the workers finish their directory, close the rest's fds."""
+        for thread in self._threads:
+            thread.join()
+        for node in self._open:
+            os.close(node.fd)
+            node.fd = None
+        self._open.clear()
+
+    def _start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"pysh-rm-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._stack and not self._cancelled:
+                    self._cond.wait()
+                if self._cancelled:
+                    return
+                node = self._stack.pop()
+            self._clear(node)
+
+    def _clear(self, node):
+        """Open a directory, unlink its files and queue its subdirectories."""
+        parent_fd = node.parent.fd if node.parent else None
+        try:
+            node.fd = os.open(node.name, _OPEN_FLAGS, dir_fd=parent_fd)
+            with self._cond:
+                self._open.add(node)
+        except OSError as e:
+            self._error(node.path, e)
+            node.failed = True
+            self._finish(node)
+            return
+
+        files = 0
+        subdirs = []
+        try:
+            with os.scandir(node.fd) as entries:
+                for entry in entries:
+                    # the dirent's type: a link to a directory is unlinked, not entered
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(_Dir(entry.name, os.path.join(node.path, entry.name), node))
+                        continue
+                    if not self.dry_run:
+                        try:
+                            os.unlink(entry.name, dir_fd=node.fd)
+                        except FileNotFoundError:
+                            continue
+                        except OSError as e:
+                            self._error(os.path.join(node.path, entry.name), e)
+                            node.failed = True
+                            continue
+                    files += 1
+        except OSError as e:
+            self._error(node.path, e)
+            node.failed = True
+
+        with self._cond:
+            self.files += files
+            node.pending = len(subdirs)
+            if subdirs:
+                self._stack.extend(subdirs)
+                self._cond.notify(len(subdirs))
+        if not subdirs:
+            self._finish(node)
+
+    def _finish(self, node):
+        """Remove an emptied directory, then its parent if it was the last one."""
+        while node is not None:
+            if node.fd is not None:
+                with self._cond:
+                    self._open.discard(node)
+                os.close(node.fd)
+                node.fd = None
+            parent = node.parent
+            if not node.failed:
+                try:
+                    if not self.dry_run:
+                        os.rmdir(node.name, dir_fd=parent.fd if parent else None)
+                except OSError as e:
+                    self._error(node.path, e)
+                    node.failed = True
+            with self._cond:
+                if not node.failed:
+                    self.dirs += 1
+                if parent is None:
+                    self._roots -= 1
+                    self._done.notify_all()
+                    return
+                parent.failed = parent.failed or node.failed
+                parent.pending -= 1
+                if parent.pending:
+                    return
+            node = parent
+
+    def _error(self, path, e):
+        with self._cond:
+            self.errors.append((path, e))
+
+
+def run(args):
+    try:
+        force, verbose, dry_run, paths = _parse_args(args)
+    except ValueError as e:
+        print(f"rm: {e}")
+        print(USAGE)
+        return 2
+    if not paths:
+        print("rm: missing operand")
+        print(USAGE)
+        return 2
+
+    remover = Remover(dry_run=dry_run)
+    start = time.monotonic()
+    done = "would be removed" if dry_run else "removed"
+
+    def progress():
+        print(f"rm: {remover.files} files, {remover.dirs} directories {done}")
+        sys.stdout.flush()
+
+    status = 0
+    try:
+        for path in paths:
+            if os.path.basename(path.rstrip(os.sep)) in (".", ".."):
+                print(f"rm: refusing to remove '.' or '..' directory: skipping '{path}'")
+                status = 1
+                continue
+            try:
+                mode = os.lstat(path).st_mode
+            except FileNotFoundError:
+                if not force:
+                    print(f"rm: cannot remove '{path}': No such file or directory")
+                    status = 1
+                continue
+            except OSError as e:
+                print(f"rm: cannot remove '{path}': {e.strerror}")
+                status = 1
+                continue
+
+            if not stat.S_ISDIR(mode):
+                try:
+                    if not dry_run:
+                        os.unlink(path)
+                except OSError as e:
+                    print(f"rm: cannot remove '{path}': {e.strerror}")
+                    status = 1
+                    continue
+                remover.files += 1
+                print(f"Would remove file: {path}" if dry_run else f"Removed file: {path}")
+                continue
+
+            if os.path.realpath(path) == os.sep:
+                print("rm: it is dangerous to operate recursively on '/'")
+                status = 1
+                continue
+            files, dirs = remover.files, remover.dirs
+            removed = remover.remove(path, progress if verbose else None)
+            for failed, e in remover.errors:
+                print(f"rm: cannot remove '{failed}': {e.strerror}")
+            remover.errors.clear()
+            if not removed:
+                status = 1
+            elif dry_run:
+                print(f"Would remove directory: {path} "
+                      f"({remover.files - files} files, {remover.dirs - dirs} directories)")
+            else:
+                print(f"Removed directory: {path}")
+    except KeyboardInterrupt:
+        print(f"\nrm: interrupted, {remover.files} files, {remover.dirs} directories {done}")
+        return 130
+    finally:
+        remover.close()
+
+    if verbose:
+        seconds = time.monotonic() - start
+        rate = (remover.files + remover.dirs) / seconds if seconds else 0.0
+        print(f"rm: {remover.files} files, {remover.dirs} directories {done} "
+              f"in {seconds:.2f}s ({rate:.0f}/s)")
+    return status
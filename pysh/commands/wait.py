@@ -0,0 +1,54 @@
+"""
+wait builtin for pysh
+waits for background jobs to finish and returns the last one's status
+
+wait            every job
+wait %N PID     the given jobs / processes
+"""
+
+import os
+
+from jobtable import job_table
+
+
+def _wait_pid(pid):
+    for job in list(job_table.jobs.values()):
+        for proc in job.procs:
+            if proc.pid == pid:
+                return proc.wait()
+    # not one of ours, but a child we can still wait for
+    try:
+        _, status = os.waitpid(pid, 0)
+    except ChildProcessError:
+        print(f"wait: pid {pid} is not a child of this shell")
+        return 127
+    return os.waitstatus_to_exitcode(status)
+
+
+def run(args):
+    status = 0
+    try:
+        if not args:
+            for job in list(job_table.jobs.values()):
+                status = job.wait()
+                job_table.remove(job)
+            return status
+
+        for spec in args:
+            if spec.startswith("%"):
+                job = job_table.get(spec)
+                if job is None:
+                    print(f"wait: {spec}: no such job")
+                    status = 127
+                    continue
+                status = job.wait()
+                job_table.remove(job)
+            elif spec.isdigit():
+                status = _wait_pid(int(spec))
+            else:
+                print(f"wait: {spec}: not a pid or valid job spec")
+                status = 2
+    except KeyboardInterrupt:
+        print()
+        return 130
+    return status
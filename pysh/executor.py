@@ -1,85 +1,395 @@
+import codecs
+import os
 import subprocess
+import sys
+import threading
+import streams
+from cmdhash import command_hash
+from registry import builtin_registry
 from parser.node import Node
-from commands import cd, cpu, disk, ls, mem, mkdir, ps, pwd, rm
+from jobtable import job_table
+from plan import Plan, Stage, compile_plan, describe
+from spawn import spawn
 
 
-# map of built-in command names to their module run() functions
-BUILTIN_COMMANDS = {
-	"cd": cd.run,
-	"cpu": cpu.run,
-	"disk": disk.run,
-	"ls": ls.run,
-	"mem": mem.run,
-	"mkdir": mkdir.run,
-	"ps": ps.run,
-	"pwd": pwd.run,
-	"rm": rm.run,
-}
+# read size used when pumping a child's output through pysh
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 class Executor:
 	"""
-	Executes commands from an AST root Node.
+	Executes compiled plans (see plan.py), or an AST root Node by compiling it first.
 
 	Built-in commands are dispatched to their respective module run() functions.
-	External commands are executed via subprocess.
+	External commands are started through the spawn backend (spawn.py). In streaming mode (the
+	default when stdout is a terminal) their output reaches the terminal as it
+	is produced; otherwise it is collected and printed once the command exits.
 	"""
 
-	def __init__(self):
-		pass
+	def __init__(self, stream=None, job=None, children=None):
+		if stream is None:
+			stream = sys.stdout.isatty()
+		self.stream = stream
+		# set on the executors that run background jobs: every process they
+		# start joins the job's process group
+		self.job = job
+		# a list every started process is added to, for callers running
+		# plans on worker threads that must kill them on Ctrl+C (parallel)
+		self.children = children
 
 	def execute(self, root: Node):
+		"""Execute an AST and return the exit status of the last command run."""
 		if root is None:
-			return
-		self._execute_node(root)
+			return 0
+		return self.run(compile_plan(root))
 
-	def _execute_node(self, node: Node):
-		if node.name == "Command":
-			self._execute_command(node)
-		else:
-			for child in getattr(node, "children", []):
-				self._execute_node(child)
+	def run(self, plan: Plan):
+		"""
+		Run the and-or lists of a plan in order, starting those ended by '&'
+		as background jobs. Returns the status of the last foreground list.
+		"""
+		status = 0
+		for steps, background in plan.lists:
+			if background:
+				status = self._start_job(steps)
+			else:
+				status = self._run_steps(steps)
+		return status
 
-	def _execute_command(self, command_node: Node):
-		if not command_node.children:
-			return
+	def _run_steps(self, steps: list):
+		"""
+		Run one and-or list.
+		'&&' runs the next pipeline only after success, '||' only after
+		failure. A skipped pipeline leaves the status unchanged, as in bash.
+		"""
+		status = 0
+		for op, stages in steps:
+			if (op == "&&" and status != 0) or (op == "||" and status == 0):
+				continue
+			if self.job is not None:
+				if self.job.killed:
+					# `kill %N` ends the whole list, not just the pipeline running
+					break
+				# the previous pipeline's group is gone once its leader was reaped
+				self.job.new_group()
+			if len(stages) == 1:
+				status = self._execute_stage(stages[0])
+			else:
+				status = self._execute_pipeline(stages)
+		return status
 
-		command_name_node = command_node.children[0]
-		command_name = getattr(command_name_node.token, "value", command_name_node.token)
-		args = [getattr(child.token, "value", child.token) for child in command_node.children[1:]]
+	def _start_job(self, steps: list):
+		"""
+		Start an and-or list in the background and add it to the job table.
 
-		if command_name in BUILTIN_COMMANDS:
-			self._execute_builtin_command(command_name, args)
+		A single pipeline is started directly, its processes are reaped from
+		the SIGCHLD handler. Lists that need decisions between pipelines
+		(a && b &) run on a thread of their own.
+		"""
+		job = job_table.add(describe(steps))
+		runner = Executor(stream=self.stream, job=job)
+		out_fd = self._stdout_fd()
+		sys.stdout.flush()
+		if len(steps) == 1 and out_fd is not None:
+			# background jobs don't read the terminal
+			stdin_fd = os.open(os.devnull, os.O_RDONLY)
+			job.handles = runner._start_pipeline(steps[0][1], out_fd, stdin_fd)
 		else:
-			self._execute_external_command(command_name, args)
+			thread = _JobThread(runner, steps)
+			job.handles = [thread]
+			thread.start()
+		print(f"[{job.id}] {job.pgid}" if job.pgid else f"[{job.id}]")
+		return 0
+
+	def _execute_stage(self, stage: Stage):
+		if stage.func is not None:
+			return self._execute_builtin_command(stage.name, stage.args, stage.func)
+		return self._execute_external_command(stage.name, stage.args, stage.executable)
 
-	def _execute_builtin_command(self, command_name: str, args: list):
+	def _execute_builtin_command(self, command_name: str, args: list, func=None):
 		"""Dispatch built-in commands to their respective module run() functions."""
 		try:
-			func = BUILTIN_COMMANDS.get(command_name)
+			func = func or builtin_registry.get(command_name)
 			if func:
-				func(args)
-			else:
-				print(f"Unknown built-in command: {command_name}")
+				status = func(args)
+				return status if isinstance(status, int) else 0
+			print(f"Unknown built-in command: {command_name}")
+		except BrokenPipeError:
+			# the reader went away, e.g. `ls | head -1`
+			return 141
 		except Exception as e:
 			print(f"Error executing {command_name}: {e}")
+		return 1
+
+	def _execute_pipeline(self, stages: list):
+		"""
+		Run every stage of a pipeline at once, connected by OS pipes.
+
+		External stages read and write the pipe fds directly, so data flows
+		between processes without passing through pysh. Built-in stages run
+		on threads with their own stdin/stdout bound to the pipe ends.
+		Returns the exit status of the last stage.
+		"""
+		sys.stdout.flush()
+		out_fd = self._stdout_fd() if self.stream else None
+		running = self._start_pipeline(stages, out_fd)
+		statuses = [proc.wait() for proc in running]
+		return statuses[-1]
+
+	def _start_pipeline(self, stages: list, out_fd, stdin_fd=None):
+		"""
+		Start the stages of a pipeline without waiting for them.
+		The last stage writes to out_fd (None: pumped through sys.stdout).
+		Returns a handle with wait()/poll() for every stage.
+		"""
+		running = []
+		read_fd = stdin_fd
+		try:
+			for i, stage in enumerate(stages):
+				last = i == len(stages) - 1
+				if last:
+					next_read_fd, write_fd = None, out_fd
+				else:
+					next_read_fd, write_fd = os.pipe()
+				running.append(self._start_stage(stage, read_fd, write_fd, last))
+				read_fd = next_read_fd
+		except Exception as e:
+			print(f"Error executing pipeline: {e}")
+			if read_fd is not None:
+				os.close(read_fd)
+			running.append(_FailedStage(1))
+		return running
+
+	def _start_stage(self, stage: Stage, stdin_fd, stdout_fd, last: bool):
+		"""
+		Start one pipeline stage. Takes ownership of stdin_fd and, unless it is
+		the shared terminal fd of the last stage, of stdout_fd.
+		"""
+		if stage.func is not None:
+			thread = _BuiltinStage(self, stage, stdin_fd, None if last else stdout_fd)
+			thread.start()
+			return thread
+
+		pump = last and stdout_fd is None
+		try:
+			proc = self._spawn(
+				[stage.name] + stage.args,
+				stage.executable or self._resolve(stage.name),
+				stdin=stdin_fd,
+				stdout=subprocess.PIPE if pump else stdout_fd,
+			)
+		except FileNotFoundError:
+			print(f"Command not found: {stage.name}")
+			return _FailedStage(127)
+		finally:
+			# the child holds its own copies now
+			if stdin_fd is not None:
+				os.close(stdin_fd)
+			if stdout_fd is not None and not last:
+				os.close(stdout_fd)
+		if pump:
+			return _PumpedStage(proc)
+		return proc
+
+	def _spawn(self, argv: list, executable: str, **kwargs):
+		"""
+		Start a child process through the spawn backend (spawn.py), inside
+		the job's process group for background jobs.
+		"""
+		if self.job is not None:
+			# 0 makes the first process the leader of a new group
+			kwargs["process_group"] = self.job.pgid or 0
+		proc = spawn(argv, executable, **kwargs)
+		# one hit per run, cached plans included (`hash` shows the counts)
+		command_hash.hit(argv[0])
+		if self.job is not None:
+			self.job.add_process(proc)
+		if self.children is not None:
+			self.children.append(proc)
+		return proc
+
+	@staticmethod
+	def _resolve(command_name: str):
+		"""
+		Absolute path of an external command from the command hash table,
+		so the child is exec'd directly instead of searching PATH again.
+		"""
+		return command_hash.lookup(command_name) or command_name
 
-	def _execute_external_command(self, command_name: str, args: list):
+	@staticmethod
+	def _stdout_fd():
+		"""The fd behind sys.stdout, or None if it is not a real file."""
+		try:
+			return sys.stdout.fileno()
+		except (AttributeError, OSError, ValueError):
+			return None
+
+	def _execute_external_command(self, command_name: str, args: list, executable=None):
 		"""Execute external commands using subprocess."""
 		try:
 			cmd = [command_name] + args
-			result = subprocess.run(
+			executable = executable or self._resolve(command_name)
+			if self.stream:
+				return self._stream_external_command(cmd, executable)
+			proc = self._spawn(
 				cmd,
+				executable,
 				stdout=subprocess.PIPE,
 				stderr=subprocess.PIPE,
 				text=True,
-				check=False
 			)
-			if result.stdout:
-				print(result.stdout, end='')
-			if result.stderr:
-				print(result.stderr, end='')
+			try:
+				stdout, stderr = proc.communicate()
+			except BaseException:
+				proc.kill()
+				proc.wait()
+				raise
+			if stdout:
+				print(stdout, end='')
+			if stderr:
+				print(stderr, end='')
+			return proc.returncode
 		except FileNotFoundError:
 			print(f"Command not found: {command_name}")
 		except Exception as e:
 			print(f"Error executing {command_name}: {e}")
+		return 127
+
+	def _stream_external_command(self, cmd: list, executable: str):
+		"""
+		Run a command without holding its output in memory.
+
+		When sys.stdout is backed by a real file descriptor the child simply
+		inherits it (and stderr), so output goes straight to the terminal.
+		Otherwise stdout and stderr are merged into one pipe and copied across
+		in fixed-size binary chunks as they arrive.
+		"""
+		# anything pysh printed earlier must land before the child's output
+		sys.stdout.flush()
+		sys.stderr.flush()
+
+		fd = self._stdout_fd()
+		if fd is not None:
+			return _wait_foreground(self._spawn(cmd, executable, stdout=fd))
+
+		proc = self._spawn(cmd, executable, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+		return _PumpedStage(proc).wait()
+
+
+def _wait_foreground(proc):
+	"""Wait for a child; on Ctrl+C don't leave it running behind the prompt."""
+	try:
+		return proc.wait()
+	except BaseException:
+		proc.kill()
+		proc.wait()
+		raise
+
+
+def _pump_output(pipe):
+	"""Copy a child's output pipe to sys.stdout in bounded binary chunks."""
+	out = getattr(sys.stdout, "buffer", None)
+	decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+	fd = pipe.fileno()
+	while True:
+		chunk = os.read(fd, STREAM_CHUNK_SIZE)
+		if not chunk:
+			break
+		if out is not None:
+			out.write(chunk)
+		else:
+			sys.stdout.write(decoder.decode(chunk))
+		sys.stdout.flush()
+
+
+class _PumpedStage:
+	"""A process whose output is copied to sys.stdout when waited on."""
+
+	def __init__(self, proc):
+		self.proc = proc
+
+	def wait(self):
+		try:
+			_pump_output(self.proc.stdout)
+		finally:
+			self.proc.stdout.close()
+			self.proc.wait()
+		return self.proc.returncode
+
+	def poll(self):
+		return self.proc.poll()
+
+
+class _FailedStage:
+	"""Placeholder for a stage that could not be started."""
+
+	def __init__(self, returncode):
+		self.returncode = returncode
+
+	def wait(self):
+		return self.returncode
+
+	def poll(self):
+		return self.returncode
+
+
+class _BuiltinStage(threading.Thread):
+	"""A built-in command running as a pipeline stage on its own thread."""
+
+	def __init__(self, executor, stage, stdin_fd, stdout_fd):
+		super().__init__(name=f"pysh-{stage.name}", daemon=True)
+		self.executor = executor
+		self.stage = stage
+		self.stdin_fd = stdin_fd
+		self.stdout_fd = stdout_fd
+		# the streams of the thread starting the pipeline, used where the
+		# stage has no pipe (e.g. output captured by parallel)
+		self.inherited = streams.current()
+		self.returncode = None
+
+	def run(self):
+		stdin = os.fdopen(self.stdin_fd, "r", errors="replace") if self.stdin_fd is not None else None
+		stdout = os.fdopen(self.stdout_fd, "w") if self.stdout_fd is not None else None
+		try:
+			with streams.redirect(stdin=stdin or self.inherited[0], stdout=stdout or self.inherited[1]):
+				self.returncode = self.executor._execute_builtin_command(self.stage.name, self.stage.args, self.stage.func)
+		finally:
+			# closing our pipe ends signals EOF downstream / EPIPE upstream
+			for f in (stdout, stdin):
+				if f is not None:
+					try:
+						f.close()
+					except OSError:
+						pass
+
+	def wait(self):
+		self.join()
+		return self.returncode
+
+	def poll(self):
+		return None if self.is_alive() else self.returncode
+
+
+class _JobThread(threading.Thread):
+	"""Runs an and-or list of a background job."""
+
+	def __init__(self, executor, steps):
+		super().__init__(name="pysh-job", daemon=True)
+		self.executor = executor
+		self.steps = steps
+		self.returncode = None
+
+	def run(self):
+		with open(os.devnull) as devnull, streams.redirect(stdin=devnull):
+			try:
+				self.returncode = self.executor._run_steps(self.steps)
+			except Exception as e:
+				print(f"Error executing job: {e}")
+				self.returncode = 1
+
+	def wait(self):
+		self.join()
+		return self.returncode
+
+	def poll(self):
+		return None if self.is_alive() else self.returncode
@@ -0,0 +1,257 @@
+"""
+job table for pysh
+
+Keeps track of commands started in the background with '&'. Each job has its
+own process group so the terminal's Ctrl+C only reaches the foreground.
+Finished children are reaped when SIGCHLD arrives rather than by polling, and
+the REPL reports finished jobs before the next prompt, like bash does.
+"""
+
+import os
+import signal
+import sys
+import threading
+from contextlib import contextmanager
+
+from spawn import wait_untraced
+
+RUNNING = "Running"
+STOPPED = "Stopped"
+DONE = "Done"
+
+# seconds between checks for a stopped group while a job's thread runs
+STOP_CHECK = 0.05
+
+# signals that don't end a process by default
+_NON_FATAL = frozenset(getattr(signal, name) for name in (
+    "SIGSTOP", "SIGTSTP", "SIGTTIN", "SIGTTOU", "SIGCONT", "SIGCHLD", "SIGWINCH", "SIGURG")
+    if hasattr(signal, name))
+
+
+class Job:
+
+    def __init__(self, job_id: int, command: str):
+        self.id = job_id
+        self.command = command
+        # everything that has to finish for the job to be done: processes,
+        # built-in stage threads or the thread running an and-or list
+        self.handles = []
+        # processes started for the job, for signalling
+        self.procs = []
+        # the group of the pipeline running now; each pipeline of a list
+        # (a && b &) gets a new one, as the previous group ends with it
+        self.pgid = None
+        # the terminal while the job is in the foreground (fg)
+        self.tty_fd = None
+        # set by a signal that ends the job: the rest of a list is not run
+        self.killed = False
+        self.state = RUNNING
+        self.status = None
+        # number of the signal that killed the last process, if any
+        self.signaled = None
+
+    def add_process(self, proc):
+        """Record a process started in the job's process group."""
+        if self.pgid is None:
+            # the first process leads the group
+            self.pgid = proc.pid
+            if self.tty_fd is not None:
+                # a later pipeline of a list run with fg gets the terminal too
+                try:
+                    os.tcsetpgrp(self.tty_fd, self.pgid)
+                except OSError:
+                    pass
+        self.procs.append(proc)
+
+    def new_group(self):
+        """Make the next process started lead a new process group."""
+        self.pgid = None
+
+    def poll(self):
+        """Update and return the job's state without blocking."""
+        if self.state == DONE:
+            return self.state
+        statuses = [handle.poll() for handle in self.handles]
+        if statuses and all(status is not None for status in statuses):
+            self.state = DONE
+            # Popen reports death by signal N as -N, shells as 128 + N
+            if statuses[-1] < 0:
+                self.signaled = -statuses[-1]
+                self.status = 128 + self.signaled
+            else:
+                self.status = statuses[-1]
+        return self.state
+
+    def wait(self, stop=False):
+        """
+        Block until the job is done and return its exit status. With
+        stop=True, return None as soon as the job is stopped instead (Ctrl+Z
+        while it has the terminal), with its state set to STOPPED.
+        """
+        for handle in self.handles:
+            if not stop:
+                handle.wait()
+            elif not self._wait_or_stop(handle):
+                self.state = STOPPED
+                return None
+        self.poll()
+        return self.status
+
+    def _wait_or_stop(self, handle):
+        """Wait for one handle; False if the job was stopped first."""
+        if hasattr(handle, "pid"):
+            return wait_untraced(handle) is not None
+        if not isinstance(handle, threading.Thread):
+            handle.wait()
+            return True
+        # a built-in stage or a list: its processes are in the job's group
+        while handle.is_alive():
+            if self._group_stopped():
+                return False
+            handle.join(STOP_CHECK)
+        return True
+
+    def _group_stopped(self):
+        """Take a stop report from the job's current group, if it has one."""
+        if self.pgid is None or not hasattr(os, "waitid"):
+            return False
+        try:
+            return os.waitid(os.P_PGID, self.pgid, os.WSTOPPED | os.WNOHANG) is not None
+        except ChildProcessError:
+            return False
+
+    def signal(self, signum: int):
+        """Send a signal to every process of the job."""
+        if signum not in _NON_FATAL:
+            self.killed = True
+        try:
+            if self.pgid is not None:
+                os.killpg(self.pgid, signum)
+            else:
+                for proc in self.procs:
+                    proc.send_signal(signum)
+        except ProcessLookupError:
+            # a list between two pipelines has no group, but is not done
+            if self.poll() == DONE:
+                raise
+        if signum in (signal.SIGSTOP, signal.SIGTSTP):
+            self.state = STOPPED
+        elif signum == signal.SIGCONT and self.state == STOPPED:
+            self.state = RUNNING
+
+    def describe(self):
+        if self.state == DONE and self.signaled:
+            return signal.strsignal(self.signaled) or f"Signal {self.signaled}"
+        if self.state == DONE and self.status:
+            return f"Exit {self.status}"
+        return self.state
+
+
+class JobTable:
+
+    def __init__(self):
+        self.jobs = {}          # job id -> Job, in start order
+        self._handler_installed = False
+
+    def add(self, command: str):
+        """Create a job; the caller attaches its handles and processes."""
+        job_id = max(self.jobs, default=0) + 1
+        job = Job(job_id, command)
+        self.jobs[job_id] = job
+        self._install_handler()
+        return job
+
+    def get(self, spec: str):
+        """
+        Find a job by spec: %N, N, %% / %+ (current) or %- (previous).
+        Returns None if there is no such job.
+        """
+        ids = list(self.jobs)
+        if spec in ("%", "%%", "%+"):
+            return self.jobs[ids[-1]] if ids else None
+        if spec == "%-":
+            return self.jobs[ids[-2]] if len(ids) > 1 else None
+        try:
+            return self.jobs.get(int(spec.lstrip("%")))
+        except ValueError:
+            return None
+
+    def current(self):
+        return self.get("%+")
+
+    def remove(self, job: Job):
+        self.jobs.pop(job.id, None)
+
+    def marker(self, job: Job):
+        """'+' for the current job, '-' for the previous one, else ' '."""
+        ids = list(self.jobs)
+        if ids and job.id == ids[-1]:
+            return "+"
+        if len(ids) > 1 and job.id == ids[-2]:
+            return "-"
+        return " "
+
+    def format(self, job: Job):
+        return f"[{job.id}]{self.marker(job)}  {job.describe():<24}{job.command}"
+
+    def reap(self):
+        """Poll every job; called from the SIGCHLD handler and before prompts."""
+        for job in list(self.jobs.values()):
+            job.poll()
+
+    def notifications(self):
+        """Status lines for jobs that finished since the last call (then dropped)."""
+        self.reap()
+        lines = []
+        for job in list(self.jobs.values()):
+            if job.state == DONE:
+                lines.append(self.format(job))
+                self.remove(job)
+        return lines
+
+    @contextmanager
+    def foreground(self, job: Job):
+        """
+        Hand the terminal to a job's process group while it runs in the
+        foreground (fg), so Ctrl+C and Ctrl+Z reach the job, not pysh.
+        """
+        try:
+            tty_fd = sys.stdin.fileno()
+            handover = job.pgid is not None and os.isatty(tty_fd)
+        except (AttributeError, OSError, ValueError):
+            handover = False
+        if not handover:
+            yield
+            return
+
+        # taking the terminal back from the background raises SIGTTOU
+        previous = signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+        shell_pgid = os.getpgrp()
+        try:
+            os.tcsetpgrp(tty_fd, job.pgid)
+        except OSError:
+            pass
+        job.tty_fd = tty_fd
+        try:
+            yield
+        finally:
+            job.tty_fd = None
+            try:
+                os.tcsetpgrp(tty_fd, shell_pgid)
+            except OSError:
+                pass
+            signal.signal(signal.SIGTTOU, previous)
+
+    def _install_handler(self):
+        if self._handler_installed or not hasattr(signal, "SIGCHLD"):
+            return
+        try:
+            signal.signal(signal.SIGCHLD, lambda signum, frame: self.reap())
+        except ValueError:
+            # not the main thread; jobs are still reaped before each prompt
+            return
+        self._handler_installed = True
+
+
+# the shell-wide job table used by the executor and the job builtins
+job_table = JobTable()
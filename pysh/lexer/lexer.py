@@ -4,6 +4,8 @@
 lexer for pysh
 """
 
+import os
+import zlib
 import ply.lex as lex
 
 
@@ -107,7 +109,31 @@ def t_error(t):
     t.lexer.skip(1)  # Skip the bad character
 
 
-lexer = lex.lex()
+def rules_hash():
+    """
+    Checksum of the token list and every t_ rule (name and regex, in the
+    order PLY reads them). tables.py stores it in lextab.py.
+    """
+    text = [repr(tokens)]
+    for name, value in list(globals().items()):
+        if name.startswith("t_"):
+            text.append(f"{name}={value.__doc__ if callable(value) else value!r}")
+    return f"{zlib.crc32(chr(10).join(text).encode()):08x}"
+
+
+# Load the pre-generated tables in lexer/lextab.py (see tables.py) instead of
+# validating every rule on each start. If any token rule changed since they
+# were generated, fall back to building the lexer from the rules.
+try:
+    from lexer import lextab as _lextab
+    _tables_current = getattr(_lextab, "_rules_hash", None) == rules_hash()
+except ImportError:
+    _tables_current = False
+
+if _tables_current:
+    lexer = lex.lex(optimize=True, lextab="lexer.lextab", outputdir=os.path.dirname(__file__))
+else:
+    lexer = lex.lex()
 
 # We need to initialize our custom state
 lexer.is_command_position = True
@@ -0,0 +1,11 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('ARG', 'BACKGROUND', 'COMMAND', 'LOGICAL_AND', 'LOGICAL_OR', 'PIPE', 'REDIRECT_IN', 'REDIRECT_OUT', 'REDIRECT_OUT_APPEND', 'SEMICOLON', 'STRING_LITERAL', 'VARIABLE'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_LOGICAL_OR>\\|\\|)|(?P<t_LOGICAL_AND>&&)|(?P<t_REDIRECT_OUT_APPEND>>>)|(?P<t_PIPE>\\|)|(?P<t_REDIRECT_OUT>>)|(?P<t_REDIRECT_IN><)|(?P<t_SEMICOLON>;)|(?P<t_BACKGROUND>&)|(?P<t_VARIABLE>\\$[a-zA-Z_][a-zA-Z0-9_]*)|(?P<t_STRING_LITERAL>\\"[^"]*\\"|\\\'[^\\\']*\\\')|(?P<t_COMMENT>\\#.*)|(?P<t_WORD>[^\\s|&;<>#$"\\\']+)|(?P<t_newline>\\n+)', [None, ('t_LOGICAL_OR', 'LOGICAL_OR'), ('t_LOGICAL_AND', 'LOGICAL_AND'), ('t_REDIRECT_OUT_APPEND', 'REDIRECT_OUT_APPEND'), ('t_PIPE', 'PIPE'), ('t_REDIRECT_OUT', 'REDIRECT_OUT'), ('t_REDIRECT_IN', 'REDIRECT_IN'), ('t_SEMICOLON', 'SEMICOLON'), ('t_BACKGROUND', 'BACKGROUND'), ('t_VARIABLE', 'VARIABLE'), ('t_STRING_LITERAL', 'STRING_LITERAL'), ('t_COMMENT', 'COMMENT'), ('t_WORD', 'WORD'), ('t_newline', 'newline')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
+_rules_hash   = 'd03a30b0'
@@ -0,0 +1,194 @@
+"""
+non-interactive output for the pysh monitors
+
+cpu, mem, disk and ps take the same export options instead of drawing:
+
+--json              one JSON object per row, one line each
+--csv               CSV rows, with a header before the first sample
+--count N           number of samples to write (default 1, 0 = until Ctrl+C)
+--interval SECONDS  seconds between samples (the sampler's interval while it runs)
+--serve PORT        serve the latest sample at http://127.0.0.1:PORT/metrics
+                    in the Prometheus text format until Ctrl+C
+
+A monitor describes a sample as rows: flat dicts of numbers and strings.
+Every row written gets a "time" field. For Prometheus, each number becomes
+the gauge pysh_<monitor>_<field>, labelled with the row's label fields.
+All rows of a sample go out in one write.
+"""
+
+import csv
+import io
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from monitor.sampler import get_sampler
+
+EXPORT_USAGE = "[--json | --csv] [--count N] [--interval SECONDS] [--serve PORT]"
+
+
+class ExportOptions:
+
+    __slots__ = ("format", "count", "interval", "serve")
+
+    def __init__(self):
+        self.format = None      # "json" or "csv"
+        self.count = 1
+        self.interval = None
+        self.serve = None       # port for the Prometheus endpoint
+
+
+def parse_args(args):
+    """
+    Split the export options off a monitor's arguments.
+    Returns (ExportOptions, other args), or (None, args) without any.
+    Raises ValueError for a bad value.
+    """
+    options = ExportOptions()
+    rest = []
+    found = False
+    i = 0
+    while i < len(args):
+        opt = args[i]
+        if opt in ("--json", "--csv"):
+            options.format = opt[2:]
+            found = True
+            i += 1
+            continue
+        if opt not in ("--count", "--interval", "--serve"):
+            rest.append(opt)
+            i += 1
+            continue
+        if i + 1 >= len(args):
+            raise ValueError(f"{opt} needs a value")
+        value = args[i + 1]
+        try:
+            if opt == "--count":
+                options.count = int(value)
+            elif opt == "--interval":
+                options.interval = float(value)
+            else:
+                options.serve = int(value)
+        except ValueError:
+            raise ValueError(f"bad value for {opt}: {value}") from None
+        if options.count < 0 or (options.interval is not None and options.interval <= 0):
+            raise ValueError(f"bad value for {opt}: {value}")
+        found = True
+        i += 2
+    if not found:
+        return None, args
+    if options.format is None and options.serve is None:
+        options.format = "json"
+    return options, rest
+
+
+def run(name, records, options, labels=(), groups=()):
+    """
+    Write samples of a monitor, or serve them. records(sampler) returns the
+    rows of the current sample; it is called with the sampler's lock held.
+    """
+    sampler = get_sampler()
+    previous_interval = sampler.interval
+    if options.interval:
+        sampler.set_interval(options.interval)
+    sampler.watch(*groups)
+    try:
+        sampler.wait_for_sample(*groups)
+        if options.serve is not None:
+            _serve(name, records, labels, options.serve, sampler)
+
+        writer = _JSONWriter() if options.format == "json" else _CSVWriter()
+        written = 0
+        seen = 0
+        while options.count == 0 or written < options.count:
+            if written:
+                # a fresh sample for every row set, not the same one again
+                sampler.wait_for_sample(*groups, after=seen)
+            with sampler.lock:
+                seen = sampler.samples
+                rows = records(sampler)
+            now = round(time.time(), 3)
+            sys.stdout.write(writer.format([{"time": now, **row} for row in rows]))
+            sys.stdout.flush()
+            written += 1
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        sampler.unwatch(*groups)
+        # the session's other monitors keep their own rate
+        if options.interval:
+            sampler.set_interval(previous_interval)
+    return 0
+
+
+class _JSONWriter:
+
+    def format(self, rows):
+        return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+class _CSVWriter:
+
+    def __init__(self):
+        self.fields = None
+
+    def format(self, rows):
+        out = io.StringIO()
+        if self.fields is None and rows:
+            self.fields = list(rows[0])
+            csv.writer(out).writerow(self.fields)
+        if self.fields:
+            csv.DictWriter(out, self.fields, extrasaction="ignore").writerows(rows)
+        return out.getvalue()
+
+
+def prometheus(name, rows, labels=()):
+    """Rows in the Prometheus text exposition format, one gauge per numeric field."""
+    samples = {}    # metric name -> lines
+    for row in rows:
+        label_text = ",".join(f'{key}="{_escape(row[key])}"' for key in labels if key in row)
+        label_text = f"{{{label_text}}}" if label_text else ""
+        for key, value in row.items():
+            if key in labels or value is None or isinstance(value, str):
+                continue
+            metric = f"pysh_{name}_{key}"
+            value = int(value) if isinstance(value, bool) else value
+            samples.setdefault(metric, []).append(f"{metric}{label_text} {value!r}")
+    lines = []
+    for metric, metric_lines in samples.items():
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(metric_lines)
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _serve(name, records, labels, port, sampler):
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            with sampler.lock:
+                body = prometheus(name, records(sampler), labels).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    # localhost only: the endpoint has no authentication
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    print(f"serving {name} metrics on http://127.0.0.1:{server.server_port}/metrics, Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,143 @@
+"""
+mount table and disk usage probes for the disk monitor
+
+MountTable keeps the partition list between ticks and only asks psutil for
+it again when the kernel reports a change: /proc/self/mountinfo polls with
+POLLPRI when a filesystem is mounted or unmounted. Where that file does not
+exist the list is refreshed every FALLBACK_REFRESH seconds.
+
+DiskProber runs the statvfs calls behind disk_usage() on a pool of daemon
+threads, all mounts at once, and waits at most PROBE_TIMEOUT for them. A
+mount that has not answered by then (a hung NFS or FUSE server) is reported
+as stale, and is not probed again until its pending call returns. The
+thread stuck in that call leaves the pool once it returns, and a new one
+takes its place at once, so hung mounts never leave the healthy ones
+without workers.
+"""
+
+import queue
+import select
+import threading
+import time
+from concurrent.futures import Future, wait
+
+import psutil
+
+MOUNTINFO = "/proc/self/mountinfo"
+# seconds between re-reading the partitions when mountinfo can't be polled
+FALLBACK_REFRESH = 30.0
+# seconds a tick waits for the disk_usage() probes
+PROBE_TIMEOUT = 0.5
+# threads running probes
+PROBE_WORKERS = 8
+
+# probe result of a mount that did not answer in time
+STALE = "stale"
+
+
+class MountTable:
+
+    def __init__(self, path=MOUNTINFO):
+        self._partitions = None
+        self._loaded = 0.0
+        try:
+            self._file = open(path, "rb")
+            self._poll = select.poll()
+            self._poll.register(self._file, select.POLLPRI | select.POLLERR)
+            self._file.read()
+        except (OSError, AttributeError):
+            self._file = None
+
+    def partitions(self):
+        """psutil.disk_partitions(), re-read only after the mounts changed."""
+        if self._partitions is None or self._changed():
+            self._partitions = psutil.disk_partitions()
+            self._loaded = time.monotonic()
+        return self._partitions
+
+    def _changed(self):
+        if self._file is None:
+            return time.monotonic() - self._loaded > FALLBACK_REFRESH
+        if not self._poll.poll(0):
+            return False
+        # reading the file again re-arms the notification
+        self._file.seek(0)
+        self._file.read()
+        return True
+
+
+class DiskProber:
+
+    def __init__(self, workers=PROBE_WORKERS, timeout=PROBE_TIMEOUT):
+        self.timeout = timeout
+        self._pending = {}      # mountpoint -> Future of a probe still running
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._retired = set()   # Futures of stale probes, their worker was replaced
+        self._started = 0
+        for _ in range(workers):
+            self._add_worker()
+
+    def probe(self, mountpoints):
+        """
+        disk_usage().percent for every mount: STALE when there was no answer
+        within the timeout, None when the mount can't be read.
+        """
+        futures = {}
+        started = []
+        for mountpoint in mountpoints:
+            future = self._pending.get(mountpoint)
+            if future is None:
+                future = Future()
+                self._pending[mountpoint] = future
+                self._queue.put((mountpoint, future))
+                started.append(future)
+            futures[mountpoint] = future
+        # mounts already stale from an earlier tick are not waited for again
+        wait(started, timeout=self.timeout)
+        for future in started:
+            with self._lock:
+                if not future.done():
+                    # its worker may be stuck for good: replace it now
+                    self._retired.add(future)
+                    self._add_worker()
+
+        results = {}
+        for mountpoint, future in futures.items():
+            if not future.done():
+                results[mountpoint] = STALE
+                continue
+            del self._pending[mountpoint]
+            results[mountpoint] = None if future.exception() else future.result()
+        return results
+
+    def _add_worker(self):
+        # daemon threads: a probe stuck in the kernel must not hold up exit
+        name = f"pysh-disk-{self._started}"
+        self._started += 1
+        threading.Thread(target=self._work, name=name, daemon=True).start()
+
+    def _work(self):
+        while True:
+            mountpoint, future = self._queue.get()
+            try:
+                future.set_result(psutil.disk_usage(mountpoint).percent)
+            except Exception as e:
+                # any failure completes the future, or the mount stays stale
+                future.set_exception(e)
+            with self._lock:
+                if future in self._retired:
+                    # a replacement took this thread's place meanwhile
+                    self._retired.discard(future)
+                    return
+
+
+def matches(fstype, device, types=None, exclude=None, devices=None):
+    """Filter for `disk -t/-x/-d`: fstype allow and deny lists, device substrings."""
+    if types and fstype not in types:
+        return False
+    if exclude and fstype in exclude:
+        return False
+    if devices and not any(pattern in device for pattern in devices):
+        return False
+    return True
@@ -0,0 +1,179 @@
+"""
+process table engine for the ps monitor
+
+Keeps one psutil.Process per pid across ticks instead of rebuilding the
+table every time, so cpu_percent() has the previous sample to measure from
+(the first tick is not all zeros) and handles are reused. Each tick only
+diffs the pid list: new pids get a Process, dead ones are dropped. A pid
+that was freed and handed to a new process between ticks is caught by its
+create time, so names and I/O counters are keyed on (pid, create time)
+and never carried over from the old process. The top
+rows are picked with heapq.nlargest, O(n log N) for N rows, rather than by
+sorting the whole table.
+
+The pid list and Process factory can be swapped out, which is how the
+benchmark in bench/ps_bench.py runs against a synthetic 50k process table.
+"""
+
+import heapq
+import time
+
+import psutil
+
+# sample rows are (pid, name, cpu %, rss bytes, io bytes/s)
+PID, NAME, CPU, RSS, IO = range(5)
+
+SORT_KEYS = {"cpu": CPU, "rss": RSS, "io": IO}
+
+
+class ProcessTable:
+
+    def __init__(self, pids=psutil.pids, process=psutil.Process):
+        self._pids = pids
+        self._process = process
+        self._procs = {}        # pid -> Process
+        self._starts = {}       # pid -> function reading its process's start time now
+        self._idents = {}       # pid -> (pid, create time) of the process it has now
+        self._names = {}        # (pid, create time) -> name
+        self._io = {}           # (pid, create time) -> (read + write bytes, time) at the last tick
+
+    def __len__(self):
+        return len(self._procs)
+
+    def prime(self, io=False):
+        """
+        Pick up new pids and start their CPU measurement without sampling.
+        io=True also records their I/O counters, so the first sample with
+        io=True has rates rather than all zeros.
+        """
+        self._update_pids()
+        if not io:
+            return
+        now = time.monotonic()
+        for pid, proc in self._procs.items():
+            try:
+                self._io_rate(self._idents[pid], proc, now)
+            except psutil.NoSuchProcess:
+                # dropped by the next sample
+                pass
+
+    def sample(self, io=False):
+        """
+        One row per live process. io=True also measures disk I/O rates,
+        which costs an extra /proc read per process.
+        """
+        self._update_pids()
+        now = time.monotonic()
+        rows = []
+        dead = []
+        reused = []
+        starts = self._starts
+        for pid, proc in self._procs.items():
+            ident = self._idents[pid]
+            try:
+                with proc.oneshot():
+                    if ident[1] != starts[pid]():
+                        reused.append(pid)
+                        continue
+                    rows.append(self._measure(ident, proc, now, io))
+            except psutil.NoSuchProcess:
+                dead.append(pid)
+        for pid in dead:
+            self._forget(pid)
+        for pid in reused:
+            # a new process under an old pid: measure it from scratch
+            self._forget(pid)
+            proc = self._add(pid)
+            if proc is None:
+                continue
+            try:
+                with proc.oneshot():
+                    rows.append(self._measure(self._idents[pid], proc, now, io))
+            except psutil.NoSuchProcess:
+                self._forget(pid)
+        return rows
+
+    def _measure(self, ident, proc, now, io):
+        try:
+            cpu = proc.cpu_percent()
+            rss = proc.memory_info().rss
+            rate = self._io_rate(ident, proc, now) if io else 0.0
+        except psutil.AccessDenied:
+            cpu, rss, rate = 0.0, 0, 0.0
+        return (ident[0], self._names[ident], cpu, rss, rate)
+
+    def _update_pids(self):
+        current = set(self._pids())
+        known = self._procs.keys()
+        for pid in known - current:
+            self._forget(pid)
+        for pid in current - known:
+            self._add(pid)
+
+    def _add(self, pid):
+        """Start tracking pid; returns its Process, None if it is gone."""
+        try:
+            proc = self._process(pid)
+            start = _start_reader(proc)
+            ident = (pid, start())
+        except psutil.NoSuchProcess:
+            return None
+        try:
+            name = proc.name()
+            # the first call starts the measurement; it reads 0.0
+            proc.cpu_percent()
+        except psutil.NoSuchProcess:
+            return None
+        except psutil.AccessDenied:
+            name = "?"
+        self._procs[pid] = proc
+        self._starts[pid] = start
+        self._idents[pid] = ident
+        self._names[ident] = name or "?"
+        return proc
+
+    def _io_rate(self, ident, proc, now):
+        try:
+            counters = proc.io_counters()
+        except (psutil.AccessDenied, AttributeError):
+            return 0.0
+        total = counters.read_bytes + counters.write_bytes
+        previous = self._io.get(ident)
+        self._io[ident] = (total, now)
+        if previous is None or now <= previous[1]:
+            return 0.0
+        return (total - previous[0]) / (now - previous[1])
+
+    def _forget(self, pid):
+        self._procs.pop(pid, None)
+        self._starts.pop(pid, None)
+        ident = self._idents.pop(pid, None)
+        self._names.pop(ident, None)
+        self._io.pop(ident, None)
+
+
+def _start_reader(proc):
+    """
+    A function returning when the process now behind proc's pid was
+    created, as a value only compared with itself. Process.create_time()
+    keeps its first answer, so on Linux the start time is taken from the
+    stat file, which oneshot() reads once for cpu_percent() as well.
+    Elsewhere that cached answer is all there is, and a reused pid is only
+    noticed if it is missing from one tick's pid list.
+    """
+    parse_stat = getattr(getattr(proc, "_proc", None), "_parse_stat_file", None)
+    if parse_stat is None:
+        return proc.create_time
+
+    def start():
+        try:
+            return parse_stat()["create_time"]
+        except psutil.AccessDenied:
+            return None
+    return start
+
+
+def top(rows, key="cpu", n=10):
+    """The n rows with the largest value for key ('cpu', 'rss' or 'io')."""
+    index = SORT_KEYS[key]
+    return heapq.nlargest(n, rows, key=lambda row: row[index])
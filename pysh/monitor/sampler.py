@@ -0,0 +1,243 @@
+"""
+background metrics sampler for the pysh monitors
+
+One daemon thread samples psutil every `interval` seconds and appends the
+values to fixed-size ring buffers backed by array('d'), so the history a
+monitor can show costs bounded memory however long pysh runs. The monitors
+only read from it: a frame never waits on psutil, opening a monitor again
+shows the history collected so far, and CPU usage is measured between two
+samples with the non-blocking cpu_percent(interval=None).
+
+The thread only samples while a monitor is open: each one holds a watch
+(watching() / watch() and unwatch(), reference counted) for as long as it
+runs, and the thread idles when there is none. CPU and memory are sampled
+for every watch, disks and processes only while a monitor watches "disk"
+or "procs", process I/O rates only while "io" is watched too.
+"""
+
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+import psutil
+
+from monitor.mounts import STALE, DiskProber, MountTable
+from monitor.procs import ProcessTable
+
+# seconds between samples (override with PYSH_SAMPLE_INTERVAL)
+DEFAULT_INTERVAL = 1.0
+# samples kept per series
+HISTORY = 120
+# time allowed for the very first CPU measurement
+_PRIME_SECONDS = 0.1
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class Ring:
+    """A fixed-size ring buffer of floats."""
+
+    __slots__ = ("_data", "_size", "_next", "_count")
+
+    def __init__(self, size: int = HISTORY):
+        self._data = array("d", bytes(8 * size))
+        self._size = size
+        self._next = 0
+        self._count = 0
+
+    def append(self, value: float):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self._size
+        self._count = min(self._count + 1, self._size)
+
+    def values(self):
+        """The samples, oldest first."""
+        if self._count < self._size:
+            return self._data[:self._count]
+        return self._data[self._next:] + self._data[:self._next]
+
+    def latest(self, default=0.0):
+        return self._data[self._next - 1] if self._count else default
+
+    def stats(self):
+        """(min, avg, max) of the samples, or None if there are none."""
+        values = self.values()
+        if not values:
+            return None
+        return min(values), sum(values) / len(values), max(values)
+
+    def __len__(self):
+        return self._count
+
+
+def sparkline(values, width: int, low: float = 0.0, high: float = 100.0):
+    """The last width values as a row of block characters scaled to low..high."""
+    values = values[-width:]
+    span = (high - low) or 1.0
+    top = len(SPARK_CHARS) - 1
+    line = "".join(SPARK_CHARS[max(0, min(top, round((v - low) / span * top)))] for v in values)
+    return line.rjust(width)
+
+
+class Sampler(threading.Thread):
+
+    def __init__(self, interval=None, history=HISTORY):
+        super().__init__(name="pysh-sampler", daemon=True)
+        if interval is None:
+            interval = float(os.getenv("PYSH_SAMPLE_INTERVAL", DEFAULT_INTERVAL))
+        self.interval = interval
+        self.history = history
+        self.lock = threading.Lock()
+        self.series = {}        # name -> Ring
+        self.memory = None      # latest psutil.virtual_memory()
+        # latest [(device, mountpoint, fstype, stale)]; usage in "disk:<mount>" series
+        self.disks = []
+        self.mount_table = None
+        self.prober = None
+        self.processes = []     # latest rows of the process table (monitor/procs.py)
+        self.process_table = ProcessTable()
+        self.samples = 0
+        self.collected = set()  # groups sampled since they were last watched
+        self._watchers = 0
+        self._watched = {}      # group -> number of watches holding it
+        self._sampled = threading.Condition(self.lock)
+        self._wake = threading.Event()
+
+    def watch(self, *groups):
+        """
+        Sample until the matching unwatch(), "disk", "procs" and/or "io"
+        too; takes a sample at once if anything new is asked for.
+        """
+        with self.lock:
+            new = self._watchers == 0 or not self._watched.keys() >= set(groups)
+            self._watchers += 1
+            for group in groups:
+                self._watched[group] = self._watched.get(group, 0) + 1
+        if new:
+            self._wake.set()
+
+    def unwatch(self, *groups):
+        """Release a watch(); sampling stops when no monitor is watching."""
+        with self.lock:
+            self._watchers -= 1
+            for group in groups:
+                self._watched[group] -= 1
+                if not self._watched[group]:
+                    del self._watched[group]
+                    # sampled afresh, and primed, when it is watched again
+                    self.collected.discard(group)
+            if not self._watchers:
+                self.collected.clear()
+
+    @contextmanager
+    def watching(self, *groups):
+        """watch() for the duration of a with block."""
+        self.watch(*groups)
+        try:
+            yield self
+        finally:
+            self.unwatch(*groups)
+
+    def set_interval(self, seconds: float):
+        """Sample every `seconds`, starting after the sample already due."""
+        self.interval = seconds
+
+    def wait_for_sample(self, *groups, after=0, timeout=None):
+        """
+        Block until CPU and memory, and the given groups, have been sampled,
+        and more than `after` samples have been taken.
+        """
+        wanted = {"cpu", "mem", *groups}
+        with self._sampled:
+            self._sampled.wait_for(lambda: wanted <= self.collected and self.samples > after, timeout)
+
+    def run(self):
+        prime = True
+        while True:
+            with self.lock:
+                idle = not self._watchers
+            if idle:
+                # nothing is open: sleep until a monitor watches again
+                self._wake.wait()
+                self._wake.clear()
+                prime = True
+                continue
+            if prime:
+                # cpu_percent(interval=None) compares with the previous call: prime it
+                psutil.cpu_percent(percpu=True)
+                time.sleep(_PRIME_SECONDS)
+                prime = False
+            self._collect()
+            with self.lock:
+                if self._watched.keys() <= self.collected:
+                    # groups watched before this sample are in it already
+                    self._wake.clear()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _collect(self):
+        cores = psutil.cpu_percent(percpu=True)
+        memory = psutil.virtual_memory()
+        disks = self._collect_disks() if "disk" in self._watched else None
+        io = "io" in self._watched
+        processes = self._collect_processes(io) if "procs" in self._watched else None
+
+        with self._sampled:
+            self._add("cpu", sum(cores) / len(cores) if cores else 0.0)
+            for i, value in enumerate(cores):
+                self._add(f"cpu{i}", value)
+            self.memory = memory
+            self._add("mem", memory.percent)
+            self.collected.update(("cpu", "mem"))
+            if disks is not None:
+                self.collected.add("disk")
+                self.disks = [(device, mountpoint, fstype, percent is STALE)
+                              for device, mountpoint, fstype, percent in disks]
+                for _, mountpoint, _, percent in disks:
+                    if percent is not STALE:
+                        self._add(f"disk:{mountpoint}", percent)
+            if processes is not None:
+                self.collected.update(("procs", "io") if io else ("procs",))
+                self.processes = processes
+            self.samples += 1
+            self._sampled.notify_all()
+
+    def _add(self, name, value):
+        ring = self.series.get(name)
+        if ring is None:
+            ring = self.series[name] = Ring(self.history)
+        ring.append(value)
+
+    def _collect_disks(self):
+        if self.mount_table is None:
+            self.mount_table = MountTable()
+            self.prober = DiskProber()
+        partitions = self.mount_table.partitions()
+        # every mount probed at once; hung ones come back as STALE
+        usage = self.prober.probe([p.mountpoint for p in partitions])
+        return [(p.device, p.mountpoint, p.fstype, usage[p.mountpoint])
+                for p in partitions if usage[p.mountpoint] is not None]
+
+    def _collect_processes(self, io):
+        if "procs" not in self.collected or (io and "io" not in self.collected):
+            # give the first sample a short measuring window, like the CPU;
+            # I/O rates need one as well when "io" was just asked for
+            self.process_table.prime(io=io)
+            time.sleep(_PRIME_SECONDS)
+        return self.process_table.sample(io=io)
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """The session's sampler, started on first use; it idles while unwatched."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = Sampler()
+            _sampler.start()
+        return _sampler
@@ -0,0 +1,156 @@
+"""
+differential terminal renderer for the pysh monitors
+
+A monitor describes each frame as a list of lines, every line a list of
+(text, style) segments, and hands it to Screen.draw(). The screen keeps the
+cells of the previous frame and writes only the runs of cells that changed,
+each behind a cursor-addressing escape, in one write per frame. A full
+repaint happens on the first frame and whenever the terminal is resized.
+
+When stdout is not a terminal there is nothing to address: frames are
+written out one after another as plain text.
+"""
+
+import shutil
+import signal
+import sys
+import threading
+
+RESET = "\033[0m"
+HEADER_COLOR = "\033[1;37m"  # bright white
+
+# unchanged cells between two changed runs that are rewritten anyway,
+# because that is cheaper than another cursor jump
+_JOIN_GAP = 4
+
+_BLANK = (" ", "")
+
+
+def _cells(line, width):
+    """Flatten a line of (text, style) segments into width (char, style) cells."""
+    cells = []
+    for segment in line:
+        text, style = (segment, "") if isinstance(segment, str) else segment
+        cells.extend((ch, style) for ch in text)
+    del cells[width:]
+    return cells
+
+
+class Screen:
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        try:
+            self.interactive = self.stream.isatty()
+        except (AttributeError, ValueError):
+            self.interactive = False
+        self._previous = None       # cell rows of the frame on screen
+        self._size = None
+        self._resized = threading.Event()
+        self._old_handler = None
+
+    def __enter__(self):
+        if self.interactive:
+            # hide the cursor while drawing
+            self.stream.write("\033[?25l")
+            self.stream.flush()
+            if hasattr(signal, "SIGWINCH") and threading.current_thread() is threading.main_thread():
+                self._old_handler = signal.signal(signal.SIGWINCH, lambda signum, frame: self._resized.set())
+        return self
+
+    def __exit__(self, *exc):
+        if self.interactive:
+            # leave the cursor below the last frame and show it again
+            rows = len(self._previous or ())
+            self.stream.write(f"\033[{rows + 1};1H{RESET}\033[?25h")
+            self.stream.flush()
+            if self._old_handler is not None:
+                signal.signal(signal.SIGWINCH, self._old_handler)
+        return False
+
+    def sleep(self, seconds: float):
+        """Wait until the next frame is due, waking early when the terminal is resized."""
+        self._resized.wait(seconds)
+        self._resized.clear()
+
+    def draw(self, lines: list):
+        """Show a frame, writing only what differs from the previous one."""
+        if not self.interactive:
+            text = "\n".join("".join(s if isinstance(s, str) else s[0] for s in line) for line in lines)
+            self.stream.write(text + "\n\n")
+            self.stream.flush()
+            return
+
+        size = shutil.get_terminal_size()
+        rows = [_cells(line, size.columns) for line in lines[:size.lines - 1]]
+        out = []
+        if size != self._size or self._previous is None:
+            # new geometry: the old cells mean nothing, repaint everything
+            out.append("\033[H\033[2J")
+            previous = []
+            self._size = size
+        else:
+            previous = self._previous
+
+        for y in range(max(len(rows), len(previous))):
+            new = rows[y] if y < len(rows) else []
+            old = previous[y] if y < len(previous) else []
+            self._diff_row(out, y, new, old)
+
+        if out:
+            out.append(RESET)
+            self.stream.write("".join(out))
+            self.stream.flush()
+        self._previous = rows
+
+    @staticmethod
+    def _diff_row(out, y, new, old):
+        length = max(len(new), len(old))
+        x = 0
+        while x < length:
+            cell = new[x] if x < len(new) else _BLANK
+            if cell == (old[x] if x < len(old) else _BLANK):
+                x += 1
+                continue
+            # a run of changed cells, extended over short unchanged gaps
+            start = end = x
+            x += 1
+            while x < length and x - end <= _JOIN_GAP:
+                if (new[x] if x < len(new) else _BLANK) != (old[x] if x < len(old) else _BLANK):
+                    end = x
+                x += 1
+            x = end + 1
+
+            out.append(f"\033[{y + 1};{start + 1}H")
+            style = None
+            for ch, cell_style in (new[i] if i < len(new) else _BLANK for i in range(start, end + 1)):
+                if cell_style != style:
+                    out.append(RESET + cell_style)
+                    style = cell_style
+                out.append(ch)
+
+
+def table(columns: list, rows: list, header_style=HEADER_COLOR, row_separators=False):
+    """
+    Lay out a boxed table as frame lines.
+    columns is a list of (title, width); each row a list of cells, a cell
+    being text or (text, style). Cells are centred and cut to their width.
+    """
+    border = "+" + "+".join("-" * width for _, width in columns) + "+"
+    lines = [[border], _row([(title, header_style) for title, _ in columns], columns), [border]]
+    for row in rows:
+        lines.append(_row(row, columns))
+        if row_separators:
+            lines.append([border])
+    if not row_separators or not rows:
+        lines.append([border])
+    return lines
+
+
+def _row(cells, columns):
+    line = ["|"]
+    for (_, width), cell in zip(columns, cells):
+        text, style = (cell, "") if isinstance(cell, str) else cell
+        line.append((f"{str(text)[:width]:^{width}}", style))
+        line.append("|")
+    return line
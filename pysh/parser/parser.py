@@ -3,6 +3,7 @@
 the yacc file for pysh
 '''
 
+import os
 import ply.yacc as yacc
 
 #tuple of tokens
@@ -17,13 +18,66 @@ write the grammar rules here
 
 def p_statement(p):
     """
-    statement : command
+    statement : list
+              | list SEMICOLON
+              | list BACKGROUND
     """
     # Create a root 'Statement' node for consistency
+    # its children alternate between commands/pipelines and OPERATOR nodes
     statement_node = Node("Statement")
-    statement_node.children.append(p[1])
+    statement_node.children.extend(p[1])
+    if len(p) == 3 and p[2] == "&":
+        # a trailing '&' backgrounds the last list, keep it
+        statement_node.children.append(Node("OPERATOR", token=p[2]))
     p[0] = statement_node
 
+def p_list(p):
+    """
+    list : list SEMICOLON pipeline
+         | list BACKGROUND pipeline
+         | list LOGICAL_AND pipeline
+         | list LOGICAL_OR pipeline
+    """
+    # p[2] is the operator token deciding whether p[3] runs
+    # (extended in place: copying the list on every reduction is quadratic)
+    p[1].extend((Node("OPERATOR", token=p[2]), p[3]))
+    p[0] = p[1]
+
+def p_list_newline(p):
+    """
+    list : list pipeline
+    """
+    # A command word straight after a complete command can only start a new
+    # line (t_newline resets command position), so treat it like ';'
+    p[1].extend((Node("OPERATOR", token=";"), p[2]))
+    p[0] = p[1]
+
+def p_list_single(p):
+    """
+    list : pipeline
+    """
+    p[0] = [p[1]]
+
+def p_pipeline(p):
+    """
+    pipeline : pipeline PIPE command
+    """
+    # Promote a lone command to a 'Pipeline' node on the first '|'
+    if p[1].name == "Pipeline":
+        pipeline_node = p[1]
+    else:
+        pipeline_node = Node("Pipeline")
+        pipeline_node.children.append(p[1])
+    pipeline_node.children.append(p[3])
+    p[0] = pipeline_node
+
+def p_pipeline_single(p):
+    """
+    pipeline : command
+    """
+    # A single command stays a plain 'Command' node
+    p[0] = p[1]
+
 def p_command(p):
     """
     command : COMMAND argument_list
@@ -49,7 +103,8 @@ def p_argument_list(p):
     """
     # Recursively build a list of argument nodes
     # p[1] is the list so far, p[2] is the new argument node
-    p[0] = p[1] + [p[2]]
+    p[1].append(p[2])
+    p[0] = p[1]
 
 def p_argument_list_empty(p):
     """
@@ -75,7 +130,11 @@ def p_error(p):
         raise SyntaxError("Syntax error at end of input")
 
 
-parser = yacc.yacc()
+# Load the pre-generated LALR tables in parser/parsetab.py (see tables.py).
+# PLY checks their signature against the grammar above and rebuilds them in
+# memory if they are stale; nothing is ever written into the source tree.
+parser = yacc.yacc(tabmodule="parser.parsetab", outputdir=os.path.dirname(__file__),
+                   debug=False, write_tables=False, errorlog=yacc.NullLogger())
   
 
 
@@ -0,0 +1,46 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'ARG BACKGROUND COMMAND LOGICAL_AND LOGICAL_OR PIPE REDIRECT_IN REDIRECT_OUT REDIRECT_OUT_APPEND SEMICOLON STRING_LITERAL VARIABLE\n    statement : list\n              | list SEMICOLON\n              | list BACKGROUND\n    \n    list : list SEMICOLON pipeline\n         | list BACKGROUND pipeline\n         | list LOGICAL_AND pipeline\n         | list LOGICAL_OR pipeline\n    \n    list : list pipeline\n    \n    list : pipeline\n    \n    pipeline : pipeline PIPE command\n    \n    pipeline : command\n    \n    command : COMMAND argument_list\n    \n    argument_list : argument_list argument\n    \n    argument_list :\n    \n    argument : ARG\n             | STRING_LITERAL\n    '
+    
+_lr_action_items = {'COMMAND':([0,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,],[5,5,-9,-11,-14,5,5,-8,5,5,5,-12,-4,-5,-6,-7,-10,-13,-15,-16,]),'$end':([1,2,3,4,5,6,7,8,12,13,14,15,16,17,18,19,20,],[0,-1,-9,-11,-14,-2,-3,-8,-12,-4,-5,-6,-7,-10,-13,-15,-16,]),'SEMICOLON':([2,3,4,5,8,12,13,14,15,16,17,18,19,20,],[6,-9,-11,-14,-8,-12,-4,-5,-6,-7,-10,-13,-15,-16,]),'BACKGROUND':([2,3,4,5,8,12,13,14,15,16,17,18,19,20,],[7,-9,-11,-14,-8,-12,-4,-5,-6,-7,-10,-13,-15,-16,]),'LOGICAL_AND':([2,3,4,5,8,12,13,14,15,16,17,18,19,20,],[9,-9,-11,-14,-8,-12,-4,-5,-6,-7,-10,-13,-15,-16,]),'LOGICAL_OR':([2,3,4,5,8,12,13,14,15,16,17,18,19,20,],[10,-9,-11,-14,-8,-12,-4,-5,-6,-7,-10,-13,-15,-16,]),'PIPE':([3,4,5,8,12,13,14,15,16,17,18,19,20,],[11,-11,-14,11,-12,11,11,11,11,-10,-13,-15,-16,]),'ARG':([5,12,18,19,20,],[-14,19,-13,-15,-16,]),'STRING_LITERAL':([5,12,18,19,20,],[-14,20,-13,-15,-16,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'statement':([0,],[1,]),'list':([0,],[2,]),'pipeline':([0,2,6,7,9,10,],[3,8,13,14,15,16,]),'command':([0,2,6,7,9,10,11,],[4,4,4,4,4,4,17,]),'argument_list':([5,],[12,]),'argument':([12,],[18,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> statement","S'",1,None,None,None),
+  ('statement -> list','statement',1,'p_statement','parser.py',21),
+  ('statement -> list SEMICOLON','statement',2,'p_statement','parser.py',22),
+  ('statement -> list BACKGROUND','statement',2,'p_statement','parser.py',23),
+  ('list -> list SEMICOLON pipeline','list',3,'p_list','parser.py',36),
+  ('list -> list BACKGROUND pipeline','list',3,'p_list','parser.py',37),
+  ('list -> list LOGICAL_AND pipeline','list',3,'p_list','parser.py',38),
+  ('list -> list LOGICAL_OR pipeline','list',3,'p_list','parser.py',39),
+  ('list -> list pipeline','list',2,'p_list_newline','parser.py',48),
+  ('list -> pipeline','list',1,'p_list_single','parser.py',57),
+  ('pipeline -> pipeline PIPE command','pipeline',3,'p_pipeline','parser.py',63),
+  ('pipeline -> command','pipeline',1,'p_pipeline_single','parser.py',76),
+  ('command -> COMMAND argument_list','command',2,'p_command','parser.py',83),
+  ('argument_list -> argument_list argument','argument_list',2,'p_argument_list','parser.py',102),
+  ('argument_list -> <empty>','argument_list',0,'p_argument_list_empty','parser.py',111),
+  ('argument -> ARG','argument',1,'p_argument','parser.py',118),
+  ('argument -> STRING_LITERAL','argument',1,'p_argument','parser.py',119),
+]
@@ -0,0 +1,154 @@
+"""
+compiled command plans for pysh
+
+The checked AST of a command line is flattened into a Plan: a list of steps,
+each a pipeline of Stages whose built-in callable or executable path has
+already been looked up. Plans are kept in a bounded LRU keyed by the input
+text, so a repeated line skips lexing, parsing, checking and the tree walk.
+"""
+
+import os
+from collections import OrderedDict
+
+from cmdhash import command_hash
+from parser.node import Node
+from registry import builtin_registry
+
+# number of distinct command lines whose plans are kept
+PLAN_CACHE_SIZE = 512
+
+
+class Stage:
+    """One command of a pipeline with its target resolved."""
+
+    __slots__ = ("name", "args", "func", "executable")
+
+    def __init__(self, name: str, args: list):
+        self.name = name
+        self.args = args
+        # built-in callable, or None for external commands
+        self.func = builtin_registry.get(name)
+        # absolute path of an external command (None if not found)
+        self.executable = None if self.func else command_hash.lookup(name)
+
+    def __repr__(self):
+        target = "builtin" if self.func else self.executable
+        return f"Stage({self.name!r}, {self.args!r}, {target!r})"
+
+
+class Plan:
+    """
+    A compiled command line.
+
+    lists   the and-or lists of the line in order, as (steps, background).
+            steps is a list of (operator, stages): the operator joining the
+            pipeline to the previous one (None, '&&' or '||') and the
+            pipeline to run. background is True for lists ended by '&'.
+    checks  (command, argument) pairs the checker validated; re-validated
+            before a cached plan is reused
+    """
+
+    __slots__ = ("lists", "checks", "generation", "cwd")
+
+    def __init__(self, lists: list, checks=()):
+        self.lists = lists
+        self.checks = list(checks)
+        # command hash generation the executable paths came from
+        self.generation = command_hash.generation
+        # relative executables (./build.sh) only hold in the cwd they were found in
+        relative = any(stage.executable and not os.path.isabs(stage.executable)
+                       for steps, _ in lists for _, stages in steps for stage in stages)
+        self.cwd = os.getcwd() if relative else None
+
+    def __repr__(self):
+        return f"Plan({self.lists!r})"
+
+
+def _command_argv(command_node: Node):
+    command_name_node = command_node.children[0]
+    command_name = getattr(command_name_node.token, "value", command_name_node.token)
+    args = [getattr(child.token, "value", child.token) for child in command_node.children[1:]]
+    return command_name, args
+
+
+def compile_plan(root: Node, checks=()):
+    """Flatten a (checked) Statement AST into a Plan."""
+    items = root.children if root.name == "Statement" else [root]
+    lists = []
+    steps = []
+    op = None
+    for node in items:
+        if node.name == "OPERATOR":
+            op = getattr(node.token, "value", node.token)
+            if op in (";", "&"):
+                # ';' and '&' end an and-or list, '&' sends it to the background
+                lists.append((steps, op == "&"))
+                steps = []
+                op = None
+            continue
+        commands = node.children if node.name == "Pipeline" else [node]
+        steps.append((op, [Stage(*_command_argv(c)) for c in commands if c.children]))
+        op = None
+    if steps:
+        lists.append((steps, False))
+    return Plan(lists, checks)
+
+
+def describe(steps: list):
+    """Render an and-or list back into command text (for the job table)."""
+    parts = []
+    for op, stages in steps:
+        if op:
+            parts.append(op)
+        parts.append(" | ".join(" ".join([stage.name] + stage.args) for stage in stages))
+    return " ".join(parts)
+
+
+class PlanCache:
+    """Bounded LRU of compiled plans keyed by the input line."""
+
+    def __init__(self, checker, maxsize: int = PLAN_CACHE_SIZE):
+        self.checker = checker
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str):
+        """Return the cached plan for text if it still holds, else None."""
+        plan = self._plans.get(text)
+        if plan is not None and not self._valid(plan):
+            del self._plans[text]
+            plan = None
+        if plan is None:
+            self.misses += 1
+            return None
+        self._plans.move_to_end(text)
+        self.hits += 1
+        return plan
+
+    def put(self, text: str, plan: Plan):
+        self._plans[text] = plan
+        self._plans.move_to_end(text)
+        if len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+
+    def clear(self):
+        self._plans.clear()
+
+    def __len__(self):
+        return len(self._plans)
+
+    def _valid(self, plan: Plan):
+        # PATH edits and new/removed commands bump the hash generation
+        command_hash.refresh()
+        if plan.generation != command_hash.generation:
+            return False
+        if plan.cwd is not None and plan.cwd != os.getcwd():
+            return False
+        try:
+            for cmd_name, arg in plan.checks:
+                self.checker.check_argument(cmd_name, arg)
+        except RuntimeError:
+            return False
+        return True
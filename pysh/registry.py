@@ -0,0 +1,136 @@
+"""
+built-in command registry for pysh
+
+One table shared by the checker and the executor. A built-in is a module
+with a run(args) function; the module is imported the first time the command
+runs, so heavy built-ins (psutil monitors...) cost nothing until used.
+
+Third-party packages can add built-ins through the "pysh.builtins" entry
+point group, e.g. in their pyproject.toml:
+
+    [project.entry-points."pysh.builtins"]
+    hello = "pysh_hello:run"
+
+Entry point metadata is read once, the first time an unknown name is looked
+up, and the plugin itself is only imported when its command is called.
+"""
+
+import importlib
+import types
+
+ENTRY_POINT_GROUP = "pysh.builtins"
+
+# built-ins shipped with pysh: command name -> module providing run()
+BUILTIN_MODULES = {
+    "bg": "commands.bg",
+    "cd": "commands.cd",
+    "cp": "commands.cp",
+    "cpu": "commands.cpu",
+    "disk": "commands.disk",
+    "fg": "commands.fg",
+    "find": "commands.find",
+    "grep": "commands.grep",
+    "hash": "commands.hash",
+    "jobs": "commands.jobs",
+    "kill": "commands.kill",
+    "ls": "commands.ls",
+    "mem": "commands.mem",
+    "mkdir": "commands.mkdir",
+    "parallel": "commands.parallel",
+    "ps": "commands.ps",
+    "pwd": "commands.pwd",
+    "rm": "commands.rm",
+    "wait": "commands.wait",
+}
+
+
+class _LazyBuiltin:
+    """Stands in for a built-in until its first call, then replaces itself."""
+
+    __slots__ = ("table", "name", "loader", "func")
+
+    def __init__(self, table, name, loader):
+        self.table = table
+        self.name = name
+        self.loader = loader
+        self.func = None
+
+    def __call__(self, args):
+        # callers that kept a reference to the stub (compiled plans) only
+        # pay for the import once as well
+        return (self.func or self.load())(args)
+
+    def load(self):
+        target = self.loader()
+        self.func = target.run if isinstance(target, types.ModuleType) else target
+        self.table[self.name] = self.func
+        return self.func
+
+
+class BuiltinRegistry:
+
+    def __init__(self, modules=BUILTIN_MODULES, group=ENTRY_POINT_GROUP):
+        # command name -> callable taking the argument list
+        self.commands = {}
+        self.group = group
+        self._discovered = group is None
+        for name, module in modules.items():
+            self.register_module(name, module)
+
+    def register(self, name: str, func):
+        """Register an already-loaded callable."""
+        self.commands[name] = func
+
+    def register_module(self, name: str, module: str):
+        """Register a module whose run() is imported on first call."""
+        self.commands[name] = _LazyBuiltin(self.commands, name,
+                                           lambda: importlib.import_module(module))
+
+    def get(self, name: str):
+        """Return the callable for a built-in, or None for anything else."""
+        func = self.commands.get(name)
+        if func is None and not self._discovered:
+            self._discover()
+            func = self.commands.get(name)
+        return func
+
+    def __contains__(self, name: str):
+        return self.get(name) is not None
+
+    def names(self):
+        self._discover()
+        return sorted(self.commands)
+
+    def preload(self):
+        """Import every built-in now instead of on first use (pysh --server)."""
+        self._discover()
+        for func in list(self.commands.values()):
+            if isinstance(func, _LazyBuiltin) and func.func is None:
+                try:
+                    func.load()
+                except Exception:
+                    # a broken plugin still fails when it is called, not here
+                    pass
+
+    def _discover(self):
+        """Register entry point built-ins without importing them."""
+        if self._discovered:
+            return
+        self._discovered = True
+        try:
+            from importlib.metadata import entry_points
+            try:
+                eps = entry_points(group=self.group)
+            except TypeError:
+                # python < 3.10
+                eps = entry_points().get(self.group, [])
+        except Exception:
+            return
+        for ep in eps:
+            # shipped built-ins win over plugins of the same name
+            if ep.name not in self.commands:
+                self.commands[ep.name] = _LazyBuiltin(self.commands, ep.name, ep.load)
+
+
+# the shell-wide registry
+builtin_registry = BuiltinRegistry()
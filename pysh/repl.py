@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 import sys
 import os
-import atexit
-import readline
-from pathlib import Path
 
 # ensure project root is in sys.path
-sys.path.append(str(Path(__file__).resolve().parent))
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+# `pysh --client` only talks to a running server: none of the imports below
+if __name__ == "__main__" and sys.argv[1:2] == ["--client"]:
+    import client
+    sys.exit(client.main(sys.argv[2:]))
+
+import argparse
+import atexit
+from pathlib import Path
 
 #import lex file and the wrapper class
 from lexer.lexer import lexer as lexer
@@ -18,10 +24,10 @@ from parser.display import display_parse_tree
 
 from checker import SemanticChecker
 from executor import Executor
+from plan import PlanCache, compile_plan
+from jobtable import job_table
 
-
-from ai.ai import AI
-import ai.managekeys
+# the AI modules (dotenv, google.generativeai) are imported on the first `!`
 
 # ANSI color for light grey
 LOG_COLOR = "\033[90m"
@@ -30,7 +36,7 @@ RESET_COLOR = "\033[0m"
 HISTORY_FILE = Path.home() / ".pysh_history"
 
 class REPL:
-    def __init__(self):
+    def __init__(self, ai_cache=True):
         
         self.lexer = LoggingLexer(lexer)
         self.parser = parser
@@ -38,9 +44,17 @@ class REPL:
         
         self.checker = SemanticChecker()
         self.executor = Executor()
+        # compiled plans of recent lines, reused while their checks still hold
+        self.plans = PlanCache(self.checker)
 
         # log flag
         self.show_logs = False
+        # reuse cached AI answers (pysh --no-cache turns this off)
+        self.ai_cache = ai_cache
+
+        # readline (line editing, history) is only needed interactively
+        import readline
+        self.readline = readline
 
         #creating the .pysh_history file if doesnt exist
         if HISTORY_FILE.exists():
@@ -49,33 +63,47 @@ class REPL:
 
     def _save_history(self):
         try:
-            readline.write_history_file(HISTORY_FILE)
+            self.readline.write_history_file(HISTORY_FILE)
         except Exception as e:
             print(f"Warning: could not save history: {e}")
 
     def process_command(self, cmd: str):
+        """Run one command line; returns its exit status."""
         try:
-            self.lexer.is_command_position = True
-            self.lexer.lineno = 1
-            self.lexer.input(cmd)
-            ast_root = self.parser.parse(lexer=self.lexer)
-
-            if self.show_logs:
-                print(f"{LOG_COLOR}Tokens: {self.lexer.token_log}{RESET_COLOR}")
-                print(f"{LOG_COLOR}Parse tree:{RESET_COLOR}")
-                display_parse_tree(ast_root)
-
-            self.checker.check(ast_root)
-            self.executor.execute(ast_root)
+            # a repeated line runs its cached plan without lexing or parsing
+            # (unless logging, which wants the tokens and parse tree)
+            plan = None if self.show_logs else self.plans.get(cmd)
+            if plan is None:
+                self.lexer.is_command_position = True
+                self.lexer.lineno = 1
+                self.lexer.input(cmd)
+                ast_root = self.parser.parse(lexer=self.lexer)
+
+                if self.show_logs:
+                    print(f"{LOG_COLOR}Tokens: {self.lexer.token_log}{RESET_COLOR}")
+                    print(f"{LOG_COLOR}Parse tree:{RESET_COLOR}")
+                    display_parse_tree(ast_root)
+
+                self.checker.check(ast_root)
+                plan = compile_plan(ast_root, self.checker.checked)
+                self.plans.put(cmd, plan)
+
+            return self.executor.run(plan)
 
         except RuntimeError as e:
             print(f"Semantic error: {e}")
+            return 127
         except Exception as e:
             print(f"Error executing command: {e}")
+            return 1
 
     def run(self):
         while True:
             try:
+                # report background jobs that finished since the last prompt
+                for line in job_table.notifications():
+                    print(line)
+
                 inp = input("pysh$ ").strip()
                 if not inp:
                     continue
@@ -89,6 +117,12 @@ class REPL:
                     self.show_logs = False
                     print("logging disabled")
                     continue
+                elif inp == "--ai-stats":
+                    # how often `!` was answered locally instead of by the model
+                    from ai.ai import AI
+                    for line in AI.intents().stats():
+                        print(line)
+                    continue
 
                 # Exit / clear
                 if inp == "bye":
@@ -101,19 +135,44 @@ class REPL:
                 # AI commands
                 if inp.startswith("!"):
                     user_cmd = inp[1:].strip()
+                    # `! --no-cache ...` asks the model even if the answer is cached
+                    use_cache = self.ai_cache
+                    if user_cmd.startswith("--no-cache"):
+                        use_cache = False
+                        user_cmd = user_cmd[len("--no-cache"):].strip()
                     if not user_cmd:
-                        print("Usage: !<instruction>")
+                        print("Usage: ![--no-cache] <instruction>")
                         continue
                     try:
-                        # Ensure API key is loaded (and prompt shown)
-                        ai.managekeys.load_or_check_ai_api_key()
-
-                        # pass the user's instruction (user_cmd) to the AI
-                        ai_output = AI.call_gemini(user_cmd)
-                        if self.show_logs:
-                            print(f"{LOG_COLOR}AI generated: {ai_output}{RESET_COLOR}")
-                        # Pass AI output into the normal pipeline
-                        self.process_command(ai_output)
+                        from ai.ai import AI
+                        from ai.spinner import Spinner
+
+                        # pass the user's instruction (user_cmd) to the AI; the
+                        # request runs on a worker thread while the spinner
+                        # shows the answer streaming in, and Ctrl+C abandons it
+                        # one request returns every step the instruction needs
+                        # (the key prompt, first use only, comes before the spinner)
+                        AI.ensure_key()
+                        with Spinner(f"asking {AI.model_name()}") as spinner:
+                            ai_steps = AI.call_gemini_plan(user_cmd, use_cache=use_cache,
+                                                           on_progress=spinner.update)
+                        if len(ai_steps) == 1:
+                            if self.show_logs:
+                                print(f"{LOG_COLOR}AI generated ({AI.last_source}): {ai_steps[0].command}{RESET_COLOR}")
+                            # Pass AI output into the normal pipeline
+                            status = self.process_command(ai_steps[0].command)
+                            # answers that worked are matched locally from now on
+                            if status == 0 and AI.last_source != "local":
+                                AI.accept(user_cmd, ai_steps[0].command)
+                        else:
+                            from ai.steps import describe, run_steps
+                            print(f"{LOG_COLOR}AI plan:{RESET_COLOR}")
+                            for line in describe(ai_steps):
+                                print(f"{LOG_COLOR}{line}{RESET_COLOR}")
+                            # independent steps run at the same time
+                            run_steps(ai_steps)
+                    except KeyboardInterrupt:
+                        print("AI request cancelled")
                     except Exception as e:
                         print(f"AI error: {e}")
                     continue
@@ -128,7 +187,41 @@ class REPL:
                 break
 
 def main():
-    repl = REPL()
+    arg_parser = argparse.ArgumentParser(prog="pysh", description="a python-based shell inspired by bash")
+    arg_parser.add_argument("script", nargs="?",
+                            help="run the commands in this file instead of starting the REPL")
+    arg_parser.add_argument("-c", dest="command", metavar="COMMANDS",
+                            help="run COMMANDS and exit")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="always ask the AI model instead of reusing cached answers")
+    arg_parser.add_argument("--server", action="store_true",
+                            help="stay resident and run commands sent by pysh --client over a Unix socket")
+    arg_parser.add_argument("--client", action="store_true",
+                            help="run -c COMMANDS or the script on a running pysh --server (must come first)")
+    arg_parser.add_argument("--startup-profile", action="store_true",
+                            help="report import times before the first prompt and check them against the startup budget")
+    args = arg_parser.parse_args()
+
+    if args.startup_profile:
+        import startup
+        sys.exit(startup.profile())
+
+    if args.server:
+        import server
+        sys.exit(server.serve())
+
+    if args.client:
+        import client
+        print(client.USAGE, file=sys.stderr)
+        sys.exit(2)
+
+    if args.command is not None or args.script is not None:
+        import script
+        if args.command is not None:
+            sys.exit(script.run_source(args.command))
+        sys.exit(script.run_file(args.script))
+
+    repl = REPL(ai_cache=not args.no_cache)
     repl.run()
 
 if __name__ == "__main__":
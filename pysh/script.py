@@ -0,0 +1,74 @@
+"""
+non-interactive mode for pysh
+
+`pysh script.pysh` and `pysh -c '...'` lex and parse the whole source once
+and run the resulting statement list, without a prompt, readline or history.
+Newlines separate commands like ';' does. Each list is checked as it is
+about to run, so an unknown command fails its own line (status 127) and
+the script goes on, as in sh.
+"""
+
+import sys
+from pathlib import Path
+
+from lexer.lexer import lexer
+from lexer.logginglexer import LoggingLexer
+from parser.parser import parser
+from parser.node import Node
+from checker import SemanticChecker
+from executor import Executor
+from plan import compile_plan
+
+
+def run_source(source: str, name: str = "-c"):
+    """Run pysh source text and return the exit status of its last command."""
+    script_lexer = LoggingLexer(lexer)
+    script_lexer.is_command_position = True
+    script_lexer.lineno = 1
+    script_lexer.input(source)
+    try:
+        ast_root = parser.parse(lexer=script_lexer)
+    except SyntaxError as e:
+        if not script_lexer.token_log:
+            # nothing but blank lines and comments
+            return 0
+        print(f"pysh: {name}: line {script_lexer.lineno}: {e}", file=sys.stderr)
+        return 2
+
+    checker = SemanticChecker()
+    # output goes straight to whatever fd we were given (file, pipe, tty)
+    executor = Executor(stream=True)
+    status = 0
+    for statement in _lists(ast_root):
+        # checked just before it runs, like sh: a bad command fails its own
+        # line only, and `mkdir x` has happened by the time `cd x` is checked
+        try:
+            checker.check(statement)
+        except RuntimeError as e:
+            print(f"pysh: {name}: {e}", file=sys.stderr)
+            status = 127
+            continue
+        status = executor.run(compile_plan(statement, checker.checked))
+    return status
+
+
+def _lists(root: Node):
+    """Split a Statement into one Statement per ';'- or '&'-ended list."""
+    statement = Node("Statement")
+    for node in root.children:
+        statement.children.append(node)
+        if node.name == "OPERATOR" and getattr(node.token, "value", node.token) in (";", "&"):
+            yield statement
+            statement = Node("Statement")
+    if statement.children:
+        yield statement
+
+
+def run_file(path: str):
+    """Run a pysh script file."""
+    try:
+        source = Path(path).read_text()
+    except OSError as e:
+        print(f"pysh: {path}: {e.strerror}", file=sys.stderr)
+        return 127
+    return run_source(source, path)
@@ -0,0 +1,213 @@
+"""
+resident pysh server
+
+`pysh --server` starts once, pays for the imports, the lexer and parser
+tables and the built-in modules up front, and then runs commands sent by
+`pysh --client` (client.py) over a Unix socket at client.socket_path().
+
+Every connection is handled in a process forked from the warm server
+(socketserver.ForkingMixIn), so clients run at the same time and each one
+gets its own cwd and environment without touching the others or the
+server. The forked process takes the client's stdin, stdout and stderr
+from the file descriptors sent along with the request, so output goes
+straight to the client's terminal, pipe or file and is never copied
+through the socket.
+
+Protocol, one JSON object per line:
+    client -> server  {"source", "name", "cwd", "env"} with fds 0, 1, 2
+                      attached (SCM_RIGHTS, socket.send_fds)
+    server -> client  {"pgid"}    the process group running the command
+    server -> client  {"status"}  its exit status, once it is done
+
+The socket is only usable by the user running the server: it is created
+with mode 0600 and the peer's uid is checked on every connection.
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+import script
+import streams
+from client import socket_path
+from registry import builtin_registry
+
+# largest request accepted, the environment included
+MAX_REQUEST = 1 << 20
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Runs one client's commands; this is the forked process."""
+
+    def handle(self):
+        # the server's SIGTERM handler is not for us
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        conn = self.request
+        if not _same_user(conn):
+            return
+        try:
+            request, fds = _read_request(conn)
+        except (OSError, ValueError) as e:
+            print(f"pysh server: bad request: {e}", file=sys.stderr)
+            return
+        if len(fds) != 3:
+            for fd in fds:
+                os.close(fd)
+            return
+
+        # the client's stdio becomes ours
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        _reopen_stdio()
+        os.environ.clear()
+        os.environ.update(request.get("env", {}))
+
+        # a group of our own, so the client's Ctrl+C reaches the command and us
+        os.setpgid(0, 0)
+        if not _send(conn, {"pgid": os.getpgrp()}):
+            return
+        finished = threading.Event()
+        threading.Thread(target=_watch_client, args=(conn, finished), daemon=True).start()
+        try:
+            os.chdir(request.get("cwd", "/"))
+            status = script.run_source(request.get("source", ""), request.get("name", "-c"))
+        except OSError as e:
+            print(f"pysh: {e}", file=sys.stderr)
+            status = 1
+        except KeyboardInterrupt:
+            status = 130
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+        finished.set()
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except OSError:
+            pass
+        _send(conn, {"status": status})
+
+
+class Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+
+    # a forked child per client must not hold the others up at shutdown
+    block_on_close = False
+
+    def server_bind(self):
+        old_umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+
+    def process_request(self, request, client_address):
+        # nothing buffered in the server may be written twice by the fork
+        sys.stdout.flush()
+        sys.stderr.flush()
+        super().process_request(request, client_address)
+
+
+def _send(conn, message):
+    """Send one message; False if the client has gone away."""
+    try:
+        conn.sendall(json.dumps(message).encode() + b"\n")
+        return True
+    except (BrokenPipeError, ConnectionError):
+        return False
+
+
+def _watch_client(conn, finished):
+    """
+    Runs beside the command: the client sends nothing after its request,
+    so EOF means it is gone (killed, or its Ctrl+C came before the command
+    started) and the command's group, this process included, gets SIGHUP.
+    """
+    try:
+        while conn.recv(4096):
+            pass
+    except OSError:
+        pass
+    if not finished.is_set():
+        os.killpg(os.getpgrp(), signal.SIGHUP)
+
+
+def _same_user(conn):
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid == os.getuid()
+
+
+def _read_request(conn):
+    """The request and the fds that came with its first bytes."""
+    data, fds, _, _ = socket.recv_fds(conn, 64 * 1024, 3)
+    while not data.endswith(b"\n"):
+        if len(data) > MAX_REQUEST:
+            raise ValueError("request too large")
+        chunk = conn.recv(64 * 1024)
+        if not chunk:
+            raise ValueError("incomplete request")
+        data += chunk
+    for fd in fds:
+        os.set_inheritable(fd, False)
+    return json.loads(data), fds
+
+
+def _reopen_stdio():
+    """New sys.stdin/stdout/stderr for fds 0-2, buffered to suit what they are."""
+    sys.stdin = open(0, "r", closefd=False, errors="replace")
+    sys.stdout = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+    streams.install()
+
+
+def _warm_up():
+    """Everything a command needs that can be done once, before any fork."""
+    # builds the lexer and parser and runs the checker and executor once
+    with open(os.devnull, "w") as devnull:
+        saved, sys.stdout = sys.stdout, devnull
+        try:
+            script.run_source("pwd")
+        finally:
+            sys.stdout = saved
+    builtin_registry.preload()
+
+
+def serve(path=None):
+    """Run the server until Ctrl+C or SIGTERM. Returns an exit status."""
+    path = path or socket_path()
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except FileNotFoundError:
+        pass
+    except ConnectionRefusedError:
+        # left behind by a server that is gone
+        os.unlink(path)
+    else:
+        print(f"pysh: a server is already listening on {path}", file=sys.stderr)
+        return 1
+    finally:
+        probe.close()
+
+    _warm_up()
+    # SIGTERM stops the server the way Ctrl+C does, socket file removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server = Server(path, _Handler)
+    print(f"pysh server listening on {path}, Ctrl+C to stop")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    return 0
@@ -0,0 +1,208 @@
+"""
+process spawning backend for pysh
+
+External commands can be started with os.posix_spawn instead of fork+exec.
+glibc implements posix_spawn with clone(CLONE_VM | CLONE_VFORK), so the
+cost of starting a child does not grow with pysh's own size: nothing is
+copied and no page tables are duplicated, however much memory the AI
+client, caches and history take up.
+
+Since Python 3.11 subprocess.Popen does the same (vfork, and process_group
+without a preexec_fn), and bench/spawn_bench.py measures no difference
+between the two there, so Popen is the default. posix_spawn is the default
+only on older Pythons, where Popen has to fork() to put the child in the
+job's process group. PYSH_SPAWN=posix_spawn or PYSH_SPAWN=subprocess picks
+one explicitly.
+
+spawn() takes the subset of subprocess.Popen's arguments that posix_spawn
+can express (stdin/stdout/stderr as None, an fd, PIPE or STDOUT, a process
+group and an environment) and returns a Popen-like Process. Anything else
+goes to subprocess.Popen unchanged, as does everything when the platform
+has no posix_spawn.
+
+The executable is expected to be resolved already (the command hash table
+does that), so the child is started by path without a PATH search. The
+environment is handed over as a bytes mapping that is built once and
+reused until os.environ changes.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+PIPE = subprocess.PIPE
+STDOUT = subprocess.STDOUT
+
+# "posix_spawn" or "subprocess"
+BACKEND = os.getenv("PYSH_SPAWN", "subprocess" if sys.version_info >= (3, 11) else "posix_spawn")
+
+# status of a child that was reaped elsewhere, so its real status is lost
+# (SIGCHLD set to SIG_IGN makes the kernel discard it)
+UNKNOWN_STATUS = 255
+
+# arguments posix_spawn can express; any other one means subprocess.Popen
+_SUPPORTED = {"stdin", "stdout", "stderr", "process_group", "env"}
+
+# Python ignores SIGPIPE (and SIGXFSZ); children get the default back,
+# as with Popen's restore_signals
+_RESET_SIGNALS = tuple(getattr(signal, name) for name in ("SIGPIPE", "SIGXFSZ") if hasattr(signal, name))
+
+_env_lock = threading.Lock()
+_env_block = None       # copy of os.environ's bytes data
+
+
+def environment():
+    """The current environment as a bytes mapping, rebuilt only after a change."""
+    global _env_block
+    data = getattr(os.environ, "_data", None)
+    if data is None or not isinstance(next(iter(data), b""), bytes):
+        # not the POSIX os.environ layout: encode it every time
+        return os.environb
+    with _env_lock:
+        # comparing two small dicts of bytes costs far less than encoding them
+        if data != _env_block:
+            _env_block = dict(data)
+        return _env_block
+
+
+class Process:
+    """The parts of subprocess.Popen pysh uses, for a posix_spawn'ed child."""
+
+    def __init__(self, pid, args, stdout=None):
+        self.pid = pid
+        self.args = args
+        self.stdout = stdout
+        self.returncode = None
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """The exit status if the child has exited, else None."""
+        if self.returncode is None and self._lock.acquire(False):
+            # called from the SIGCHLD handler too: never block on wait()
+            try:
+                if self.returncode is None:
+                    self._reap(os.WNOHANG)
+            finally:
+                self._lock.release()
+        return self.returncode
+
+    def wait(self):
+        with self._lock:
+            if self.returncode is None:
+                self._reap(0)
+        return self.returncode
+
+    def _reap(self, options):
+        try:
+            pid, status = os.waitpid(self.pid, options)
+        except ChildProcessError:
+            # reaped by someone else: don't pass a possible failure off as success
+            self.returncode = UNKNOWN_STATUS
+            return
+        if pid == self.pid:
+            # negative for a signal, like Popen
+            self.returncode = os.waitstatus_to_exitcode(status)
+
+    def send_signal(self, signum):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    def __repr__(self):
+        return f"<Process pid={self.pid} returncode={self.returncode}>"
+
+
+def wait_untraced(proc):
+    """
+    Wait for proc (a Process or a subprocess.Popen) to exit or stop, like
+    waitpid with WUNTRACED. Returns its exit status, or None if it was
+    stopped. The exit itself is left for proc.wait() to reap, so Popen
+    records the status as usual.
+    """
+    if not hasattr(os, "waitid"):
+        return proc.wait()
+    while proc.poll() is None:
+        try:
+            info = os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WSTOPPED | os.WNOWAIT)
+        except ChildProcessError:
+            break
+        if info is not None and info.si_code in (os.CLD_STOPPED, os.CLD_TRAPPED):
+            # take the stop report, or the next wait would see it again;
+            # without WEXITED this never reaps the child
+            try:
+                os.waitid(os.P_PID, proc.pid, os.WSTOPPED | os.WNOHANG)
+            except ChildProcessError:
+                pass
+            return None
+        break
+    return proc.wait()
+
+
+def spawn(args, executable=None, backend=None, **kwargs):
+    """
+    Start args[0] (or executable) with Popen-style keyword arguments.
+    Returns a Process, or a subprocess.Popen when posix_spawn can't do it.
+    """
+    backend = backend or BACKEND
+    stdin = kwargs.get("stdin")
+    stdout = kwargs.get("stdout")
+    stderr = kwargs.get("stderr")
+    if (backend != "posix_spawn" or not hasattr(os, "posix_spawn") or kwargs.keys() - _SUPPORTED
+            # nothing in pysh writes to a child's stdin or reads its stderr alone
+            or stdin == PIPE or stderr == PIPE):
+        return _popen(args, executable, kwargs)
+
+    path = executable or args[0]
+    actions = []
+    parent_out = None       # our end of the stdout pipe
+    child_fds = []          # the child's ends, closed here once it has them
+    if stdout == PIPE:
+        read_fd, write_fd = os.pipe()
+        parent_out, stdout = read_fd, write_fd
+        child_fds.append(write_fd)
+
+    try:
+        for fd, target in ((stdin, 0), (stdout, 1)):
+            if fd is not None and fd != target:
+                actions.append((os.POSIX_SPAWN_DUP2, fd, target))
+        if stderr == STDOUT:
+            actions.append((os.POSIX_SPAWN_DUP2, 1, 2))
+        elif stderr is not None and stderr != 2:
+            actions.append((os.POSIX_SPAWN_DUP2, stderr, 2))
+
+        env = kwargs.get("env")
+        spawn_kwargs = {"file_actions": actions, "setsigdef": _RESET_SIGNALS}
+        if kwargs.get("process_group") is not None:
+            spawn_kwargs["setpgroup"] = kwargs["process_group"]
+        # a bare name the hash table did not know is looked up in PATH, like Popen
+        start = os.posix_spawn if os.sep in path else os.posix_spawnp
+        pid = start(path, list(args), environment() if env is None else env, **spawn_kwargs)
+    except BaseException:
+        if parent_out is not None:
+            os.close(parent_out)
+        raise
+    finally:
+        for fd in child_fds:
+            os.close(fd)
+
+    return Process(pid, args, open(parent_out, "rb") if parent_out is not None else None)
+
+
+def _popen(args, executable, kwargs):
+    pgid = kwargs.pop("process_group", None)
+    if pgid is not None:
+        if sys.version_info >= (3, 11):
+            kwargs["process_group"] = pgid
+        else:
+            kwargs["preexec_fn"] = lambda: os.setpgid(0, pgid)
+    return subprocess.Popen(args, executable=executable, **kwargs)
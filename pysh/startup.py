@@ -0,0 +1,72 @@
+"""
+startup profiling for pysh
+
+`pysh --startup-profile` imports the REPL in a fresh interpreter with
+`-X importtime` and reports where the time before the first prompt goes.
+It exits with status 1 when the import takes longer than the startup budget,
+so the same command doubles as a regression check.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# import time of `repl` allowed before the check fails (override with
+# PYSH_STARTUP_BUDGET_MS, e.g. on slow CI machines)
+STARTUP_BUDGET_MS = 150.0
+
+# how many of the slowest modules imported by repl to list
+TOP_MODULES = 12
+
+
+def _parse_importtime(stderr):
+    """Turn `-X importtime` output into (depth, name, self_us, cumulative_us)."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        head, cumulative_us, name = line.split("|")
+        self_us = head.split(":")[1]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def profile(budget_ms=None):
+    """Print the import-time breakdown and return 0 if within budget, else 1."""
+    if budget_ms is None:
+        budget_ms = float(os.getenv("PYSH_STARTUP_BUDGET_MS", STARTUP_BUDGET_MS))
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import repl"],
+        cwd=Path(__file__).resolve().parent,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr.strip().splitlines()[-1])
+        return 1
+
+    # children are listed before their parent, so everything at depth 1
+    # since the previous top-level module was imported by repl
+    entries = _parse_importtime(proc.stderr)
+    children = []
+    total_us = 0
+    for depth, name, self_us, cumulative_us in entries:
+        if depth == 0:
+            if name == "repl":
+                total_us = cumulative_us
+                break
+            children = []
+        elif depth == 1:
+            children.append((cumulative_us, name))
+
+    print("pysh startup profile (import time, ms)")
+    for cumulative_us, name in sorted(children, reverse=True)[:TOP_MODULES]:
+        print(f"  {name:<28}{cumulative_us / 1000:>8.1f}")
+    total_ms = total_us / 1000
+    verdict = "ok" if total_ms <= budget_ms else "OVER BUDGET"
+    print(f"  {'total (import repl)':<28}{total_ms:>8.1f}   budget {budget_ms:.1f}   {verdict}")
+    return 0 if total_ms <= budget_ms else 1
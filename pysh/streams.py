@@ -0,0 +1,92 @@
+"""
+thread-local standard streams for pysh
+
+Built-in commands talk to the user through print() and sys.stdin. When
+several of them run at once (e.g. as stages of one pipeline) each needs its
+own stdin/stdout, so sys.stdin and sys.stdout are swapped for proxies that
+forward to a per-thread stream and fall back to the original one.
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class ThreadStream:
+    """A file-like proxy that forwards to the current thread's stream."""
+
+    def __init__(self, name, default):
+        # Use object.__setattr__ to match __getattr__ forwarding
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_default", default)
+
+    def _target(self):
+        return getattr(_local, self._name, None) or self._default
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __iter__(self):
+        return iter(self._target())
+
+    def write(self, data):
+        return self._target().write(data)
+
+    def flush(self):
+        return self._target().flush()
+
+
+def install():
+    """Replace sys.stdin/sys.stdout with thread-aware proxies (idempotent)."""
+    if not isinstance(sys.stdout, ThreadStream):
+        sys.stdout = ThreadStream("stdout", sys.stdout)
+    if not isinstance(sys.stdin, ThreadStream):
+        sys.stdin = ThreadStream("stdin", sys.stdin)
+
+
+def current():
+    """(stdin, stdout) bound to the calling thread, None for either that is not."""
+    return getattr(_local, "stdin", None), getattr(_local, "stdout", None)
+
+
+@contextmanager
+def redirect(stdin=None, stdout=None):
+    """
+    Bind stdin/stdout for the calling thread only.
+    Streams left as None keep pointing at the process-wide ones.
+    """
+    install()
+    saved = current()
+    _local.stdin, _local.stdout = stdin, stdout
+    try:
+        yield
+    finally:
+        _local.stdin, _local.stdout = saved
+
+
+class Writer:
+    """
+    Collects a built-in's output and writes it to the stream in large
+    pieces, instead of one write per line.
+    """
+
+    def __init__(self, stream=None, size=64 * 1024):
+        self.stream = stream or sys.stdout
+        self.size = size
+        self._parts = []
+        self._pending = 0
+
+    def write(self, text):
+        self._parts.append(text)
+        self._pending += len(text)
+        if self._pending >= self.size:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts.clear()
+            self._pending = 0
+        self.stream.flush()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+regenerates the PLY tables shipped with pysh
+
+lexer/lextab.py and parser/parsetab.py are committed so that startup only
+loads them. lextab.py also records lexer.rules_hash(); the lexer ignores it
+when the rules have changed. Run this after changing a token rule or a
+grammar rule:
+
+    python pysh/tables.py          rewrite both tables
+    python pysh/tables.py --check  exit 1 if the shipped tables are stale
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+
+import ply.lex as lex
+import ply.yacc as yacc
+
+TABLES = {
+    "lexer": ROOT / "lexer" / "lextab.py",
+    "parser": ROOT / "parser" / "parsetab.py",
+}
+
+
+def _generate(outputdir):
+    """Write fresh lextab.py and parsetab.py into outputdir."""
+    from lexer import lexer as lexer_module
+    from parser import parser as parser_module
+
+    # a table module that can't be imported forces PLY to build from scratch;
+    # it then writes <basename>.py into outputdir
+    lex.lex(module=lexer_module, optimize=True, lextab="_regen.lextab", outputdir=outputdir)
+    # lexer.py only trusts a lextab.py generated from its current rules
+    lextab = Path(outputdir) / "lextab.py"
+    with open(lextab, "a") as f:
+        f.write(f"_rules_hash   = {lexer_module.rules_hash()!r}\n")
+    yacc.yacc(module=parser_module, tabmodule="_regen.parsetab", outputdir=outputdir,
+              debug=False, write_tables=True, errorlog=yacc.NullLogger())
+    return {"lexer": Path(outputdir) / "lextab.py", "parser": Path(outputdir) / "parsetab.py"}
+
+
+def main():
+    check = "--check" in sys.argv[1:]
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh = _generate(tmp)
+        stale = []
+        for name, shipped in TABLES.items():
+            new = fresh[name].read_text()
+            if not shipped.exists() or shipped.read_text() != new:
+                stale.append(shipped)
+                if not check:
+                    shipped.write_text(new)
+
+    for path in stale:
+        print(f"{'stale' if check else 'wrote'}: {path.relative_to(ROOT)}")
+    if check and stale:
+        print("run `python pysh/tables.py` to regenerate")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
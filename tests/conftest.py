@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# pysh's modules import each other from the pysh/ directory, as repl.py sets up
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "pysh"))
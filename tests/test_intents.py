@@ -0,0 +1,19 @@
+from ai.intents import IntentIndex
+
+
+def test_learned_command_needs_the_same_operands(tmp_path):
+    index = IntentIndex(tmp_path / "intents.json")
+    index.learn("delete the release-2023-01 folder", "rm -r release-2023-01")
+    index.learn("compress logs-2024-05-01", "tar czf logs-2024-05-01.tar.gz logs-2024-05-01")
+    index.learn("delete the build folder", "rm -r build")
+
+    assert index.match("delete the release-2023-01 folder") == "rm -r release-2023-01"
+    assert index.match("delete the release-2023-02 folder") is None
+    assert index.match("compress logs-2024-05-02") is None
+    # a name the command uses is not fuzzy-matched either
+    assert index.match("delete the built folder") is None
+
+
+def test_phrasing_is_still_matched_loosely(tmp_path):
+    index = IntentIndex(tmp_path / "intents.json")
+    assert index.match("show disk usag") == "disk"